@@ -3,11 +3,19 @@ import csv
 from pathlib import Path
 import shutil # Usado para a substituição segura do arquivo
 
+if __package__:
+    from . import SchemaStore
+    from .Settings import apply_settings
+else:
+    import SchemaStore
+    from Settings import apply_settings
+
 # --- CONFIGURAÇÕES ---
 MANIFEST_PATH = "manifest.csv"
 # O diretório raiz onde os schemas gerados estão salvos
 SCHEMA_DOCUMENTS_DIR = "processed/schema_documents/"
 # ---------------------
+apply_settings(globals())
 
 def update_manifest_from_schemas():
     """
@@ -20,6 +28,8 @@ def update_manifest_from_schemas():
     
     updated_count = 0
     processed_count = 0
+    # Documentos já guardados no armazenamento endereçado por conteúdo, por dataset
+    store_indexes = {}
     
     try:
         with open(MANIFEST_PATH, 'r', newline='', encoding='utf-8') as manifest_file, \
@@ -54,8 +64,13 @@ def update_manifest_from_schemas():
                         continue
                     # --- FIM DA CORREÇÃO ---
                     
+                    if dataset_name not in store_indexes:
+                        store_indexes[dataset_name] = (SchemaStore.load_index(dataset_name)
+                                                       if SchemaStore.has_index(dataset_name) else {})
+                    in_store = str(Path(object_type) / base_name) in store_indexes[dataset_name]
+
                     # Se o arquivo de schema correspondente existir, atualiza a linha
-                    if schema_file_path.exists():
+                    if schema_file_path.exists() or in_store:
                         row["schema_generated"] = "true"
                         updated_count += 1
                         print(f"   -> Atualizado: {base_name} do dataset '{dataset_name}'")
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Leitura transparente de arquivos JSON/JSONL comprimidos, por streaming.
+
+Aceita .gz, .bz2, .xz, .zst (zstandard, dependência opcional) e membros de
+arquivos .zip, além dos arquivos sem compressão. Nada é descomprimido para o
+disco: `open_binary` devolve um fluxo binário (serve para o ijson) e `open_text`
+um fluxo de texto UTF-8 (serve para ler linha a linha ou para o json.load).
+
+Membros de .zip são indicados como "arquivo.zip::membro.json"; sem o membro,
+vale o primeiro .json/.jsonl do arquivo. `list_files` já expande os .zip em um
+item por membro.
+
+Cada arquivo lido até o fim registra bytes comprimidos, bytes descomprimidos e o
+tempo gasto nas leituras em DECOMPRESSION_LOG_FILE, e `print_throughput` resume a
+vazão (MB/s descomprimidos) por codec.
+
+Uso (a partir da raiz do projeto), para medir a vazão de leitura de arquivos:
+    python3 scripts/CompressedIO.py datasets/tweets.jsonl.gz datasets/kaggle.zip
+"""
+import io
+import os
+import csv
+import sys
+import bz2
+import gzip
+import lzma
+import time
+import zipfile
+import argparse
+from datetime import datetime
+if __package__:
+    from .Settings import apply_settings
+else:
+    from Settings import apply_settings
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# --- CONFIGURAÇÕES ---
+DECOMPRESSION_LOG_FILE = "decompression_log.csv"
+# Extensões de conteúdo aceitas (depois de remover a extensão do codec).
+JSON_EXTENSIONS = (".json", ".jsonl")
+# Bytes descomprimidos lidos para estimar o tamanho original quando o formato não o informa.
+SIZE_SAMPLE_BYTES = 16 * 1024 * 1024
+READ_CHUNK_BYTES = 1024 * 1024
+# ---------------------
+apply_settings(globals())
+
+CODECS = {".gz": "gzip", ".bz2": "bzip2", ".xz": "xz", ".zst": "zstd", ".zip": "zip"}
+ZIP_MEMBER_SEPARATOR = "::"
+
+# Vazão acumulada por codec neste processo: codec -> [arquivos, comprimidos, descomprimidos, segundos]
+THROUGHPUT = {}
+
+
+def split_member(path):
+    """'a.zip::m.json' -> ('a.zip', 'm.json'); outros caminhos -> (caminho, None)."""
+    archive, sep, member = path.partition(ZIP_MEMBER_SEPARATOR)
+    return (archive, member) if sep else (path, None)
+
+
+def physical_path(path):
+    """Arquivo em disco correspondente ao caminho (o .zip, no caso de um membro)."""
+    return split_member(path)[0]
+
+
+def codec_of(path):
+    """Codec do caminho ("none" se não for comprimido)."""
+    return CODECS.get(os.path.splitext(physical_path(path))[1].lower(), "none")
+
+
+def logical_name(path):
+    """Nome do conteúdo sem a extensão do codec: 'x.jsonl.gz' -> 'x.jsonl', 'a.zip::d/m.json' -> 'm.json'."""
+    archive, member = split_member(path)
+    if member is not None:
+        return os.path.basename(member)
+    name = os.path.basename(archive)
+    if codec_of(name) not in ("none", "zip"):
+        name = os.path.splitext(name)[0]
+    return name
+
+
+def is_supported(file_name, extensions=JSON_EXTENSIONS):
+    """Verdadeiro para arquivos cujo conteúdo tem uma das `extensions` (comprimidos ou não)."""
+    codec = codec_of(file_name)
+    if codec == "zip":
+        return True
+    if codec == "zstd" and zstandard is None:
+        return False
+    return logical_name(file_name).lower().endswith(extensions)
+
+
+def zip_members(archive_path, extensions=JSON_EXTENSIONS):
+    with zipfile.ZipFile(archive_path) as archive:
+        return [info.filename for info in archive.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(extensions)]
+
+
+def list_files(input_dir, extensions=JSON_EXTENSIONS):
+    """Arquivos aceitos de `input_dir` (nomes relativos), com os .zip expandidos em membros."""
+    files = []
+    for file_name in sorted(os.listdir(input_dir)):
+        if not is_supported(file_name, extensions):
+            continue
+        if codec_of(file_name) == "zip":
+            try:
+                members = zip_members(os.path.join(input_dir, file_name), extensions)
+            except zipfile.BadZipFile:
+                print(f"  Aviso: arquivo zip inválido ignorado: {file_name}")
+                continue
+            files += [f"{file_name}{ZIP_MEMBER_SEPARATOR}{m}" for m in members]
+        else:
+            files.append(file_name)
+    return files
+
+
+def _open_raw(path):
+    """Abre o fluxo descomprimido. Retorna (fluxo, arquivo em disco, bytes comprimidos totais)."""
+    archive, member = split_member(path)
+    codec = codec_of(path)
+    if codec == "zip":
+        zf = zipfile.ZipFile(archive)
+        if member is None:
+            members = zip_members(archive)
+            if not members:
+                zf.close()
+                raise FileNotFoundError(f"Nenhum membro {'/'.join(JSON_EXTENSIONS)} em {archive}")
+            member = members[0]
+        info = zf.getinfo(member)
+        stream = zf.open(info)
+        stream._schema_zipfile = zf  # mantém o ZipFile aberto enquanto o membro é lido
+        return stream, None, info.compress_size
+    raw = open(archive, "rb")
+    size = os.fstat(raw.fileno()).st_size
+    if codec == "gzip":
+        return gzip.GzipFile(fileobj=raw), raw, size
+    if codec == "bzip2":
+        return bz2.BZ2File(raw), raw, size
+    if codec == "xz":
+        return lzma.LZMAFile(raw), raw, size
+    if codec == "zstd":
+        if zstandard is None:
+            raw.close()
+            raise ImportError("O pacote 'zstandard' é necessário para ler arquivos .zst (pip install zstandard)")
+        return zstandard.ZstdDecompressor().stream_reader(raw, read_size=READ_CHUNK_BYTES), raw, size
+    return raw, raw, size
+
+
+class _MeteredReader(io.RawIOBase):
+    """Fluxo bruto que cronometra as leituras e registra a vazão ao ser fechado."""
+
+    def __init__(self, path, meter=True):
+        self.path = path
+        self.codec = codec_of(path)
+        self.meter = meter
+        self.stream, self.raw, self.compressed_size = _open_raw(path)
+        self.bytes = 0
+        self.seconds = 0.0
+        self.eof = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        t0 = time.perf_counter()
+        data = self.stream.read(len(buffer))
+        self.seconds += time.perf_counter() - t0
+        n = len(data)
+        buffer[:n] = data
+        self.bytes += n
+        if n == 0:
+            self.eof = True
+        return n
+
+    def compressed_read(self):
+        """Bytes comprimidos consumidos até agora."""
+        if self.eof:
+            return self.compressed_size
+        if self.raw is not None:
+            return self.raw.tell()
+        return None
+
+    def close(self):
+        if self.closed:
+            return
+        compressed = self.compressed_read()
+        try:
+            self.stream.close()
+            zf = getattr(self.stream, "_schema_zipfile", None)
+            if zf is not None:
+                zf.close()
+            if self.raw is not None and self.raw is not self.stream:
+                self.raw.close()
+        finally:
+            super().close()
+        if self.meter and self.eof:
+            record_throughput(self.path, self.codec, compressed, self.bytes, self.seconds)
+
+
+def open_binary(path, meter=True):
+    """Fluxo binário descomprimido (bufferizado) do arquivo."""
+    return io.BufferedReader(_MeteredReader(path, meter), buffer_size=READ_CHUNK_BYTES)
+
+
+def open_text(path, meter=True, encoding="utf-8"):
+    """Fluxo de texto descomprimido do arquivo."""
+    return io.TextIOWrapper(open_binary(path, meter), encoding=encoding)
+
+
+def peek_text(path, n=100, encoding="utf-8"):
+    """Primeiros `n` caracteres do conteúdo (sem registrar vazão), para detectar o formato."""
+    with open_text(path, meter=False, encoding=encoding) as f:
+        return f.read(n)
+
+
+def uncompressed_size(path):
+    """
+    Tamanho do conteúdo descomprimido: exato para arquivos sem compressão, membros
+    de .zip e .zst que informam o tamanho no cabeçalho; nos demais, estimado pela
+    razão de compressão dos primeiros SIZE_SAMPLE_BYTES (exato se o arquivo acabar antes).
+    """
+    codec = codec_of(path)
+    archive, member = split_member(path)
+    if codec == "none":
+        return os.path.getsize(archive)
+    if codec == "zip":
+        with zipfile.ZipFile(archive) as zf:
+            return zf.getinfo(member or zip_members(archive)[0]).file_size
+    if codec == "zstd" and zstandard is not None:
+        with open(archive, "rb") as f:
+            size = zstandard.frame_content_size(f.read(18))
+        if size >= 0:
+            return size
+
+    reader = _MeteredReader(path, meter=False)
+    try:
+        total = 0
+        while total < SIZE_SAMPLE_BYTES:
+            chunk = reader.stream.read(READ_CHUNK_BYTES)
+            if not chunk:
+                return total
+            total += len(chunk)
+        consumed = reader.raw.tell() or 1
+        return int(total * reader.compressed_size / consumed)
+    finally:
+        reader.close()
+
+
+def copy_to_file(path, output_file):
+    """Descomprime o conteúdo inteiro para `output_file` (por streaming)."""
+    with open_binary(path) as src, open(output_file, "wb") as dst:
+        while True:
+            chunk = src.read(READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            dst.write(chunk)
+
+
+def record_throughput(path, codec, compressed, decompressed, seconds, log_path=DECOMPRESSION_LOG_FILE):
+    entry = THROUGHPUT.setdefault(codec, [0, 0, 0, 0.0])
+    entry[0] += 1
+    entry[1] += compressed or 0
+    entry[2] += decompressed
+    entry[3] += seconds
+    log_exists = os.path.exists(log_path)
+    with open(log_path, "a", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile)
+        if not log_exists:
+            writer.writerow(["timestamp", "file", "codec", "compressed_bytes", "bytes", "seconds", "mb_per_sec"])
+        writer.writerow([datetime.now().isoformat(), path, codec, compressed if compressed is not None else "",
+                         decompressed, f"{seconds:.4f}",
+                         f"{decompressed / 2**20 / seconds:.1f}" if seconds else ""])
+
+
+def print_throughput():
+    """Resumo da vazão de leitura por codec neste processo."""
+    if not THROUGHPUT:
+        return
+    print("\n--- Vazão de leitura por codec ---")
+    for codec, (files, compressed, decompressed, seconds) in sorted(THROUGHPUT.items()):
+        ratio = decompressed / compressed if compressed else 0.0
+        rate = decompressed / 2**20 / seconds if seconds else 0.0
+        print(f"  {codec:<6} {files:4d} arquivos | {compressed / 2**20:9.1f} MB -> {decompressed / 2**20:9.1f} MB "
+              f"({ratio:.1f}x) | {rate:8.1f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede a vazão de leitura (descompressão) de arquivos JSON.")
+    parser.add_argument("paths", nargs="+", help="Arquivos (aceita .gz, .bz2, .xz, .zst, .zip e a.zip::membro)")
+    args = parser.parse_args()
+    for path in args.paths:
+        targets = [f"{path}{ZIP_MEMBER_SEPARATOR}{m}" for m in zip_members(path)] \
+            if codec_of(path) == "zip" and split_member(path)[1] is None else [path]
+        for target in targets:
+            try:
+                with open_binary(target) as f:
+                    while f.read(READ_CHUNK_BYTES):
+                        pass
+            except (OSError, ImportError, EOFError, lzma.LZMAError) as e:
+                print(f"  Erro ao ler {target}: {e}", file=sys.stderr)
+    print_throughput()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Índice colunar da estrutura dos documentos do corpus.
+
+Uma passada sobre os documentos do manifesto registra, para cada documento, o
+conjunto de caminhos (no formato do SchemaCompare, com ARRAY_ITEMS nos itens de
+arrays) e os tipos observados em cada um. Os caminhos são internados em um
+dicionário (id = posição em paths.json) e o índice fica em arrays NumPy,
+organizados por caminho (listas invertidas):
+
+    corpus_index/meta.json          # tipos, datasets e contagens
+    corpus_index/paths.json         # dicionário de caminhos
+    corpus_index/files.json         # arquivo de cada documento
+    corpus_index/path_offsets.npy   # início das entradas de cada caminho (n_caminhos + 1, int64)
+    corpus_index/post_docs.npy      # documento de cada entrada (uint32)
+    corpus_index/post_types.npy     # tipo de cada entrada (uint8, posição em TYPES)
+    corpus_index/doc_dataset.npy    # dataset de cada documento (uint16)
+    corpus_index/doc_shape.npy      # forma de cada documento (int32): documentos com os mesmos
+                                    # pares (caminho, tipo) têm a mesma forma
+
+CorpusIndex abre os arrays com mmap e responde sem reler os documentos:
+presença de um caminho, distribuição de tipos, fração nula, formas distintas
+por dataset e um documento representante de cada forma (para amostragem).
+
+Uso (a partir da raiz do projeto):
+    python3 scripts/CorpusIndex.py build
+    python3 scripts/CorpusIndex.py build --manifest manifest.csv --workers 8
+    python3 scripts/CorpusIndex.py shapes --dataset twitter
+    python3 scripts/CorpusIndex.py path user.email --dataset twitter
+"""
+import os
+import csv
+import json
+import time
+import argparse
+from array import array
+from pathlib import Path
+
+if __package__:
+    from .SchemaCompare import ARRAY_ITEMS, path_to_str
+    from .Settings import apply_settings
+else:
+    from SchemaCompare import ARRAY_ITEMS, path_to_str
+    from Settings import apply_settings
+
+# --- CONFIGURAÇÕES ---
+MANIFEST_PATH = "manifest.csv"
+INDEX_DIR = "corpus_index/"
+CHUNKSIZE = 64
+# Tipos JSON, na ordem dos códigos gravados em post_types.npy.
+TYPES = ("object", "array", "string", "integer", "number", "boolean", "null")
+# ---------------------
+apply_settings(globals())
+
+_TYPE_CODES = {name: code for code, name in enumerate(TYPES)}
+
+# numpy (e o multiprocessing) só são importados ao construir ou abrir o índice, para
+# que a ajuda do subcomando no SchemaDiscovery não pague a importação.
+np = None
+
+
+def _load_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+
+
+def json_type(value):
+    if isinstance(value, dict):
+        return "object"
+    if isinstance(value, list):
+        return "array"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer"
+    if isinstance(value, float):
+        return "number"
+    return "null"
+
+
+def document_pairs(document):
+    """Pares distintos (caminho, código do tipo) de um documento, sem a raiz."""
+    pairs = set()
+    stack = [((), document)]
+    while stack:
+        path, value = stack.pop()
+        if path:
+            pairs.add((path_to_str(path), _TYPE_CODES[json_type(value)]))
+        if isinstance(value, dict):
+            stack.extend((path + (key,), child) for key, child in value.items())
+        elif isinstance(value, list):
+            stack.extend((path + (ARRAY_ITEMS,), child) for child in value)
+    return pairs
+
+
+def iter_manifest_files(manifest_path):
+    """(arquivo, dataset) de cada linha do manifesto; o dataset é a segunda parte do caminho."""
+    with open(manifest_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            parts = Path(row["file"]).parts
+            yield row["file"], parts[1] if len(parts) > 1 else ""
+
+
+def _read_pairs(item):
+    """Pares de um arquivo (executado no pool). Retorna (arquivo, dataset, pares ou None, erro)."""
+    file_path, dataset = item
+    try:
+        with open(file_path, "r", encoding="utf-8-sig") as f:
+            return file_path, dataset, document_pairs(json.load(f)), None
+    except (OSError, ValueError) as e:
+        return file_path, dataset, None, str(e)
+
+
+def build(manifest_path=MANIFEST_PATH, output_dir=INDEX_DIR, workers=None):
+    """Constrói o índice dos documentos do manifesto em `output_dir`. Retorna o conteúdo do meta.json."""
+    from multiprocessing import Pool
+
+    _load_numpy()
+    t0 = time.time()
+    path_ids, paths = {}, []
+    dataset_ids, datasets = {}, []
+    shape_ids = {}
+    files = []
+    entry_paths, entry_docs, entry_types = array("I"), array("I"), array("B")
+    doc_dataset, doc_shape = array("H"), array("i")
+    skipped = 0
+
+    with Pool(workers) as pool:
+        for file_path, dataset, pairs, error in pool.imap(_read_pairs, iter_manifest_files(manifest_path), CHUNKSIZE):
+            if error:
+                skipped += 1
+                print(f"  Aviso: documento ignorado: {file_path}: {error}")
+                continue
+            doc = len(files)
+            files.append(file_path)
+            if dataset not in dataset_ids:
+                dataset_ids[dataset] = len(datasets)
+                datasets.append(dataset)
+            doc_dataset.append(dataset_ids[dataset])
+
+            ids = []
+            for path, type_code in pairs:
+                path_id = path_ids.get(path)
+                if path_id is None:
+                    path_id = path_ids[path] = len(paths)
+                    paths.append(path)
+                ids.append((path_id, type_code))
+            ids.sort()
+            doc_shape.append(shape_ids.setdefault(tuple(ids), len(shape_ids)))
+            for path_id, type_code in ids:
+                entry_paths.append(path_id)
+                entry_docs.append(doc)
+                entry_types.append(type_code)
+            if len(files) % 10000 == 0:
+                print(f"  {len(files)} documentos, {len(paths)} caminhos ({time.time() - t0:.0f}s)")
+
+    # Entradas agrupadas por caminho (e, dentro do caminho, por documento).
+    entry_paths = np.frombuffer(entry_paths, dtype=np.uint32)
+    order = np.argsort(entry_paths, kind="stable")
+    path_offsets = np.zeros(len(paths) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(entry_paths, minlength=len(paths)), out=path_offsets[1:])
+
+    os.makedirs(output_dir, exist_ok=True)
+    np.save(os.path.join(output_dir, "path_offsets.npy"), path_offsets)
+    np.save(os.path.join(output_dir, "post_docs.npy"), np.frombuffer(entry_docs, dtype=np.uint32)[order])
+    np.save(os.path.join(output_dir, "post_types.npy"), np.frombuffer(entry_types, dtype=np.uint8)[order])
+    np.save(os.path.join(output_dir, "doc_dataset.npy"), np.frombuffer(doc_dataset, dtype=np.uint16))
+    np.save(os.path.join(output_dir, "doc_shape.npy"), np.frombuffer(doc_shape, dtype=np.int32))
+    for name, data in (("paths.json", paths), ("files.json", files)):
+        with open(os.path.join(output_dir, name), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+    meta = {"types": list(TYPES), "datasets": datasets, "documents": len(files), "paths": len(paths),
+            "entries": len(entry_paths), "shapes": len(shape_ids), "skipped": skipped,
+            "manifest": manifest_path, "seconds": time.time() - t0}
+    with open(os.path.join(output_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    return meta
+
+
+def _first_of_run(docs):
+    """
+    Máscara da primeira entrada de cada documento. Dentro de um caminho as
+    entradas estão ordenadas por documento, e um documento só se repete quando o
+    caminho teve mais de um tipo nele.
+    """
+    first = np.ones(len(docs), dtype=bool)
+    first[1:] = docs[1:] != docs[:-1]
+    return first
+
+
+class CorpusIndex:
+    """Índice aberto por mapeamento em memória. `dataset=None` nas consultas = corpus inteiro."""
+
+    def __init__(self, path=INDEX_DIR):
+        _load_numpy()
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(os.path.join(path, "paths.json"), "r", encoding="utf-8") as f:
+            self.paths = json.load(f)
+        self.path_ids = {p: i for i, p in enumerate(self.paths)}
+        self.types = self.meta["types"]
+        self.datasets = self.meta["datasets"]
+        self._files = None
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")
+        self.path_offsets = load("path_offsets.npy")
+        self.post_docs = load("post_docs.npy")
+        self.post_types = load("post_types.npy")
+        self.doc_dataset = load("doc_dataset.npy")
+        self.doc_shape = load("doc_shape.npy")
+
+    def __len__(self):
+        return len(self.doc_dataset)
+
+    def _dataset_id(self, dataset):
+        try:
+            return self.datasets.index(dataset)
+        except ValueError:
+            raise KeyError(f"dataset '{dataset}' não está no índice") from None
+
+    def _postings(self, path, dataset=None):
+        """(documentos, códigos de tipo) das entradas do caminho, filtradas pelo dataset."""
+        path_id = self.path_ids.get(path)
+        if path_id is None:
+            return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.uint8)
+        start, end = self.path_offsets[path_id], self.path_offsets[path_id + 1]
+        docs, types = self.post_docs[start:end], self.post_types[start:end]
+        if dataset is not None:
+            keep = self.doc_dataset[docs] == self._dataset_id(dataset)
+            docs, types = docs[keep], types[keep]
+        return docs, types
+
+    def documents(self, dataset=None):
+        """Ids dos documentos do dataset."""
+        if dataset is None:
+            return np.arange(len(self), dtype=np.uint32)
+        return np.flatnonzero(self.doc_dataset == self._dataset_id(dataset)).astype(np.uint32)
+
+    def count(self, dataset=None):
+        return len(self) if dataset is None else int(np.count_nonzero(self.doc_dataset == self._dataset_id(dataset)))
+
+    def documents_with(self, path, type_name=None, dataset=None):
+        """Ids (ordenados) dos documentos que têm o caminho (com o tipo `type_name`, se dado)."""
+        docs, types = self._postings(path, dataset)
+        if type_name is not None:
+            return docs[types == self.types.index(type_name)]
+        return docs[_first_of_run(docs)]
+
+    def presence(self, path, dataset=None):
+        """Fração dos documentos que têm o caminho."""
+        total = self.count(dataset)
+        return len(self.documents_with(path, dataset=dataset)) / total if total else 0.0
+
+    def type_distribution(self, path, dataset=None):
+        """{tipo: nº de documentos em que o caminho teve esse tipo}."""
+        _, types = self._postings(path, dataset)
+        counts = np.bincount(types, minlength=len(self.types))
+        return {name: int(counts[code]) for code, name in enumerate(self.types) if counts[code]}
+
+    def nullable_fraction(self, path, dataset=None):
+        """Entre os documentos que têm o caminho, fração em que ele foi null."""
+        present = len(self.documents_with(path, dataset=dataset))
+        return len(self.documents_with(path, "null", dataset)) / present if present else 0.0
+
+    def path_frequencies(self, dataset=None):
+        """{caminho: fração dos documentos que o têm}, do mais ao menos frequente."""
+        total = self.count(dataset)
+        if not total:
+            return {}
+        # Um documento conta uma vez por caminho, mesmo com vários tipos.
+        first = _first_of_run(self.post_docs)
+        first[self.path_offsets[:-1][np.diff(self.path_offsets) > 0]] = True
+        if dataset is not None:
+            first &= self.doc_dataset[self.post_docs] == self._dataset_id(dataset)
+        counts = (np.add.reduceat(first, self.path_offsets[:-1], dtype=np.int64) if len(first)
+                  else np.zeros(len(self.paths), dtype=np.int64))
+        counts[np.diff(self.path_offsets) == 0] = 0  # reduceat repete o valor seguinte em fatias vazias
+        order = np.argsort(-counts, kind="stable")
+        return {self.paths[i]: counts[i] / total for i in order if counts[i]}
+
+    def shape_counts(self, dataset=None):
+        """[(forma, nº de documentos)], da forma mais comum para a menos comum."""
+        shapes = self.doc_shape if dataset is None else self.doc_shape[self.documents(dataset)]
+        ids, counts = np.unique(shapes, return_counts=True)
+        order = np.argsort(-counts, kind="stable")
+        return [(int(ids[i]), int(counts[i])) for i in order]
+
+    def distinct_shapes(self, dataset=None):
+        shapes = self.doc_shape if dataset is None else self.doc_shape[self.documents(dataset)]
+        return len(np.unique(shapes))
+
+    def representatives(self, dataset=None):
+        """Um documento de cada forma (o primeiro do manifesto), da forma mais comum para a menos comum."""
+        docs = self.documents(dataset)
+        shapes, first = np.unique(self.doc_shape[docs], return_index=True)
+        counts = np.bincount(np.searchsorted(shapes, self.doc_shape[docs]), minlength=len(shapes))
+        return docs[first[np.argsort(-counts, kind="stable")]]
+
+    def files(self, doc_ids):
+        """Arquivos dos documentos."""
+        if self._files is None:
+            with open(os.path.join(self.path, "files.json"), "r", encoding="utf-8") as f:
+                self._files = json.load(f)
+        return [self._files[i] for i in doc_ids]
+
+
+def _timed_query(func, *args):
+    t0 = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - t0) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice colunar da estrutura dos documentos do corpus.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build", help="Indexa os documentos do manifesto")
+    build_parser.add_argument("--manifest", default=MANIFEST_PATH)
+    build_parser.add_argument("--workers", type=int, default=None, help="Processos de leitura")
+    shapes_parser = sub.add_parser("shapes", help="Formas distintas e caminhos mais frequentes")
+    shapes_parser.add_argument("--dataset", default=None)
+    shapes_parser.add_argument("--top", type=int, default=10)
+    path_parser = sub.add_parser("path", help="Presença, tipos e fração nula de um caminho")
+    path_parser.add_argument("path", help="Caminho no formato do SchemaCompare (ex.: user.email, entities.urls.[])")
+    path_parser.add_argument("--dataset", default=None)
+    for p in (shapes_parser, path_parser):
+        p.add_argument("--index", default=INDEX_DIR)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        if not os.path.exists(args.manifest):
+            print(f"❌ ERRO: O manifesto '{args.manifest}' não foi encontrado."); return
+        print(f"Indexando os documentos de '{args.manifest}' em '{INDEX_DIR}'...")
+        meta = build(args.manifest, INDEX_DIR, args.workers)
+        print(f"Concluído: {meta['documents']} documentos, {meta['paths']} caminhos, {meta['shapes']} formas, "
+              f"{meta['skipped']} ignorados, em {meta['seconds']:.1f}s")
+        return
+
+    if not os.path.exists(os.path.join(args.index, "meta.json")):
+        print(f"❌ ERRO: Índice não encontrado em '{args.index}'. Rode 'build' antes."); return
+    index = CorpusIndex(args.index)
+    if args.dataset is not None and args.dataset not in index.datasets:
+        print(f"❌ ERRO: O dataset '{args.dataset}' não está no índice ({', '.join(index.datasets)})."); return
+    scope = args.dataset or "corpus inteiro"
+
+    if args.command == "shapes":
+        shapes, ms_shapes = _timed_query(index.shape_counts, args.dataset)
+        frequencies, ms_paths = _timed_query(index.path_frequencies, args.dataset)
+        total = index.count(args.dataset)
+        print(f"{scope}: {total} documentos, {len(shapes)} formas distintas ({ms_shapes:.1f} ms)")
+        for shape, count in shapes[:args.top]:
+            print(f"  forma {shape}: {count} documentos ({count / total:.1%})")
+        print(f"Caminhos mais frequentes ({ms_paths:.1f} ms):")
+        for path, fraction in list(frequencies.items())[:args.top]:
+            print(f"  {path}: {fraction:.1%}")
+        return
+
+    presence, ms = _timed_query(index.presence, args.path, args.dataset)
+    types = index.type_distribution(args.path, args.dataset)
+    nullable = index.nullable_fraction(args.path, args.dataset)
+    examples = index.files(index.documents_with(args.path, dataset=args.dataset)[:3])
+    print(f"{args.path} ({scope}): presente em {presence:.1%} dos documentos ({ms:.2f} ms)")
+    print(f"  tipos: {', '.join(f'{t}={c}' for t, c in types.items()) or '-'} | nulo em {nullable:.1%}")
+    for file_path in examples:
+        print(f"  ex.: {file_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,650 @@
+#!/usr/bin/env python3
+"""
+Coordenador da extração com LLM distribuída entre várias máquinas.
+
+O coordenador serve os documentos pendentes do manifesto em lotes com lease
+(concessão com prazo) por HTTP/JSON. Os workers (em outras máquinas ou, para
+testes, processos locais) pedem um lote, extraem os schemas com o roteamento de
+modelos do LLMExtraction e devolvem os resultados:
+
+- POST /claim     {"worker", "batch"}        -> lease com os documentos (conteúdo incluído)
+- POST /heartbeat {"lease"}                  -> renova o prazo; avisa se o lease foi perdido
+- POST /complete  {"lease", "worker", "results"}
+- GET  /status                               -> relatório do cluster
+
+Um lease sem heartbeat por LEASE_SECONDS expira e os documentos voltam para o
+início da fila (reclaim). Resultados que chegam depois da expiração ainda são
+aceitos se ninguém terminou o documento antes: vale o primeiro resultado. Com a
+fila vazia, workers ociosos recebem cópias de backup dos lotes atrasados
+(stragglers) para que a cauda da execução não dependa da máquina mais lenta.
+Documentos que falham voltam ao fim da fila, de preferência para outro worker,
+até MAX_ATTEMPTS tentativas; só então a falha é registrada.
+
+Só o coordenador grava: schemas (LLMExtraction.save_schema), generation_log.csv
+e compaction_log.csv, sem escritas concorrentes vindas de várias máquinas. Os
+documentos concluídos com sucesso são anotados em COMPLETED_FILE, então um
+coordenador reiniciado continua de onde parou. A amostragem adaptativa
+(SchemaConvergence) não é usada no modo distribuído.
+
+O relatório traz vazão do cluster (total e na janela recente), vazão e tempo por
+documento de cada worker, stragglers, reclaims e backups; ao final da execução é
+gravado em REPORT_FILE.
+
+Uso (a partir da raiz do projeto):
+    python3 scripts/ExtractionCoordinator.py serve --port 8765
+    python3 scripts/ExtractionCoordinator.py work --coordinator http://coordenador:8765
+    python3 scripts/ExtractionCoordinator.py status --coordinator http://coordenador:8765
+    python3 scripts/ExtractionCoordinator.py local --workers 4 --backend stub --stub-tps 400
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import argparse
+import threading
+import subprocess
+import statistics
+import urllib.error
+import urllib.request
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+if __package__:
+    from . import LLMExtraction
+    from . import LLMBackends
+    from .GenerationWatchdog import GenerationTimeout
+    from .ModelRouter import ModelRouter, ModelPool
+    from .PromptCompaction import save_compaction_log
+    from .Settings import apply_settings
+else:
+    import LLMExtraction
+    import LLMBackends
+    from GenerationWatchdog import GenerationTimeout
+    from ModelRouter import ModelRouter, ModelPool
+    from PromptCompaction import save_compaction_log
+    from Settings import apply_settings
+
+# --- CONFIGURAÇÕES ---
+HOST = "0.0.0.0"
+PORT = 8765
+# Documentos por lease. Lotes maiores diluem a ida e volta ao coordenador.
+BATCH_SIZE = 8
+# Prazo de um lease sem heartbeat; o worker envia heartbeats a cada HEARTBEAT_SECONDS.
+LEASE_SECONDS = 120.0
+HEARTBEAT_SECONDS = 30.0
+# Frequência da varredura de leases expirados e das linhas de progresso.
+REAP_INTERVAL_SECONDS = 5.0
+PROGRESS_INTERVAL_SECONDS = 30.0
+# Worker (ou lease) mais lento que STRAGGLER_FACTOR x a mediana é um straggler.
+STRAGGLER_FACTOR = 2.0
+# Entrega cópias de lotes atrasados a workers ociosos quando a fila esvazia.
+BACKUP_TASKS = True
+# Janela (s) da vazão recente do cluster.
+THROUGHPUT_WINDOW_SECONDS = 60.0
+# Tentativas de um documento que falha (erro de carga, timeout...) antes de registrar
+# a falha. As novas tentativas vão, sempre que houver, para um worker que ainda não
+# falhou no documento: um worker mal configurado não esgota o manifesto sozinho.
+MAX_ATTEMPTS = 3
+# Espera sugerida ao worker quando não há trabalho livre, mas ainda há leases ativos.
+CLAIM_RETRY_SECONDS = 2.0
+# O servidor continua respondendo "done" por este tempo depois do fim.
+LINGER_SECONDS = 5.0
+REQUEST_TIMEOUT_SECONDS = 60.0
+# Tentativas do worker quando o coordenador não responde.
+MAX_CONNECT_RETRIES = 5
+COMPLETED_FILE = ".coordinator_completed"
+REPORT_FILE = "coordinator_report.json"
+# ---------------------
+apply_settings(globals())
+
+
+def load_completed(path):
+    """Documentos já extraídos com sucesso por execuções anteriores do coordenador."""
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+class Coordinator:
+    """Fila de documentos com leases, heartbeats, expiração e contabilidade por worker."""
+
+    def __init__(self, entries, completed_path=COMPLETED_FILE, lease_seconds=LEASE_SECONDS):
+        self.lock = threading.Lock()
+        # Gravações (schemas e CSVs) ficam fora de self.lock, mas uma de cada vez.
+        self.write_lock = threading.Lock()
+        self.completed_path = completed_path
+        self.lease_seconds = lease_seconds
+        self.entries = {entry["file"]: entry for entry in entries}
+        self.finished = load_completed(completed_path) & set(self.entries)
+        self.pending = deque(f for f in self.entries if f not in self.finished)
+        self.total = len(self.pending)
+        self.leases = {}
+        self.holders = {}  # documento -> ids dos leases que o contêm (mais de um com backup)
+        self.attempts = {}  # documento -> tentativas que falharam
+        self.failed_by = {}  # documento -> workers em que falhou
+        self.workers = {}
+        self.item_seconds = deque(maxlen=1000)  # duração por documento dos lotes concluídos
+        self.finish_times = deque()
+        self.counters = {"claims": 0, "completed": 0, "failed": 0, "invalid": 0, "reclaimed_leases": 0,
+                         "reclaimed_items": 0, "backup_items": 0, "duplicates": 0, "late_results": 0,
+                         "retries": 0}
+        # A vazão é medida do primeiro pedido de lote até o último resultado.
+        self.started = None
+        self.finished_at = None
+        self.done = threading.Event()
+        if not self.pending:
+            self.done.set()
+
+    def _worker(self, name, now):
+        worker = self.workers.get(name)
+        if worker is None:
+            worker = self.workers[name] = {"first_seen": now, "last_seen": now, "items": 0, "batches": 0,
+                                           "busy_seconds": 0.0, "reclaimed": 0, "failures": 0}
+        worker["last_seen"] = now
+        return worker
+
+    def _release(self, lease_id, files, retry=()):
+        """
+        Tira o lease dos documentos; os que ficam sem dono e sem resultado voltam ao
+        início da fila, e os que falharam (`retry`) ao fim dela.
+        """
+        for f in reversed(files):
+            holders = self.holders.get(f)
+            if holders is None:
+                continue
+            holders.discard(lease_id)
+            if not holders:
+                del self.holders[f]
+                if f in retry:
+                    self.pending.append(f)
+                elif f not in self.finished:
+                    self.pending.appendleft(f)
+
+    def _should_skip(self, f, worker, now):
+        """O documento já falhou neste worker e há outro worker ativo que ainda não o tentou."""
+        failed_by = self.failed_by.get(f)
+        if not failed_by or worker not in failed_by:
+            return False
+        return any(name not in failed_by and now - w["last_seen"] < self.lease_seconds
+                   for name, w in self.workers.items())
+
+    def _reap(self, now):
+        for lease_id in [i for i, lease in self.leases.items() if lease["expires"] < now]:
+            lease = self.leases.pop(lease_id)
+            items = [f for f in lease["items"] if f not in self.finished]
+            self._release(lease_id, lease["items"])
+            self.counters["reclaimed_leases"] += 1
+            self.counters["reclaimed_items"] += len(items)
+            self.workers[lease["worker"]]["reclaimed"] += 1
+            print(f"  Lease {lease_id[:8]} de '{lease['worker']}' expirou: {len(items)} documentos devolvidos à fila.")
+
+    def _median_item_seconds(self):
+        return statistics.median(self.item_seconds) if self.item_seconds else None
+
+    def _is_straggling(self, lease, now, median):
+        return median is not None and now - lease["granted"] > STRAGGLER_FACTOR * median * len(lease["items"])
+
+    def _backup_items(self, worker, batch, now):
+        """Documentos de leases atrasados de outros workers que ainda não têm cópia."""
+        median = self._median_item_seconds()
+        candidates = sorted((lease for lease in self.leases.values()
+                             if lease["worker"] != worker and not lease["backup"]
+                             and self._is_straggling(lease, now, median)), key=lambda lease: lease["granted"])
+        files = []
+        for lease in candidates:
+            files += [f for f in lease["items"] if f not in self.finished and len(self.holders.get(f, ())) == 1]
+            if len(files) >= batch:
+                break
+        return files[:batch]
+
+    def claim(self, worker, batch=BATCH_SIZE):
+        """Concede um lease com até `batch` documentos, com o conteúdo de cada um."""
+        now = time.time()
+        with self.lock:
+            self._reap(now)
+            self._worker(worker, now)
+            if self.started is None:
+                self.started = now
+            files, skipped = [], []
+            while self.pending and len(files) < batch:
+                f = self.pending.popleft()
+                if f in self.finished or f in self.holders:
+                    continue
+                if self._should_skip(f, worker, now):
+                    skipped.append(f)
+                else:
+                    files.append(f)
+            self.pending.extendleft(reversed(skipped))
+            backup = False
+            if not files and BACKUP_TASKS:
+                files = self._backup_items(worker, batch, now)
+                backup = bool(files)
+                self.counters["backup_items"] += len(files)
+            if not files:
+                return {"done": self.done.is_set(), "retry_after": CLAIM_RETRY_SECONDS}
+            lease_id = uuid.uuid4().hex
+            self.leases[lease_id] = {"worker": worker, "items": files, "granted": now,
+                                     "expires": now + self.lease_seconds, "backup": backup}
+            for f in files:
+                self.holders.setdefault(f, set()).add(lease_id)
+            self.counters["claims"] += 1
+            entries = [self.entries[f] for f in files]
+
+        # Leitura dos documentos fora do lock: outros workers são atendidos em paralelo.
+        items = []
+        for entry in entries:
+            item = {"file": entry["file"], "entry": entry}
+            try:
+                with open(entry["file"], "r", encoding="utf-8") as f:
+                    item["document"] = f.read()
+            except OSError as e:
+                item["error"] = str(e)
+            items.append(item)
+        return {"lease": lease_id, "items": items, "lease_seconds": self.lease_seconds,
+                "heartbeat_seconds": min(HEARTBEAT_SECONDS, self.lease_seconds / 3), "backup": backup}
+
+    def heartbeat(self, lease_id):
+        """Renova o lease. `cancel` lista documentos do lote que outro worker já concluiu."""
+        now = time.time()
+        with self.lock:
+            lease = self.leases.get(lease_id)
+            if lease is None:
+                return {"ok": False}
+            lease["expires"] = now + self.lease_seconds
+            self._worker(lease["worker"], now)
+            return {"ok": True, "cancel": [f for f in lease["items"] if f in self.finished]}
+
+    def complete(self, lease_id, worker, results):
+        """
+        Registra os resultados de um lote (vale o primeiro resultado de cada
+        documento). Falhas com tentativas restantes voltam para a fila.
+        """
+        now = time.time()
+        accepted, retry = [], set()
+        with self.lock:
+            lease = self.leases.pop(lease_id, None)
+            if lease is None:
+                self.counters["late_results"] += 1
+            stats = self._worker(worker, now)
+            for result in results:
+                f = result.get("file")
+                if f not in self.entries:
+                    continue
+                if f in self.finished:
+                    self.counters["duplicates"] += 1
+                    continue
+                if result["status"] == "failed":
+                    stats["failures"] += 1
+                    self.failed_by.setdefault(f, set()).add(worker)
+                    self.attempts[f] = self.attempts.get(f, 0) + 1
+                    if self.attempts[f] < MAX_ATTEMPTS:
+                        retry.add(f)
+                        self.counters["retries"] += 1
+                        continue
+                self.finished.add(f)
+                accepted.append(result)
+                self.finish_times.append(now)
+                self.counters[{"success": "completed", "invalid": "invalid"}.get(result["status"], "failed")] += 1
+            stats["items"] += len(results)
+            stats["batches"] += 1
+            stats["busy_seconds"] += sum(r.get("seconds", 0.0) for r in results)
+            if lease is not None:
+                if results:
+                    self.item_seconds.append((now - lease["granted"]) / len(results))
+                self._release(lease_id, lease["items"], retry)
+            if retry:
+                print(f"  {len(retry)} documentos falharam em '{worker}' e voltaram para a fila.")
+            if len(self.finished) >= len(self.entries) and not self.done.is_set():
+                self.finished_at = now
+                self.done.set()
+
+        with self.write_lock:
+            for result in accepted:
+                self._save_result(result, worker)
+        return {"ok": True, "accepted": len(accepted)}
+
+    def _save_result(self, result, worker):
+        original_file_path = result["file"]
+        model_name = result.get("model") or "N/A"
+        status = result["status"]
+        if status == "failed":
+            LLMExtraction.save_log_incremental(LLMExtraction.LOG_FILE, original_file_path, model_name, "failed",
+                                               f"{result.get('message', '')} (worker {worker})")
+            return
+        try:
+            _, output_path = LLMExtraction.output_path_for(original_file_path, self.entries[original_file_path]
+                                                           .get("object_type", "unknown"))
+        except IndexError:
+            LLMExtraction.save_log_incremental(LLMExtraction.LOG_FILE, original_file_path, model_name, "failed",
+                                               "Invalid file path structure in manifest")
+            return
+        LLMExtraction.save_schema(result["schema"], output_path)
+        if result.get("compaction"):
+            save_compaction_log(LLMExtraction.COMPACTION_LOG_FILE, original_file_path, model_name, result["compaction"])
+        if status == "invalid":
+            LLMExtraction.save_log_incremental(LLMExtraction.LOG_FILE, original_file_path, model_name, "invalid",
+                                               f"Schema saved to {output_path} but failed validation: "
+                                               f"{result.get('message', '')} (worker {worker})")
+            return
+        LLMExtraction.save_log_incremental(LLMExtraction.LOG_FILE, original_file_path, model_name, "success",
+                                           f"Schema saved to {output_path} (worker {worker})")
+        with open(self.completed_path, "a", encoding="utf-8") as f:
+            f.write(original_file_path + "\n")
+
+    def reap(self):
+        with self.lock:
+            self._reap(time.time())
+
+    def report(self):
+        """Vazão do cluster, estatísticas por worker, stragglers e reclaims."""
+        now = time.time()
+        with self.lock:
+            end = self.finished_at or now
+            elapsed = max(end - (self.started or now), 1e-9)
+            while self.finish_times and self.finish_times[0] < end - THROUGHPUT_WINDOW_SECONDS:
+                self.finish_times.popleft()
+            done = self.counters["completed"] + self.counters["invalid"] + self.counters["failed"]
+            workers = {}
+            for name, w in self.workers.items():
+                active = sum(1 for lease in self.leases.values() if lease["worker"] == name)
+                workers[name] = {
+                    "items": w["items"], "batches": w["batches"], "active_leases": active,
+                    "items_per_sec": w["items"] / max(end - w["first_seen"], 1e-9),
+                    "seconds_per_item": w["busy_seconds"] / w["items"] if w["items"] else None,
+                    "last_seen_seconds_ago": now - w["last_seen"], "reclaimed_leases": w["reclaimed"],
+                    "failures": w["failures"],
+                }
+            per_item = [w["seconds_per_item"] for w in workers.values() if w["seconds_per_item"] is not None]
+            median = statistics.median(per_item) if per_item else None
+            median_item = self._median_item_seconds()
+            return {
+                "elapsed_seconds": elapsed,
+                "total": self.total, "done": done, "pending": len(self.pending), "leased": len(self.holders),
+                "throughput": done / elapsed,
+                "window_throughput": len(self.finish_times) / min(THROUGHPUT_WINDOW_SECONDS, elapsed),
+                "workers_active": sum(1 for w in workers.values() if w["last_seen_seconds_ago"] < self.lease_seconds),
+                "workers": workers,
+                "stragglers": {
+                    "workers": sorted(name for name, w in workers.items() if median and w["seconds_per_item"]
+                                      and w["seconds_per_item"] > STRAGGLER_FACTOR * median),
+                    "leases": [{"lease": i, "worker": lease["worker"], "age_seconds": now - lease["granted"],
+                                "items": len(lease["items"])}
+                               for i, lease in self.leases.items() if self._is_straggling(lease, now, median_item)],
+                },
+                **self.counters,
+            }
+
+
+def print_report(report):
+    print("\n--- Relatório do coordenador ---")
+    print(f"Documentos: {report['done']}/{report['total']} em {report['elapsed_seconds']:.1f}s | "
+          f"vazão {report['throughput']:.2f} docs/s (janela: {report['window_throughput']:.2f}) | "
+          f"{report['workers_active']} workers ativos")
+    print(f"Sucesso: {report['completed']} | inválidos: {report['invalid']} | falhas: {report['failed']} | "
+          f"reclaims: {report['reclaimed_leases']} leases ({report['reclaimed_items']} docs) | "
+          f"backups: {report['backup_items']} | duplicados: {report['duplicates']} | "
+          f"resultados atrasados: {report['late_results']} | novas tentativas: {report['retries']}")
+    for name, w in sorted(report["workers"].items()):
+        per_item = f"{w['seconds_per_item']:.2f}s/doc" if w["seconds_per_item"] is not None else "-"
+        print(f"  {name:<30} {w['items']:6d} docs | {w['items_per_sec']:7.2f} docs/s | {per_item:>11} | "
+              f"reclaims {w['reclaimed_leases']} | falhas {w['failures']}")
+    stragglers = report["stragglers"]
+    if stragglers["workers"]:
+        print(f"Workers lentos (> {STRAGGLER_FACTOR}x a mediana): {', '.join(stragglers['workers'])}")
+    for lease in stragglers["leases"]:
+        print(f"Lease atrasado: {lease['lease'][:8]} de '{lease['worker']}' há {lease['age_seconds']:.0f}s "
+              f"({lease['items']} docs)")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Endpoints JSON do coordenador (self.server.coordinator)."""
+
+    def _reply(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/status":
+            self._reply({"error": "not found"}, 404); return
+        self._reply(self.server.coordinator.report())
+
+    def do_POST(self):
+        coordinator = self.server.coordinator
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if self.path == "/claim":
+                reply = coordinator.claim(request["worker"], int(request.get("batch", BATCH_SIZE)))
+            elif self.path == "/heartbeat":
+                reply = coordinator.heartbeat(request["lease"])
+            elif self.path == "/complete":
+                reply = coordinator.complete(request["lease"], request["worker"], request.get("results", []))
+            else:
+                self._reply({"error": "not found"}, 404); return
+        except (ValueError, KeyError) as e:
+            self._reply({"error": f"requisição inválida: {e}"}, 400); return
+        self._reply(reply)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _supervise(server, coordinator):
+    """Expira leases, imprime o progresso e encerra o servidor depois do fim."""
+    last_progress = time.time()
+    while not coordinator.done.wait(REAP_INTERVAL_SECONDS):
+        coordinator.reap()
+        if time.time() - last_progress >= PROGRESS_INTERVAL_SECONDS:
+            last_progress = time.time()
+            r = coordinator.report()
+            print(f"  {r['done']}/{r['total']} documentos | {r['window_throughput']:.2f} docs/s | "
+                  f"{r['workers_active']} workers | {r['reclaimed_leases']} reclaims")
+    time.sleep(LINGER_SECONDS)
+    server.shutdown()
+
+
+def serve(host=HOST, port=PORT, manifest_path=LLMExtraction.MANIFEST_PATH, lease_seconds=LEASE_SECONDS):
+    """Serve o manifesto até todos os documentos terminarem. Retorna o relatório final."""
+    coordinator = Coordinator(LLMExtraction.load_manifest(manifest_path), lease_seconds=lease_seconds)
+    print(f"Coordenador em {host}:{port}: {coordinator.total} documentos pendentes "
+          f"({len(coordinator.finished)} já concluídos em execuções anteriores).")
+    if coordinator.done.is_set():
+        return coordinator.report()
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.coordinator = coordinator
+    threading.Thread(target=_supervise, args=(server, coordinator), daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nInterrompido: os leases ativos serão devolvidos na próxima execução.")
+    finally:
+        server.server_close()
+    report = coordinator.report()
+    print_report(report)
+    with open(REPORT_FILE, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return report
+
+
+# --- WORKER ---
+
+def _request(url, payload=None, timeout=REQUEST_TIMEOUT_SECONDS):
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+class _Heartbeat(threading.Thread):
+    """Renova o lease enquanto o lote é processado."""
+
+    def __init__(self, base_url, lease_id, interval):
+        super().__init__(daemon=True)
+        self.url = f"{base_url}/heartbeat"
+        self.lease_id = lease_id
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.lost = False
+        self.cancelled = set()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                reply = _request(self.url, {"lease": self.lease_id})
+            except OSError:
+                continue
+            if not reply.get("ok"):
+                self.lost = True
+                return
+            self.cancelled.update(reply.get("cancel", []))
+
+    def stop(self):
+        self.stopped.set()
+
+
+def process_item(router, pool, item):
+    """Extrai o schema de um documento do lote. Retorna o resultado enviado ao coordenador."""
+    t0 = time.time()
+    result = {"file": item["file"], "model": "N/A", "schema": None, "compaction": None}
+    try:
+        if "error" in item:
+            raise OSError(item["error"])
+        data = json.loads(item["document"])
+        schema_text, compaction, model_name, accepted, reason = \
+            LLMExtraction.extract_with_routing(router, pool, item["entry"], data)
+        result.update(status="success" if accepted else "invalid", model=model_name, schema=schema_text,
+                      compaction=compaction, message=reason)
+    except GenerationTimeout as e:
+        result.update(status="failed", model=getattr(e, "model_name", "N/A"), message=f"Timeout: {e}")
+    except Exception as e:
+        result.update(status="failed", model=getattr(e, "model_name", "N/A"), message=str(e))
+    result["seconds"] = time.time() - t0
+    return result
+
+
+def _request_with_retries(url, payload):
+    for attempt in range(1, MAX_CONNECT_RETRIES + 1):
+        try:
+            return _request(url, payload)
+        except (urllib.error.URLError, OSError) as e:
+            if attempt == MAX_CONNECT_RETRIES:
+                raise
+            print(f"  Coordenador indisponível ({e}); nova tentativa em {2 ** attempt}s.")
+            time.sleep(2 ** attempt)
+
+
+def run_worker(base_url, name, batch=BATCH_SIZE, models=None):
+    """Pede lotes ao coordenador, extrai os schemas e envia os resultados até acabar o trabalho."""
+    base_url = base_url.rstrip("/")
+    router = ModelRouter(models or LLMExtraction.MODELS)
+    pool = ModelPool(LLMExtraction.load_model, LLMExtraction.MODEL_MEMORY_BUDGET_GB)
+    processed = 0
+    try:
+        while True:
+            try:
+                reply = _request_with_retries(f"{base_url}/claim", {"worker": name, "batch": batch})
+            except OSError:
+                print("Coordenador não responde; encerrando o worker.")
+                break
+            if "lease" not in reply:
+                if reply.get("done"):
+                    break
+                time.sleep(reply.get("retry_after", CLAIM_RETRY_SECONDS))
+                continue
+
+            heartbeat = _Heartbeat(base_url, reply["lease"], reply.get("heartbeat_seconds", HEARTBEAT_SECONDS))
+            heartbeat.start()
+            results = []
+            for item in reply["items"]:
+                if heartbeat.lost:
+                    print("Lease perdido; enviando os resultados já prontos.")
+                    break
+                if item["file"] in heartbeat.cancelled:
+                    continue
+                results.append(process_item(router, pool, item))
+            heartbeat.stop()
+            _request_with_retries(f"{base_url}/complete", {"lease": reply["lease"], "worker": name,
+                                                          "results": results})
+            processed += len(results)
+            print(f"  {name}: {processed} documentos processados")
+    finally:
+        pool.close()
+    router.print_report()
+    return processed
+
+
+def worker_models(backend=None):
+    """Modelos do LLMExtraction, opcionalmente com outro backend (ex.: "stub" para testes)."""
+    if backend is None:
+        return LLMExtraction.MODELS
+    return [dict(spec, backend=backend) for spec in LLMExtraction.MODELS]
+
+
+def run_local(workers, batch, backend, stub_tps, port, manifest_path, lease_seconds):
+    """Coordenador neste processo e `workers` processos worker em localhost."""
+    # Dentro do pacote (comando schema-discovery) os workers rodam como módulo dele.
+    script = ["-m", __spec__.name] if __package__ else [os.path.abspath(__file__)]
+    command = [sys.executable, *script, "work", "--coordinator", f"http://127.0.0.1:{port}",
+               "--batch", str(batch)]
+    if backend:
+        command += ["--backend", backend]
+    if stub_tps:
+        command += ["--stub-tps", str(stub_tps)]
+    with open(os.devnull, "w") as devnull:
+        processes = [subprocess.Popen(command + ["--name", f"local-{i}"], stdout=devnull)
+                     for i in range(workers)]
+        try:
+            return serve("127.0.0.1", port, manifest_path, lease_seconds)
+        finally:
+            for process in processes:
+                process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extração com LLM distribuída por leases.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_parser = sub.add_parser("serve", help="Inicia o coordenador")
+    serve_parser.add_argument("--host", default=HOST)
+    serve_parser.add_argument("--port", type=int, default=PORT)
+    serve_parser.add_argument("--manifest", default=LLMExtraction.MANIFEST_PATH)
+    serve_parser.add_argument("--lease-seconds", type=float, default=LEASE_SECONDS)
+    work_parser = sub.add_parser("work", help="Inicia um worker")
+    work_parser.add_argument("--coordinator", required=True, help="URL do coordenador (http://host:porta)")
+    work_parser.add_argument("--name", default=f"{socket.gethostname()}-{os.getpid()}")
+    for p in (work_parser, sub.add_parser("local", help="Coordenador e workers locais (testes)")):
+        p.add_argument("--batch", type=int, default=BATCH_SIZE, help="Documentos por lease")
+        p.add_argument("--backend", default=None, help="Substitui o backend dos modelos (ex.: stub)")
+        p.add_argument("--stub-tps", type=float, default=None, help="Tokens/s simulados pelo backend stub")
+    local_parser = sub.choices["local"]
+    local_parser.add_argument("--workers", type=int, default=2)
+    local_parser.add_argument("--port", type=int, default=PORT)
+    local_parser.add_argument("--manifest", default=LLMExtraction.MANIFEST_PATH)
+    local_parser.add_argument("--lease-seconds", type=float, default=LEASE_SECONDS)
+    status_parser = sub.add_parser("status", help="Relatório de um coordenador em execução")
+    status_parser.add_argument("--coordinator", required=True)
+    args = parser.parse_args()
+
+    if args.command in ("serve", "local") and not os.path.exists(args.manifest):
+        print(f"❌ ERRO: O manifesto '{args.manifest}' não foi encontrado."); return
+    if args.command == "serve":
+        serve(args.host, args.port, args.manifest, args.lease_seconds)
+    elif args.command == "local":
+        run_local(args.workers, args.batch, args.backend, args.stub_tps, args.port, args.manifest,
+                  args.lease_seconds)
+    elif args.command == "work":
+        if args.stub_tps:
+            LLMBackends.STUB_DECODE_TPS = args.stub_tps
+        run_worker(args.coordinator, args.name, args.batch, worker_models(args.backend))
+    else:
+        print_report(_request(f"{args.coordinator.rstrip('/')}/status"))
+
+
+if __name__ == "__main__":
+    main()
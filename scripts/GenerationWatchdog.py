@@ -0,0 +1,196 @@
+"""
+Geração supervisionada em um processo separado.
+
+Substitui o timeout por signal.alarm do LLMExtraction, que só funciona na thread
+principal e não interrompe o código nativo da inferência. Cada GenerationWorker:
+
+- mantém um processo filho com o modelo carregado entre documentos (keep-warm);
+- acompanha a contagem de tokens gerados pelo filho (memória compartilhada);
+- mata o filho ao estourar o prazo da geração ou quando os tokens/s de uma janela
+  ficam abaixo do mínimo (travamento), e sobe outro sem reiniciar o processo pai;
+- calcula o prazo de cada geração a partir dos tokens do prompt e da saída prevista.
+
+Expõe a mesma interface dos backends (generate, tokenizer, name, draft_name), então
+o LLMExtraction o usa no lugar do backend em processo.
+"""
+import os
+import time
+import queue
+import multiprocessing as mp
+
+if __package__:
+    from .LLMBackends import load_backend, NUM_DRAFT_TOKENS
+    from .Settings import apply_settings
+else:
+    from LLMBackends import load_backend, NUM_DRAFT_TOKENS
+    from Settings import apply_settings
+
+# --- CONFIGURAÇÕES ---
+# Prazo de cada geração = base + prompt/MIN_PREFILL_TPS + saída prevista * margem/MIN_DECODE_TPS.
+DEADLINE_BASE_SECONDS = 60.0
+MIN_PREFILL_TPS = 50.0
+MIN_DECODE_TPS = 2.0
+OUTPUT_TOKENS_MARGIN = 3.0
+# Teto do prazo de uma geração, qualquer que seja a previsão.
+MAX_DEADLINE_SECONDS = 3600.0
+# Travamento: menos de STALL_MIN_TPS tokens/s em uma janela de STALL_WINDOW_SECONDS (após o prefill).
+STALL_WINDOW_SECONDS = 120.0
+STALL_MIN_TPS = 0.5
+# Intervalo de verificação do supervisor.
+POLL_SECONDS = 0.5
+# Tempo máximo para o filho carregar o modelo.
+LOAD_TIMEOUT_SECONDS = 1800.0
+# "spawn" evita herdar estado de Metal/CUDA do processo pai.
+WORKER_START_METHOD = "spawn"
+# ---------------------
+apply_settings(globals())
+
+
+class GenerationTimeout(Exception):
+    """A geração estourou o prazo ou travou; o worker foi reiniciado."""
+    pass
+
+
+def _worker_main(spec, requests, results, progress):
+    """Laço do processo filho: carrega o modelo uma vez e atende pedidos de geração."""
+    try:
+        backend = load_backend(spec.get("backend", "mlx"), spec["path"], spec.get("draft_path"),
+                               spec.get("num_draft_tokens", NUM_DRAFT_TOKENS))
+    except Exception as e:
+        results.put(("load_error", None, repr(e)))
+        return
+    results.put(("ready", None, None))
+
+    def on_token(n):
+        progress.value = n
+
+    while True:
+        request = requests.get()
+        if request is None:
+            return
+        request_id, prompt, max_tokens = request
+        progress.value = 0
+        try:
+            results.put(("done", request_id, backend.generate(prompt, max_tokens, on_token=on_token)))
+        except Exception as e:
+            results.put(("error", request_id, repr(e)))
+
+
+def generation_deadline(prompt_tokens, expected_output_tokens, max_tokens):
+    """Prazo (s) de uma geração, proporcional ao prompt e à saída prevista."""
+    output_tokens = min(max_tokens, expected_output_tokens * OUTPUT_TOKENS_MARGIN) if expected_output_tokens else max_tokens
+    seconds = DEADLINE_BASE_SECONDS + prompt_tokens / MIN_PREFILL_TPS + output_tokens / MIN_DECODE_TPS
+    return min(seconds, MAX_DEADLINE_SECONDS)
+
+
+class GenerationWorker:
+    """Processo filho supervisionado que gera com o modelo de `spec`."""
+
+    def __init__(self, spec, tokenizer):
+        self.spec = spec
+        self.name = spec["name"]
+        draft_path = spec.get("draft_path")
+        self.draft_name = os.path.basename(os.path.normpath(draft_path)) if draft_path else None
+        # O pai só precisa do tokenizer (compactação e divisão dos prompts).
+        self.tokenizer = tokenizer
+        self.context = mp.get_context(WORKER_START_METHOD)
+        self.process = None
+        self.request_id = 0
+        self.respawns = 0
+        self.kills = {"deadline": 0, "stall": 0, "crash": 0}
+        self._spawn()
+
+    def _spawn(self):
+        self.requests = self.context.Queue()
+        self.results = self.context.Queue()
+        self.progress = self.context.Value("q", 0, lock=False)
+        self.process = self.context.Process(target=_worker_main, daemon=True,
+                                            args=(self.spec, self.requests, self.results, self.progress))
+        self.process.start()
+        try:
+            kind, _, payload = self.results.get(timeout=LOAD_TIMEOUT_SECONDS)
+        except queue.Empty:
+            self._terminate()
+            raise RuntimeError(f"O worker de {self.name} não carregou o modelo em {LOAD_TIMEOUT_SECONDS:.0f}s.")
+        if kind != "ready":
+            self._terminate()
+            raise RuntimeError(f"O worker de {self.name} falhou ao carregar o modelo: {payload}")
+
+    def _terminate(self):
+        if self.process is not None and self.process.pid is not None:
+            if self.process.is_alive():
+                self.process.kill()
+            self.process.join()
+        self.process = None
+
+    def _restart(self, reason):
+        """
+        Mata o filho e sobe outro. Se o novo filho não subir, o worker fica sem processo
+        (alive=False) e quem chamou segue levantando o erro da geração original.
+        """
+        self.kills[reason] += 1
+        self._terminate()
+        print(f"  Reiniciando o worker de {self.name} ({reason}).")
+        try:
+            self._spawn()
+        except Exception as e:
+            self._terminate()
+            print(f"  ❌ ERRO: {e}")
+            return
+        self.respawns += 1
+
+    @property
+    def alive(self):
+        """False depois de um reinício que falhou (ou de close); o ModelPool recarrega o modelo."""
+        return self.process is not None
+
+    def close(self):
+        """Encerra o filho (usado quando o modelo sai da memória)."""
+        if self.process is not None and self.process.is_alive():
+            self.requests.put(None)
+            self.process.join(timeout=10)
+        self._terminate()
+
+    def generate(self, prompt, max_tokens, expected_tokens=None):
+        """
+        Gera no processo filho sob supervisão. Levanta GenerationTimeout (após reiniciar
+        o filho) se o prazo estourar ou a geração travar.
+        """
+        if not self.alive:
+            raise RuntimeError(f"O worker de {self.name} não está ativo (o último reinício falhou).")
+        prompt_tokens = len(self.tokenizer.encode(prompt))
+        deadline = generation_deadline(prompt_tokens, expected_tokens, max_tokens)
+        prefill_grace = prompt_tokens / MIN_PREFILL_TPS
+
+        self.request_id += 1
+        request_id = self.request_id
+        self.requests.put((request_id, prompt, max_tokens))
+        t0 = time.time()
+        window_start, window_tokens = t0 + prefill_grace, 0
+
+        while True:
+            try:
+                kind, message_id, payload = self.results.get(timeout=POLL_SECONDS)
+                if message_id == request_id:
+                    if kind == "done":
+                        return payload
+                    raise RuntimeError(f"Erro no worker de {self.name}: {payload}")
+            except queue.Empty:
+                pass
+
+            now = time.time()
+            if not self.process.is_alive():
+                self._restart("crash")
+                raise RuntimeError(f"O worker de {self.name} morreu durante a geração.")
+            if now - t0 > deadline:
+                self._restart("deadline")
+                raise GenerationTimeout(f"A geração excedeu o prazo de {deadline:.0f}s "
+                                        f"({prompt_tokens} tokens de prompt, saída prevista {expected_tokens}).")
+            if now - window_start >= STALL_WINDOW_SECONDS:
+                tokens = self.progress.value
+                rate = (tokens - window_tokens) / (now - window_start)
+                if rate < STALL_MIN_TPS:
+                    self._restart("stall")
+                    raise GenerationTimeout(f"A geração travou: {rate:.2f} tokens/s nos últimos "
+                                            f"{STALL_WINDOW_SECONDS:.0f}s ({tokens} tokens gerados).")
+                window_start, window_tokens = now, tokens
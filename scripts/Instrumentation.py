@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Instrumentação de desempenho compartilhada pelos scripts do pipeline.
+
+Timers (gerenciador de contexto `timer` e decorador `timed`) acumulam chamadas,
+tempo total e tempo máximo por nome. Timers de etapa (`timer(nome, stage=True)`)
+registram também bytes lidos/escritos pelo processo (contadores do sistema
+operacional), o pico de RSS e, se pedido, um snapshot do tracemalloc com as
+linhas que mais alocaram. As gerações da LLM registram tokens do prompt e da
+resposta, tempo até o primeiro token e tokens/s por modelo.
+
+Desligada (padrão), cada timer/decorador custa uma verificação de atributo.
+Ligada, o custo é uma chamada a perf_counter por entrada/saída; os timers de
+etapa leem os contadores de E/S só nas bordas da etapa. Um timer ligado custa
+menos de 1 µs; por isso ele envolve funções de um arquivo/dataset inteiro, não
+as chamadas por documento (que levam dezenas de µs). Ao final da execução
+são gravados o relatório JSON (RUN_REPORT_FILE) e o arquivo texto no formato do
+Prometheus (PROMETHEUS_FILE, para o textfile collector do node_exporter).
+
+Ativação:
+    SCHEMA_METRICS=1 python3 scripts/jsonMerge.py
+    SCHEMA_METRICS=1 SCHEMA_METRICS_TRACEMALLOC=1 python3 scripts/Pipeline.py
+    python3 scripts/Pipeline.py --metrics
+
+Uso (a partir da raiz do projeto):
+    python3 scripts/Instrumentation.py show [run_report.json]
+    python3 scripts/Instrumentation.py overhead --datasets twitter
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import argparse
+import functools
+import tracemalloc
+import multiprocessing
+from contextlib import contextmanager
+from datetime import datetime
+if __package__:
+    from .Settings import apply_settings
+else:
+    from Settings import apply_settings
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# --- CONFIGURAÇÕES ---
+ENABLE_ENV = "SCHEMA_METRICS"
+TRACEMALLOC_ENV = "SCHEMA_METRICS_TRACEMALLOC"
+RUN_REPORT_FILE = "run_report.json"
+PROMETHEUS_FILE = "run_metrics.prom"
+PROMETHEUS_PREFIX = "schema_pipeline"
+# Linhas de código (maiores alocações) guardadas em cada snapshot do tracemalloc
+TRACEMALLOC_TOP = 10
+# ---------------------
+apply_settings(globals())
+
+
+def peak_rss_bytes():
+    """Pico de memória residente do processo (0 se indisponível)."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em bytes no macOS e em KB no Linux.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def io_counters():
+    """(bytes lidos, bytes escritos) pelo processo, ou None se indisponível."""
+    try:
+        with open("/proc/self/io", "rb") as f:
+            fields = dict(line.split(b":", 1) for line in f.read().splitlines() if b":" in line)
+        return int(fields[b"rchar"]), int(fields[b"wchar"])
+    except (OSError, KeyError, ValueError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    counters = psutil.Process().io_counters()
+    return counters.read_chars if hasattr(counters, "read_chars") else counters.read_bytes, \
+        counters.write_chars if hasattr(counters, "write_chars") else counters.write_bytes
+
+
+class Metrics:
+    """Coletor de métricas do processo atual."""
+
+    def __init__(self):
+        self.enabled = False
+        self.tracemalloc = False
+        self.report_written = False
+        self.reset()
+
+    def reset(self):
+        self.started_at = time.time()
+        self.io_start = io_counters()
+        self.timers = {}    # nome -> [chamadas, segundos, máximo]
+        self.stages = []    # um registro por timer de etapa
+        self.llm = {}       # modelo -> contadores de geração
+        self.extra_io = {"bytes_read": 0, "bytes_written": 0}  # E/S de outros processos (merge)
+
+    def enable(self, trace_memory=False):
+        self.enabled = True
+        self.report_written = False
+        # Processos filhos (pools com spawn) herdam a ativação pelo ambiente.
+        os.environ[ENABLE_ENV] = "1"
+        if trace_memory:
+            self.tracemalloc = True
+            os.environ[TRACEMALLOC_ENV] = "1"
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+        if multiprocessing.parent_process() is None:
+            atexit.register(self._write_at_exit)
+
+    def add_time(self, name, seconds):
+        entry = self.timers.get(name)
+        if entry is None:
+            self.timers[name] = [1, seconds, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds > entry[2]:
+                entry[2] = seconds
+
+    def record_generation(self, model, stats):
+        """Registra uma geração (estatísticas do LLMBackends) do modelo `model`."""
+        if not self.enabled:
+            return
+        entry = self.llm.setdefault(model, {"generations": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                                            "seconds": 0.0, "ttft_seconds_sum": 0.0, "ttft_count": 0,
+                                            "ttft_seconds_max": 0.0})
+        entry["generations"] += 1
+        entry["prompt_tokens"] += stats.get("prompt_tokens", 0)
+        entry["completion_tokens"] += stats["tokens"]
+        entry["seconds"] += stats["seconds"]
+        ttft = stats.get("ttft_seconds")
+        if ttft is not None:
+            entry["ttft_seconds_sum"] += ttft
+            entry["ttft_count"] += 1
+            entry["ttft_seconds_max"] = max(entry["ttft_seconds_max"], ttft)
+
+    def export(self):
+        """Métricas coletadas, em forma serializável (para o relatório ou para outro processo)."""
+        io_now = io_counters()
+        bytes_read = bytes_written = None
+        if self.io_start is not None and io_now is not None:
+            bytes_read, bytes_written = io_now[0] - self.io_start[0], io_now[1] - self.io_start[1]
+        return {"timers": {k: list(v) for k, v in self.timers.items()},
+                "bytes_read": bytes_read, "bytes_written": bytes_written,
+                "stages": list(self.stages),
+                "llm": {k: dict(v) for k, v in self.llm.items()},
+                "peak_rss_bytes": peak_rss_bytes()}
+
+    def merge(self, exported):
+        """Incorpora métricas exportadas por outro processo (ex.: um worker do pool)."""
+        for name, (calls, seconds, maximum) in exported["timers"].items():
+            entry = self.timers.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += calls
+            entry[1] += seconds
+            entry[2] = max(entry[2], maximum)
+        self.stages.extend(exported["stages"])
+        for key in ("bytes_read", "bytes_written"):
+            if exported[key] is not None:
+                self.extra_io[key] += exported[key]
+        for model, counts in exported["llm"].items():
+            entry = self.llm.setdefault(model, dict.fromkeys(counts, 0))
+            for key, value in counts.items():
+                entry[key] = max(entry[key], value) if key == "ttft_seconds_max" else entry[key] + value
+
+    def report(self):
+        data = self.export()
+        for key, value in self.extra_io.items():
+            if value:
+                data[key] = (data[key] or 0) + value
+        peak_children = 0
+        if resource is not None:
+            peak_children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+            peak_children = peak_children if sys.platform == "darwin" else peak_children * 1024
+        data["peak_rss_bytes"] = max([data["peak_rss_bytes"], peak_children]
+                                     + [s["peak_rss_bytes"] for s in self.stages])
+        for entry in data["llm"].values():
+            entry["tokens_per_sec"] = entry["completion_tokens"] / entry["seconds"] if entry["seconds"] else 0.0
+            entry["ttft_seconds_avg"] = entry["ttft_seconds_sum"] / entry["ttft_count"] if entry["ttft_count"] else None
+        return {"started_at": datetime.fromtimestamp(self.started_at).isoformat(),
+                "wall_seconds": time.time() - self.started_at,
+                "command": " ".join(sys.argv), **data}
+
+    def write_report(self, json_path=RUN_REPORT_FILE, prom_path=PROMETHEUS_FILE):
+        report = self.report()
+        _write_atomic(json_path, json.dumps(report, indent=2, ensure_ascii=False))
+        _write_atomic(prom_path, prometheus_text(report))
+        self.report_written = True
+        return report
+
+    def _write_at_exit(self):
+        if self.enabled and not self.report_written and (self.timers or self.llm):
+            self.write_report()
+            print(f"[MÉTRICAS] Relatório salvo em: {RUN_REPORT_FILE} e {PROMETHEUS_FILE}")
+
+
+METRICS = Metrics()
+
+
+def enable(trace_memory=False):
+    METRICS.enable(trace_memory)
+
+
+@contextmanager
+def timer(name, stage=False):
+    """
+    Cronometra o bloco sob `name`. Com `stage=True`, registra também bytes
+    lidos/escritos, pico de RSS e (se ativo) um snapshot do tracemalloc.
+    """
+    if not METRICS.enabled:
+        yield
+        return
+    io_before = io_counters() if stage else None
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - t0
+        METRICS.add_time(name, seconds)
+        if stage:
+            record = {"name": name, "seconds": seconds, "bytes_read": None, "bytes_written": None,
+                      "peak_rss_bytes": peak_rss_bytes(), "pid": os.getpid()}
+            io_after = io_counters()
+            if io_before is not None and io_after is not None:
+                record["bytes_read"] = io_after[0] - io_before[0]
+                record["bytes_written"] = io_after[1] - io_before[1]
+            if METRICS.tracemalloc and tracemalloc.is_tracing():
+                record["tracemalloc"] = memory_snapshot()
+            METRICS.stages.append(record)
+
+
+def timed(name=None, stage=False):
+    """Decorador: cronometra cada chamada da função (nome padrão: módulo.função)."""
+    def decorator(func):
+        label = name or f"{_module_name(func)}.{func.__qualname__}"
+
+        if stage:
+            @functools.wraps(func)
+            def stage_wrapper(*args, **kwargs):
+                with timer(label, stage=True):
+                    return func(*args, **kwargs)
+            return stage_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return func(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                METRICS.add_time(label, time.perf_counter() - t0)
+        return wrapper
+    return decorator
+
+
+def _module_name(func):
+    """Nome do módulo da função, sem o pacote; para o script executado diretamente, o nome do arquivo."""
+    if func.__module__ != "__main__":
+        return func.__module__.rpartition(".")[2]
+    main_file = getattr(sys.modules["__main__"], "__file__", None)
+    return os.path.splitext(os.path.basename(main_file))[0] if main_file else "__main__"
+
+
+def memory_snapshot(top=TRACEMALLOC_TOP):
+    """Memória rastreada atual/pico e as linhas de código que mais alocaram."""
+    current, peak = tracemalloc.get_traced_memory()
+    stats = tracemalloc.take_snapshot().statistics("lineno")[:top]
+    return {"current_bytes": current, "peak_bytes": peak,
+            "top": [{"where": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+                     "bytes": s.size, "blocks": s.count} for s in stats]}
+
+
+def record_generation(model, stats):
+    METRICS.record_generation(model, stats)
+
+
+def call_instrumented(name, func, *args):
+    """
+    Executa func(*args) sob um timer de etapa e devolve (resultado, métricas).
+    Feita para rodar num worker de pool: as métricas coletadas nele voltam ao
+    processo principal, que as incorpora com METRICS.merge().
+    """
+    METRICS.reset()
+    with timer(name, stage=True):
+        result = func(*args)
+    return result, METRICS.export()
+
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(report):
+    """Relatório no formato texto de exposição do Prometheus."""
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        if not samples:
+            return
+        full = f"{PROMETHEUS_PREFIX}_{name}"
+        lines.append(f"# HELP {full} {help_text}")
+        lines.append(f"# TYPE {full} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{k}="{_label(v)}"' for k, v in labels.items())
+            lines.append(f"{full}{{{label_text}}} {value}" if label_text else f"{full} {value}")
+
+    timers = report["timers"]
+    metric("timer_calls_total", "counter", "Chamadas por timer.",
+           [({"name": n}, v[0]) for n, v in timers.items()])
+    metric("timer_seconds_total", "counter", "Tempo acumulado por timer.",
+           [({"name": n}, f"{v[1]:.6f}") for n, v in timers.items()])
+    metric("timer_max_seconds", "gauge", "Maior duração de uma chamada por timer.",
+           [({"name": n}, f"{v[2]:.6f}") for n, v in timers.items()])
+
+    stages = [s for s in report["stages"] if s["bytes_read"] is not None]
+    metric("stage_read_bytes_total", "counter", "Bytes lidos pelo processo durante a etapa.",
+           [({"stage": s["name"], "pid": s["pid"]}, s["bytes_read"]) for s in stages])
+    metric("stage_written_bytes_total", "counter", "Bytes escritos pelo processo durante a etapa.",
+           [({"stage": s["name"], "pid": s["pid"]}, s["bytes_written"]) for s in stages])
+    for key, direction in (("bytes_read", "lidos"), ("bytes_written", "escritos")):
+        if report[key] is not None:
+            metric(f"{key.replace('bytes_', '')}_bytes_total", "counter", f"Bytes {direction} na execução.",
+                   [({}, report[key])])
+    metric("peak_rss_bytes", "gauge", "Pico de memória residente da execução.",
+           [({}, report["peak_rss_bytes"])])
+
+    llm = report["llm"]
+    metric("llm_generations_total", "counter", "Gerações por modelo.",
+           [({"model": m}, v["generations"]) for m, v in llm.items()])
+    metric("llm_prompt_tokens_total", "counter", "Tokens de prompt por modelo.",
+           [({"model": m}, v["prompt_tokens"]) for m, v in llm.items()])
+    metric("llm_completion_tokens_total", "counter", "Tokens gerados por modelo.",
+           [({"model": m}, v["completion_tokens"]) for m, v in llm.items()])
+    metric("llm_generation_seconds_total", "counter", "Tempo de geração por modelo.",
+           [({"model": m}, f"{v['seconds']:.6f}") for m, v in llm.items()])
+    metric("llm_tokens_per_second", "gauge", "Tokens gerados por segundo de geração.",
+           [({"model": m}, f"{v['tokens_per_sec']:.3f}") for m, v in llm.items()])
+    metric("llm_ttft_seconds_avg", "gauge", "Tempo médio até o primeiro token.",
+           [({"model": m}, f"{v['ttft_seconds_avg']:.6f}") for m, v in llm.items()
+            if v["ttft_seconds_avg"] is not None])
+    metric("llm_ttft_seconds_max", "gauge", "Maior tempo até o primeiro token.",
+           [({"model": m}, f"{v['ttft_seconds_max']:.6f}") for m, v in llm.items() if v["ttft_count"]])
+    metric("run_wall_seconds", "gauge", "Duração da execução.", [({}, f"{report['wall_seconds']:.3f}")])
+    return "\n".join(lines) + "\n"
+
+
+def print_report(report):
+    """Resumo legível de um relatório (timers por tempo total, etapas e LLM)."""
+    print(f"Execução de {report['started_at']} ({report['wall_seconds']:.2f}s): {report['command']}")
+    io = (f" | lidos {report['bytes_read'] / 2**20:.1f} MB, escritos {report['bytes_written'] / 2**20:.1f} MB"
+          if report["bytes_read"] is not None else "")
+    print(f"Pico de RSS: {report['peak_rss_bytes'] / 2**20:.1f} MB{io}")
+    if report["timers"]:
+        width = max(len(n) for n in report["timers"])
+        print(f"\n{'Timer'.ljust(width)}  {'Chamadas':>9}  {'Total (s)':>10}  {'Máx (s)':>9}")
+        for name, (calls, seconds, maximum) in sorted(report["timers"].items(), key=lambda kv: -kv[1][1]):
+            print(f"{name.ljust(width)}  {calls:9d}  {seconds:10.3f}  {maximum:9.3f}")
+    for s in report["stages"]:
+        io = (f" | lidos {s['bytes_read'] / 2**20:.1f} MB, escritos {s['bytes_written'] / 2**20:.1f} MB"
+              if s["bytes_read"] is not None else "")
+        print(f"Etapa {s['name']}: {s['seconds']:.2f}s | RSS {s['peak_rss_bytes'] / 2**20:.1f} MB{io}")
+    for model, v in report["llm"].items():
+        ttft = f"{v['ttft_seconds_avg']:.2f}s" if v["ttft_seconds_avg"] is not None else "-"
+        print(f"LLM {model}: {v['generations']} gerações | prompt {v['prompt_tokens']} tokens | "
+              f"resposta {v['completion_tokens']} tokens | {v['tokens_per_sec']:.1f} tokens/s | TTFT médio {ttft}")
+
+
+def measure_overhead(dataset, repeats=3):
+    """Tempo de coleta do jsonMerge sobre um dataset com a instrumentação desligada e ligada."""
+    if __package__:
+        from . import jsonMerge
+    else:
+        import jsonMerge
+
+    dir_path = os.path.join(jsonMerge.SCHEMA_SOURCE_DIR, dataset)
+
+    def best_of():
+        best = float("inf")
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            with timer("overhead.collect_stats", stage=True):
+                jsonMerge.collect_stats(dir_path)
+            best = min(best, time.perf_counter() - t0)
+        return best
+
+    with open(os.devnull, "w") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            jsonMerge.collect_stats(dir_path)  # aquece o cache de arquivos do sistema
+            METRICS.enabled = False
+            off = best_of()
+            METRICS.enabled = True
+            on = best_of()
+        finally:
+            sys.stdout = stdout
+            METRICS.enabled = False
+    return off, on
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatórios e custo da instrumentação de desempenho.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="Imprime o resumo de um relatório JSON")
+    show.add_argument("report", nargs="?", default=RUN_REPORT_FILE)
+    overhead = sub.add_parser("overhead", help="Mede o custo da instrumentação na coleta do jsonMerge")
+    overhead.add_argument("--datasets", required=True, help="Datasets separados por vírgula")
+    overhead.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.command == "show":
+        try:
+            with open(args.report, "r", encoding="utf-8") as f:
+                print_report(json.load(f))
+        except FileNotFoundError:
+            print(f"❌ ERRO: O relatório '{args.report}' não foi encontrado.")
+        return
+
+    # Os módulos instrumentados importam `Instrumentation`, não este `__main__`.
+    if __package__:
+        from . import Instrumentation
+    else:
+        import Instrumentation
+    for dataset in [d.strip() for d in args.datasets.split(",") if d.strip()]:
+        off, on = Instrumentation.measure_overhead(dataset, args.repeats)
+        print(f"{dataset}: desligada {off:.4f}s | ligada {on:.4f}s | custo {(on - off) / off:+.2%}")
+
+
+if os.environ.get(ENABLE_ENV) == "1":
+    enable(trace_memory=os.environ.get(TRACEMALLOC_ENV) == "1")
+
+
+if __name__ == "__main__":
+    main()
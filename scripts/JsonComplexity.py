@@ -2,9 +2,18 @@ import os
 import json
 import csv
 from collections.abc import Mapping, Sequence
+if __package__:
+    from .Instrumentation import timed
+    from .Settings import apply_settings
+else:
+    from Instrumentation import timed
+    from Settings import apply_settings
 
 DATASET_DIR = "processed"
 MANIFEST_FILE = "manifest.csv"
+# Saídas da LLM ficam dentro de DATASET_DIR, mas não são documentos a analisar.
+SCHEMA_DOCUMENTS_DIRNAME = "schema_documents"
+apply_settings(globals())
 
 """
 Analisa a complexidade dos arquivos JSON em um diretório e gera um manifesto CSV.
@@ -60,10 +69,13 @@ def analyze_json(obj):
     }
 
 
+@timed()
 def build_manifest():
     rows = []
 
-    for root, _, files in os.walk(DATASET_DIR):
+    for root, dirs, files in os.walk(DATASET_DIR):
+        if SCHEMA_DOCUMENTS_DIRNAME in dirs:
+            dirs.remove(SCHEMA_DOCUMENTS_DIRNAME)
         for fname in files:
             if fname.endswith(".json"):
                 fpath = os.path.join(root, fname)
@@ -1,16 +1,47 @@
+#!/usr/bin/env python3
+"""
+Schemas mestres tradicionais (genson) de cada dataset, a partir dos arquivos
+aprovados no manifesto.
+
+A geração é incremental: o schema genson de cada documento fica em cache,
+endereçado pelo hash do conteúdo (GENSON_CACHE_DIR/documents/), e o estado do
+builder de cada dataset é salvo junto com a lista de arquivos já incorporados
+(tamanho, mtime e hash de cada um). Quando o manifesto só ganhou arquivos novos,
+o builder salvo é restaurado com add_schema e apenas os novos documentos são
+lidos. Se algum arquivo incorporado mudou ou saiu do manifesto, o builder é
+refeito a partir dos schemas por documento em cache (só os documentos alterados
+são lidos de novo). O resultado é o mesmo da geração do zero, a menos da ordem
+das propriedades (as vistas primeiro em arquivos novos vêm depois).
+
+Uso (a partir da raiz do projeto):
+    python3 scripts/JsonSchema.py
+    python3 scripts/JsonSchema.py --datasets twitter --full   # ignora o cache
+"""
 import os
 import json
 import csv
+import time
+import hashlib
+import argparse
 from pathlib import Path
 from collections import defaultdict
-import genson # A biblioteca que fará o trabalho pesado
+if __package__:
+    from .Instrumentation import timed
+    from .Settings import apply_settings
+else:
+    from Instrumentation import timed
+    from Settings import apply_settings
 
 # --- CONFIGURAÇÕES ---
 MANIFEST_PATH = "manifest.csv"
 
 # O diretório onde os schemas mestres gerados por este método serão salvos.
 SCHEMA_OUTPUT_DIR = "traditional_schemas/"
+
+# Cache da geração incremental: schemas por documento e estado do builder por dataset.
+GENSON_CACHE_DIR = ".genson_cache/"
 # ---------------------
+apply_settings(globals())
 
 
 def load_approved_files_from_manifest(manifest_path):
@@ -46,10 +77,12 @@ def load_approved_files_from_manifest(manifest_path):
     return approved_files
 
 
+@timed()
 def generate_master_schema_for_directory(json_file_paths):
     """
     Usa a biblioteca 'genson' para gerar um único schema a partir de uma lista de arquivos JSON.
     """
+    import genson  # import tardio: só esta etapa precisa do genson
     builder = genson.SchemaBuilder()
     total_files = len(json_file_paths)
     
@@ -70,16 +103,175 @@ def generate_master_schema_for_directory(json_file_paths):
     return builder.to_schema()
 
 
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _write_json_atomic(path, data):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(data, ensure_ascii=False))  # json.dumps usa o codificador em C; json.dump não
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _document_cache_path(digest, cache_dir):
+    return os.path.join(cache_dir, "documents", digest[:2], f"{digest}.json")
+
+
+def _state_path(dataset_name, cache_dir):
+    return os.path.join(cache_dir, f"{dataset_name}.json")
+
+
+def document_schema(file_path, digest, cache_dir=GENSON_CACHE_DIR):
+    """
+    Schema genson de um documento, lido do cache pelo hash do conteúdo ou gerado
+    a partir do arquivo e guardado no cache. Retorna (schema, True se o arquivo foi lido).
+    """
+    cache_path = _document_cache_path(digest, cache_dir)
+    schema = _read_json(cache_path)
+    if schema is not None:
+        return schema, False
+    import genson  # import tardio: só esta etapa precisa do genson
+    with open(file_path, "r", encoding="utf-8-sig") as f:
+        data = json.load(f)
+    builder = genson.SchemaBuilder()
+    builder.add_object(data)
+    schema = builder.to_schema()
+    _write_json_atomic(cache_path, schema)
+    return schema, True
+
+
+def _fingerprint(file_path, known):
+    """
+    [tamanho, mtime_ns, hash do conteúdo] de um arquivo. Se tamanho e mtime batem
+    com `known`, o hash salvo é reaproveitado sem ler o arquivo.
+    """
+    st = os.stat(file_path)
+    if known and known[0] == st.st_size and known[1] == st.st_mtime_ns:
+        return list(known)
+    with open(file_path, "rb") as f:
+        return [st.st_size, st.st_mtime_ns, _digest(f.read())]
+
+
+@timed()
+def generate_master_schema_incremental(dataset_name, json_file_paths, cache_dir=GENSON_CACHE_DIR):
+    """
+    Mesmo resultado de generate_master_schema_for_directory (a menos da ordem
+    das propriedades), reaproveitando o estado salvo do builder do dataset: só os
+    arquivos novos (ou alterados) são lidos.
+    Retorna (schema, nº de arquivos lidos).
+    """
+    import genson  # import tardio: só esta etapa precisa do genson
+    state_path = _state_path(dataset_name, cache_dir)
+    state = _read_json(state_path) or {}
+    folded = {entry[0]: entry[1:] for entry in state.get("files", [])}
+
+    files = []  # [caminho, tamanho, mtime_ns, hash] de cada arquivo existente, na ordem do manifesto
+    for file_path in json_file_paths:
+        try:
+            files.append([file_path] + _fingerprint(file_path, folded.get(file_path)))
+        except FileNotFoundError:
+            print(f"\n       Aviso: Arquivo listado no manifesto não foi encontrado no disco: {file_path}")
+
+    # O builder salvo só serve se todos os arquivos incorporados continuam no manifesto, com o mesmo conteúdo.
+    current = {entry[0]: entry[1:] for entry in files}
+    reusable = "schema" in state and all(path in current and current[path][2] == fingerprint[2]
+                                         for path, fingerprint in folded.items())
+    builder = genson.SchemaBuilder()
+    if reusable:
+        builder.add_schema(state["schema"])
+        pending = [entry for entry in files if entry[0] not in folded]
+        incorporated = [entry for entry in files if entry[0] in folded]
+    else:
+        pending = files
+        incorporated = []
+    print(f"      -> {len(files) - len(pending)} arquivos já incorporados, {len(pending)} a incorporar"
+          f"{'' if reusable or not folded else ' (builder refeito a partir do cache)'}.")
+
+    read = 0
+    for i, (file_path, size, mtime_ns, digest) in enumerate(pending):
+        print(f"      -> Incorporando arquivo ({i+1}/{len(pending)}): {os.path.basename(file_path)}", end='\r')
+        # Inválidos também entram na lista, para não serem relidos enquanto não mudarem.
+        incorporated.append([file_path, size, mtime_ns, digest])
+        try:
+            schema, was_read = document_schema(file_path, digest, cache_dir)
+            builder.add_schema(schema)
+            read += was_read
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            print(f"\n        Aviso: JSON inválido pulado: {file_path}")
+        except Exception as e:
+            incorporated.pop()
+            print(f"\n       Erro inesperado ao ler o arquivo {file_path}: {e}")
+
+    schema = builder.to_schema()
+    _write_json_atomic(state_path, {"files": incorporated, "schema": schema})
+    print(f"\n      -> Geração do schema concluída para {len(files)} arquivos ({read} documentos lidos).")
+    return schema, read
+
+
+@timed()
+def process_dataset(dataset_name, file_list, full=False):
+    """
+    Gera e salva o schema mestre tradicional de um dataset a partir da lista de
+    arquivos aprovados. Retorna o caminho salvo, ou None em caso de falha.
+    Com `full`, ignora o cache e relê todos os arquivos.
+    """
+    print(f"\n--- Processando o dataset: {dataset_name} ---")
+
+    if not file_list:
+        print("   -> Nenhum arquivo aprovado para este dataset. Pulando.")
+        return None
+
+    print(f"   -> Encontrados {len(file_list)} arquivos aprovados. Gerando o schema mestre...")
+
+    # Gera o schema mestre usando a lista de arquivos filtrada
+    t0 = time.time()
+    if full:
+        master_schema = generate_master_schema_for_directory(file_list)
+    else:
+        master_schema, _ = generate_master_schema_incremental(dataset_name, file_list)
+    print(f"   -> Schema gerado em {time.time() - t0:.2f}s.")
+
+    output_filename = f"{dataset_name}_traditional_schema.json"
+    output_path = os.path.join(SCHEMA_OUTPUT_DIR, output_filename)
+
+    try:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(master_schema, f, indent=2, ensure_ascii=False)
+        print(f"   ->  Schema mestre salvo com sucesso em: '{output_path}'")
+        return output_path
+    except Exception as e:
+        print(f"\n   ->  Erro ao salvar o arquivo final para '{dataset_name}': {e}")
+        return None
+
+
 def main():
     """
     Gera um schema mestre tradicional para cada dataset, usando apenas os arquivos
     marcados como 'true' no manifesto.
     """
+    parser = argparse.ArgumentParser(description="Gera os schemas mestres tradicionais (genson) de cada dataset.")
+    parser.add_argument("--datasets", default=None, help="Datasets separados por vírgula (padrão: todos)")
+    parser.add_argument("--full", action="store_true", help="Ignora o cache e relê todos os arquivos")
+    args = parser.parse_args()
+
     # Garante que o diretório de saída exista
     os.makedirs(SCHEMA_OUTPUT_DIR, exist_ok=True)
     
     # Carrega a lista de arquivos a serem processados a partir do manifesto
     approved_files_by_dataset = load_approved_files_from_manifest(MANIFEST_PATH)
+    if args.datasets:
+        selected = {d.strip() for d in args.datasets.split(",") if d.strip()}
+        approved_files_by_dataset = {d: f for d, f in approved_files_by_dataset.items() if d in selected}
 
     if not approved_files_by_dataset:
         print("\nNenhum arquivo aprovado encontrado. Encerrando o processo.")
@@ -88,26 +280,7 @@ def main():
     print("\nIniciando a geração de schemas tradicionais...")
     
     for dataset_name, file_list in approved_files_by_dataset.items():
-        print(f"\n--- Processando o dataset: {dataset_name} ---")
-        
-        if not file_list:
-            print("   -> Nenhum arquivo aprovado para este dataset. Pulando.")
-            continue
-            
-        print(f"   -> Encontrados {len(file_list)} arquivos aprovados. Gerando o schema mestre...")
-        
-        # Gera o schema mestre usando a lista de arquivos filtrada
-        master_schema = generate_master_schema_for_directory(file_list)
-        
-        output_filename = f"{dataset_name}_traditional_schema.json"
-        output_path = os.path.join(SCHEMA_OUTPUT_DIR, output_filename)
-        
-        try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(master_schema, f, indent=2, ensure_ascii=False)
-            print(f"   ->  Schema mestre salvo com sucesso em: '{output_path}'")
-        except Exception as e:
-            print(f"\n   ->  Erro ao salvar o arquivo final para '{dataset_name}': {e}")
+        process_dataset(dataset_name, file_list, args.full)
         
     print("\n--- Processo Finalizado ---")
 
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Camada de backends de geração usada pelo LLMExtraction.
+
+Cada backend carrega um modelo (e, opcionalmente, um modelo de rascunho) e expõe
+`generate(prompt, max_tokens, on_token=None) -> (texto, estatísticas)`, onde
+`on_token(n)` recebe o total de tokens gerados até o momento:
+
+- "mlx": mlx_lm (Apple Silicon). Com `draft_path`, usa a decodificação
+  especulativa nativa do mlx_lm (o modelo pequeno propõe tokens, o grande verifica).
+- "transformers": Hugging Face em CPU/GPU. Com `draft_path`, usa o laço
+  especulativo guloso deste módulo (speculative_generate), que produz exatamente a
+  mesma saída da decodificação gulosa do modelo alvo.
+- "stub": sem modelo; responde com o schema do genson para o documento do prompt.
+  Determinístico e sem dependências pesadas, serve para benchmarks e testes do
+  pipeline em volta da LLM.
+
+Rascunho e alvo precisam compartilhar o tokenizer (mesma família de modelos).
+As estatísticas de cada geração incluem tokens/s e taxa de aceitação do rascunho.
+
+Uso (a partir da raiz do projeto), para comparar um par rascunho/alvo em CPU com
+modelos pequenos:
+    python3 scripts/LLMBackends.py --pair cpu-tiny --document processed/twitter/documents/x.json
+"""
+import os
+import csv
+import json
+import time
+import argparse
+from datetime import datetime
+if __package__:
+    from .Settings import apply_settings
+else:
+    from Settings import apply_settings
+
+# --- CONFIGURAÇÕES ---
+# Tokens propostos pelo rascunho a cada rodada de verificação.
+NUM_DRAFT_TOKENS = 4
+# Pares rascunho/alvo disponíveis. O rascunho precisa usar o mesmo tokenizer do alvo.
+DRAFT_PAIRS = {
+    "qwen-coder-mlx": {
+        "backend": "mlx",
+        "target_path": "/Users/thiagoalmeida/.lmstudio/models/lmstudio-community/Qwen2.5-Coder-14B-Instruct-MLX-4bit/",
+        "draft_path": "/Users/thiagoalmeida/.lmstudio/models/lmstudio-community/Qwen2.5-Coder-1.5B-Instruct-MLX-4bit/",
+        "num_draft_tokens": NUM_DRAFT_TOKENS,
+    },
+    # Par pequeno para testar o laço especulativo em CPU.
+    "cpu-tiny": {
+        "backend": "transformers",
+        "target_path": "HuggingFaceTB/SmolLM2-360M-Instruct",
+        "draft_path": "HuggingFaceTB/SmolLM2-135M-Instruct",
+        "num_draft_tokens": NUM_DRAFT_TOKENS,
+    },
+}
+DECODING_LOG_FILE = "decoding_log.csv"
+# Caracteres por token usados pelo backend "stub" para contar tokens.
+STUB_CHARS_PER_TOKEN = 4
+# Velocidade de decodificação simulada pelo "stub" (tokens/s); None responde na hora.
+# Serve para testar a distribuição de trabalho como se houvesse um acelerador.
+STUB_DECODE_TPS = None
+# ---------------------
+apply_settings(globals())
+
+
+def new_generation_stats():
+    return {"tokens": 0, "seconds": 0.0, "draft_proposed": 0, "draft_accepted": 0,
+            "prompt_tokens": 0, "ttft_seconds": None}
+
+
+def summarize_stats(stats):
+    """Acrescenta tokens/s e taxa de aceitação às estatísticas de uma ou mais gerações."""
+    summary = dict(stats)
+    summary["tokens_per_sec"] = stats["tokens"] / stats["seconds"] if stats["seconds"] else 0.0
+    summary["acceptance_rate"] = (stats["draft_accepted"] / stats["draft_proposed"]
+                                  if stats["draft_proposed"] else None)
+    return summary
+
+
+def save_decoding_log(log_path, model_name, draft_name, stats):
+    """Registra (append) tokens, tokens/s e aceitação do rascunho de uma geração."""
+    log_exists = os.path.exists(log_path)
+    summary = summarize_stats(stats)
+    with open(log_path, "a", newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        if not log_exists:
+            writer.writerow(["timestamp", "model", "draft_model", "tokens", "seconds", "tokens_per_sec",
+                             "draft_proposed", "draft_accepted", "acceptance_rate"])
+        rate = summary["acceptance_rate"]
+        writer.writerow([datetime.now().isoformat(), model_name, draft_name or "", summary["tokens"],
+                         f"{summary['seconds']:.3f}", f"{summary['tokens_per_sec']:.2f}",
+                         summary["draft_proposed"], summary["draft_accepted"],
+                         f"{rate:.3f}" if rate is not None else ""])
+
+
+def speculative_generate(target_argmax, draft_argmax, prompt_ids, max_tokens, num_draft=NUM_DRAFT_TOKENS,
+                         eos_ids=(), stats=None, on_token=None):
+    """
+    Decodificação especulativa gulosa.
+
+    `target_argmax(ids, n)` e `draft_argmax(ids, n)` devolvem as previsões gulosas
+    do próximo token após cada um dos n últimos prefixos de `ids` (o último elemento
+    é a previsão após a sequência inteira). A cada rodada o rascunho propõe até
+    `num_draft` tokens; o alvo verifica todos em uma única chamada, aceita o maior
+    prefixo em que concorda e acrescenta o próprio token na primeira divergência
+    (ou um token extra se aceitar tudo). A saída é idêntica à geração gulosa do alvo.
+    Retorna os ids gerados; `stats` (se informado) acumula propostos e aceitos e
+    `on_token(n)` é chamado com o total de tokens gerados a cada rodada.
+    """
+    ids = list(prompt_ids)
+    generated = []
+    eos_ids = set(eos_ids)
+    while len(generated) < max_tokens:
+        k = min(num_draft, max_tokens - len(generated) - 1)
+        draft = []
+        for _ in range(k):
+            token = draft_argmax(ids + draft, 1)[-1]
+            draft.append(token)
+            if token in eos_ids:
+                break
+
+        verified = target_argmax(ids + draft, len(draft) + 1)
+        accepted = 0
+        while accepted < len(draft) and draft[accepted] == verified[accepted]:
+            accepted += 1
+        new_tokens = draft[:accepted] + [verified[accepted]]
+        if stats is not None:
+            stats["draft_proposed"] += len(draft)
+            stats["draft_accepted"] += accepted
+
+        for token in new_tokens:
+            generated.append(token)
+            ids.append(token)
+            if token in eos_ids or len(generated) >= max_tokens:
+                return generated
+        if on_token is not None:
+            on_token(len(generated))
+    return generated
+
+
+class _ProgressStreamer:
+    """Streamer do transformers que só repassa a contagem de tokens gerados."""
+
+    def __init__(self, on_token):
+        self.on_token = on_token
+        self.tokens = None  # a primeira chamada de put() traz o prompt
+
+    def put(self, value):
+        if self.tokens is None:
+            self.tokens = 0
+            return
+        self.tokens += value.numel()
+        self.on_token(self.tokens)
+
+    def end(self):
+        pass
+
+
+class MLXBackend:
+    """Backend mlx_lm, com decodificação especulativa nativa quando há rascunho."""
+
+    # O tokenizer vem do diretório do modelo (o LLMExtraction o carrega no processo pai).
+    has_tokenizer = True
+
+    def __init__(self, model_path, draft_path=None, num_draft_tokens=NUM_DRAFT_TOKENS):
+        from mlx_lm import load
+
+        self.model, self.tokenizer = load(model_path)
+        self.draft_model = None
+        if draft_path:
+            self.draft_model, _ = load(draft_path)
+        self.num_draft_tokens = num_draft_tokens
+
+    def generate(self, prompt, max_tokens, on_token=None):
+        from mlx_lm import stream_generate
+
+        stats = new_generation_stats()
+        kwargs = {}
+        if self.draft_model is not None:
+            kwargs = {"draft_model": self.draft_model, "num_draft_tokens": self.num_draft_tokens}
+
+        t0 = time.time()
+        pieces, target_tokens = [], 0
+        for response in stream_generate(self.model, self.tokenizer, prompt, max_tokens=max_tokens, **kwargs):
+            if stats["ttft_seconds"] is None:
+                stats["ttft_seconds"] = time.time() - t0
+                stats["prompt_tokens"] = getattr(response, "prompt_tokens", 0)
+            pieces.append(response.text)
+            stats["tokens"] += 1
+            if getattr(response, "from_draft", False):
+                stats["draft_accepted"] += 1
+            else:
+                target_tokens += 1
+            if on_token is not None:
+                on_token(stats["tokens"])
+        stats["seconds"] = time.time() - t0
+        if self.draft_model is not None:
+            # O mlx_lm só marca os tokens aceitos; cada rodada termina com um token do
+            # alvo e propõe até num_draft_tokens, então os propostos são estimados.
+            stats["draft_proposed"] = target_tokens * self.num_draft_tokens
+        return "".join(pieces), stats
+
+
+class TransformersBackend:
+    """
+    Backend Hugging Face transformers (CPU por padrão). Com rascunho, gera pelo
+    laço especulativo guloso; sem rascunho, pela decodificação gulosa do generate().
+    O laço recalcula o prefixo a cada chamada (sem cache de KV): serve para medir
+    aceitação e testar pares pequenos em CPU, não para produção.
+    """
+
+    has_tokenizer = True
+
+    def __init__(self, model_path, draft_path=None, num_draft_tokens=NUM_DRAFT_TOKENS, device="cpu"):
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        self.torch = torch
+        self.device = device
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.model = AutoModelForCausalLM.from_pretrained(model_path).to(device).eval()
+        self.draft_model = None
+        if draft_path:
+            self.draft_model = AutoModelForCausalLM.from_pretrained(draft_path).to(device).eval()
+        self.num_draft_tokens = num_draft_tokens
+
+    def _argmax(self, model):
+        def argmax(ids, n):
+            with self.torch.no_grad():
+                logits = model(self.torch.tensor([ids], device=self.device)).logits[0, -n:]
+            return logits.argmax(dim=-1).tolist()
+        return argmax
+
+    def generate(self, prompt, max_tokens, on_token=None):
+        stats = new_generation_stats()
+        prompt_ids = self.tokenizer.encode(prompt)
+        stats["prompt_tokens"] = len(prompt_ids)
+        t0 = time.time()
+
+        def progress(n):
+            if stats["ttft_seconds"] is None:
+                stats["ttft_seconds"] = time.time() - t0
+            if on_token is not None:
+                on_token(n)
+
+        if self.draft_model is not None:
+            eos = self.tokenizer.eos_token_id
+            eos_ids = eos if isinstance(eos, list) else [eos]
+            output_ids = speculative_generate(self._argmax(self.model), self._argmax(self.draft_model),
+                                              prompt_ids, max_tokens, self.num_draft_tokens, eos_ids, stats,
+                                              progress)
+        else:
+            with self.torch.no_grad():
+                output = self.model.generate(self.torch.tensor([prompt_ids], device=self.device),
+                                             max_new_tokens=max_tokens, do_sample=False,
+                                             streamer=_ProgressStreamer(progress))
+            output_ids = output[0, len(prompt_ids):].tolist()
+        stats["seconds"] = time.time() - t0
+        stats["tokens"] = len(output_ids)
+        if stats["ttft_seconds"] is None and output_ids:
+            # Geração terminada na primeira rodada: o primeiro token saiu junto com o último.
+            stats["ttft_seconds"] = stats["seconds"]
+        return self.tokenizer.decode(output_ids, skip_special_tokens=True), stats
+
+
+class StubBackend:
+    """
+    Backend determinístico: extrai o documento do prompt de extração e responde
+    com o schema gerado pelo genson, como se fosse a saída do modelo. Os tokens são
+    estimados em STUB_CHARS_PER_TOKEN caracteres por token.
+    """
+
+    has_tokenizer = False
+
+    def __init__(self, model_path=None, draft_path=None, num_draft_tokens=NUM_DRAFT_TOKENS):
+        self.tokenizer = None
+
+    def generate(self, prompt, max_tokens, on_token=None):
+        from genson import SchemaBuilder
+
+        stats = new_generation_stats()
+        stats["prompt_tokens"] = len(prompt) // STUB_CHARS_PER_TOKEN
+        t0 = time.time()
+        builder = SchemaBuilder()
+        start = prompt.find("```json\n")
+        try:
+            document, _ = json.JSONDecoder().raw_decode(prompt, start + len("```json\n"))
+            builder.add_object(document)
+        except (ValueError, IndexError):
+            builder.add_object({})
+        text = json.dumps(builder.to_schema(), indent=2)[:max_tokens * STUB_CHARS_PER_TOKEN] + "\n```"
+        stats["tokens"] = len(text) // STUB_CHARS_PER_TOKEN
+        if STUB_DECODE_TPS:
+            time.sleep(stats["tokens"] / STUB_DECODE_TPS)
+        stats["seconds"] = stats["ttft_seconds"] = time.time() - t0
+        if on_token is not None:
+            on_token(stats["tokens"])
+        return text, stats
+
+
+BACKENDS = {
+    "mlx": MLXBackend,
+    "transformers": TransformersBackend,
+    "stub": StubBackend,
+}
+
+
+def load_backend(backend, model_path, draft_path=None, num_draft_tokens=NUM_DRAFT_TOKENS):
+    """Instancia o backend `backend` ("mlx", "transformers" ou "stub") para o modelo."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconhecido: {backend} (disponíveis: {', '.join(BACKENDS)})")
+    return BACKENDS[backend](model_path, draft_path=draft_path, num_draft_tokens=num_draft_tokens)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara a geração com e sem decodificação especulativa.")
+    parser.add_argument("--pair", default="cpu-tiny", choices=sorted(DRAFT_PAIRS), help="Par rascunho/alvo")
+    parser.add_argument("--document", required=True, help="Documento JSON usado no prompt de extração")
+    parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument("--num-draft", type=int, default=None, help="Tokens propostos por rodada")
+    args = parser.parse_args()
+
+    if __package__:
+        from .PromptCompaction import compact_prompt
+    else:
+        from PromptCompaction import compact_prompt
+
+    pair = DRAFT_PAIRS[args.pair]
+    num_draft = args.num_draft or pair["num_draft_tokens"]
+    with open(args.document, "r", encoding="utf-8") as f:
+        prompt, _ = compact_prompt(json.load(f), measure_baseline=False)
+
+    results = {}
+    for label, draft_path in (("alvo", None), ("especulativo", pair["draft_path"])):
+        backend = load_backend(pair["backend"], pair["target_path"], draft_path, num_draft)
+        text, stats = backend.generate(prompt, args.max_tokens)
+        results[label] = (text, summarize_stats(stats))
+        summary = results[label][1]
+        rate = summary["acceptance_rate"]
+        print(f"{label}: {summary['tokens']} tokens em {summary['seconds']:.2f}s "
+              f"({summary['tokens_per_sec']:.1f} tokens/s)"
+              + (f" | aceitação do rascunho: {rate:.1%}" if rate is not None else ""))
+
+    speedup = results["especulativo"][1]["tokens_per_sec"] / max(results["alvo"][1]["tokens_per_sec"], 1e-9)
+    print(f"Aceleração: {speedup:.2f}x | saídas idênticas: {results['alvo'][0] == results['especulativo'][0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,38 @@ import os
 import csv
 import json
 import random
-import signal
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path  
-from mlx_lm import load, generate
+
+if __package__:
+    from .LLMBackends import BACKENDS, load_backend, save_decoding_log, summarize_stats, DRAFT_PAIRS, DECODING_LOG_FILE
+    from .GenerationWatchdog import GenerationWorker, GenerationTimeout
+    from .JsonComplexity import analyze_json
+    from .PromptCompaction import compact_prompt, save_compaction_log, load_tokenizer, COMPACTION_LOG_FILE
+    from .SchemaChunking import split_document, stitch_schemas
+    from . import jsonMerge
+    from . import SchemaStore
+    from .SchemaConvergence import ConvergenceTracker, CONVERGENCE_PATIENCE, CONVERGENCE_TOLERANCE
+    from .ModelRouter import ModelRouter, ModelPool, validate_schema_text, predict_tokens
+    from .Instrumentation import timed, record_generation
+    from .Settings import apply_settings
+else:
+    from LLMBackends import BACKENDS, load_backend, save_decoding_log, summarize_stats, DRAFT_PAIRS, DECODING_LOG_FILE
+    from GenerationWatchdog import GenerationWorker, GenerationTimeout
+    from JsonComplexity import analyze_json
+    from PromptCompaction import compact_prompt, save_compaction_log, load_tokenizer, COMPACTION_LOG_FILE
+    from SchemaChunking import split_document, stitch_schemas
+    import jsonMerge
+    import SchemaStore
+    from SchemaConvergence import ConvergenceTracker, CONVERGENCE_PATIENCE, CONVERGENCE_TOLERANCE
+    from ModelRouter import ModelRouter, ModelPool, validate_schema_text, predict_tokens
+    from Instrumentation import timed, record_generation
+    from Settings import apply_settings
 
 # --- CONFIGURAÇÕES ---
 MANIFEST_PATH = "manifest.csv"
@@ -13,20 +41,141 @@ OUTPUT_DIR = "processed/schema_documents/"
 LOG_FILE = "generation_log.csv"
 MODEL_PATH_LOW = "/Users/thiagoalmeida/.lmstudio/models/mlx-community/gemma-3-4b-it-qat-4bit/"
 MODEL_PATH_HIGH = "/Users/thiagoalmeida/.lmstudio/models/lmstudio-community/Qwen2.5-Coder-14B-Instruct-MLX-4bit/"
+# Decodificação especulativa: o modelo grande é verificado contra um rascunho pequeno
+# da mesma família (ver DRAFT_PAIRS em LLMBackends; o Gemma não serve de rascunho
+# para o Qwen porque os tokenizers são diferentes).
+SPECULATIVE_DECODING = False
+SPECULATIVE_PAIR = DRAFT_PAIRS["qwen-coder-mlx"]
+# Os caminhos acima entram em MODELS: as substituições da configuração são
+# aplicadas antes de montar a lista (e de novo no fim do bloco, para o restante).
+apply_settings(globals())
+# Modelos disponíveis, do menor para o maior. O roteador usa memória, velocidades
+# (tokens/s de prefill e decode) e limites de capacidade para escolher e escalar.
+MODELS = [
+    {"name": "Gemma 3-4B (MLX)", "path": MODEL_PATH_LOW, "backend": "mlx", "memory_gb": 3.5,
+     "prefill_tps": 900.0, "decode_tps": 45.0, "max_keys": 300, "max_depth": 6, "max_size_bytes": 60_000},
+    {"name": "Qwen 2.5-Coder 14B (MLX)", "path": MODEL_PATH_HIGH, "backend": "mlx",
+     "memory_gb": 9.0 + (1.0 if SPECULATIVE_DECODING else 0.0),
+     "prefill_tps": 250.0, "decode_tps": 14.0, "max_keys": None, "max_depth": None, "max_size_bytes": None,
+     "draft_path": SPECULATIVE_PAIR["draft_path"] if SPECULATIVE_DECODING else None,
+     "num_draft_tokens": SPECULATIVE_PAIR["num_draft_tokens"]},
+]
+# Memória (GB) que os modelos residentes podem ocupar juntos.
+MODEL_MEMORY_BUDGET_GB = 16.0
+ROUTING_REPORT_FILE = "routing_report.json"
 MAX_TOKENS = 8192
-# Se um arquivo demorar mais que isso, provavelmente está em loop.
-GENERATION_TIMEOUT_SECONDS = 10000
+# Orçamento de tokens do prompt por modelo: a compactação para no primeiro nível que cabe.
+DEFAULT_PROMPT_TOKEN_BUDGET = 8192
+PROMPT_TOKEN_BUDGETS = {
+    "Gemma 3-4B (MLX)": 6144,
+    "Qwen 2.5-Coder 14B (MLX)": 8192,
+}
+# Mede também os tokens do prompt antigo (indent=2) para registrar a economia.
+LOG_COMPACTION_BASELINE = True
+# Documentos que não cabem no orçamento nem compactados são divididos em subárvores.
+CHUNKED_EXTRACTION = True
+# Gerações simultâneas de pedaços. O MLX usa um único modelo por processo, então 1;
+# backends que atendem requisições concorrentes podem usar mais.
+CHUNK_WORKERS = 1
+# Gera em um processo filho supervisionado (GenerationWatchdog): prazo proporcional
+# à saída prevista, detecção de travamento e reinício do filho sem reiniciar o pai.
+# Os prazos e limites ficam nas configurações do GenerationWatchdog.
+ISOLATED_GENERATION = True
+# Amostragem adaptativa: para de consultar um dataset quando CONVERGENCE_PATIENCE
+# schemas seguidos não mudam a fusão (ver SchemaConvergence).
+ADAPTIVE_SAMPLING = False
+CONVERGENCE_REPORT_FILE = "convergence_report.json"
+# Pipeline de extração: threads leitoras carregam, compactam e tokenizam os próximos
+# documentos enquanto o modelo gera, e uma thread escritora grava schemas e logs.
+# Com 0 leitoras, leitura e gravação voltam a ser feitas em sequência no laço principal.
+# A preparação é Python puro (disputa o GIL com o laço principal): uma leitora já
+# basta para ficar à frente da geração; mais leitoras só ajudam com vários núcleos.
+PREFETCH_READERS = 1
+# Documentos preparados à frente da geração (fila limitada: memória proporcional a isso).
+PREFETCH_DEPTH = 4
+# Resultados aguardando gravação; o laço principal espera se a fila encher.
+WRITE_QUEUE_DEPTH = 16
+# Ocupação do acelerador, esperas do pipeline e vazão da execução.
+EXTRACTION_REPORT_FILE = "extraction_report.json"
 # ---------------------------------------------------------------
+apply_settings(globals())
+
+# Tokenizers dos modelos já carregados, para as leitoras prepararem os prompts.
+_TOKENIZERS = {}
+
+
+class BusyMeter:
+    """
+    Tempo em que o acelerador está ocupado com ao menos uma geração (gerações
+    simultâneas, como as dos pedaços, contam uma vez só).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.since = 0.0
+        self.busy_seconds = 0.0
+        self.generations = 0
+
+    def __enter__(self):
+        with self.lock:
+            if self.active == 0:
+                self.since = time.perf_counter()
+            self.active += 1
+        return self
 
-# --- CLASSE E FUNÇÃO PARA CONTROLAR O TIMEOUT ---
-class TimeoutError(Exception):
-    """Exceção customizada para o timeout."""
-    pass
+    def __exit__(self, *exc):
+        with self.lock:
+            self.active -= 1
+            self.generations += 1
+            if self.active == 0:
+                self.busy_seconds += time.perf_counter() - self.since
+        return False
 
-def timeout_handler(signum, frame):
-    """Esta função será chamada quando o alarme disparar."""
-    raise TimeoutError(f"A geração excedeu o limite de {GENERATION_TIMEOUT_SECONDS} segundos.")
-# -------------------------------------------------
+
+ACCELERATOR = BusyMeter()
+
+
+class ResultWriter:
+    """
+    Thread escritora: executa as gravações (schemas, logs) na ordem em que foram
+    enviadas, a partir de uma fila limitada. Com `threaded=False`, grava na hora.
+    """
+
+    def __init__(self, threaded=True, depth=WRITE_QUEUE_DEPTH):
+        self.queue = queue.Queue(maxsize=depth) if threaded else None
+        self.wait_seconds = 0.0  # tempo em que o laço principal esperou a fila esvaziar
+        self.thread = None
+        if threaded:
+            self.thread = threading.Thread(target=self._run, name="escritora", daemon=True)
+            self.thread.start()
+
+    def submit(self, func, *args):
+        if self.queue is None:
+            self._call(func, args)
+            return
+        t0 = time.perf_counter()
+        self.queue.put((func, args))
+        self.wait_seconds += time.perf_counter() - t0
+
+    def _call(self, func, args):
+        try:
+            func(*args)
+        except Exception as e:
+            print(f" Erro ao gravar ({func.__name__}): {e}")
+
+    def _run(self):
+        while True:
+            task = self.queue.get()
+            if task is None:
+                return
+            self._call(*task)
+
+    def close(self):
+        """Espera as gravações pendentes terminarem."""
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
 
 
 def load_manifest(manifest_path):
@@ -63,43 +212,33 @@ def save_log_incremental(log_path, original_file_path, model_used, status, messa
         ])
 
 
-def load_model(model_path, model_name):
-    """Carrega modelo MLX."""
-    print(f"\n  Carregando modelo MLX: {model_name} ...")
+def load_model(spec):
+    """Carrega o backend do modelo (e do rascunho, se houver). Retorna (backend, tokenizer)."""
+    model_name = spec["name"]
+    draft_path = spec.get("draft_path")
+    backend = spec.get("backend", "mlx")
+    print(f"\n  Carregando modelo ({backend}): {model_name}"
+          + (" com rascunho especulativo" if draft_path else "") + " ...")
     try:
-        model, tokenizer = load(model_path)
+        # Backends sem tokenizer (ex.: "stub") geram no próprio processo: não travam
+        # e não há tokenizer a carregar no pai.
+        if ISOLATED_GENERATION and backend in BACKENDS and BACKENDS[backend].has_tokenizer:
+            model = GenerationWorker(spec, load_tokenizer(spec["path"]))
+            print(f" Modelo {model_name} carregado com sucesso!\n")
+            return model, model.tokenizer
+        model = load_backend(backend, spec["path"], draft_path,
+                             spec.get("num_draft_tokens", 4))
+        model.name = model_name
+        model.draft_name = os.path.basename(os.path.normpath(draft_path)) if draft_path else None
         print(f" Modelo {model_name} carregado com sucesso!\n")
-        return model, tokenizer
+        return model, model.tokenizer
     except Exception as e:
         print(f" Erro ao carregar modelo {model_name}: {e}")
         return None, None
 
 
-def extract_schema_from_file(model, tokenizer, input_path, output_path):
-    """Extrai o schema JSON usando o modelo MLX (versão otimizada e robusta)."""
-    with open(input_path, "r", encoding="utf-8") as infile:
-        data = json.load(infile)
-
-    prompt = (
-        "You are a data schema extraction expert.\n"
-        "Generate only the JSON Schema (in standard JSON Schema Draft 2020-12 format) for the following JSON document.\n\n"
-        "- Include 'required' when it can be clearly inferred.\n"
-        "- Do not include 'description' for any field.\n"
-        "- Output only the schema, no explanations or extra text. End your response after the final '}'.\n\n"
-        "Input JSON:\n"
-        f"```json\n{json.dumps(data, indent=2)}\n```\n\n"
-        "JSON Schema:\n"
-        "```json\n"
-    )
-    
-    response = generate(
-        model=model,
-        tokenizer=tokenizer,
-        prompt=prompt,
-        max_tokens=MAX_TOKENS,
-        verbose=True
-    )
-
+def parse_schema_response(response):
+    """Extrai o bloco JSON da resposta do modelo (ou devolve a resposta bruta)."""
     schema_text = ""
     try:
         # Lógica de extração do bloco JSON da resposta
@@ -115,6 +254,30 @@ def extract_schema_from_file(model, tokenizer, input_path, output_path):
         # Se a extração falhar, usa a resposta bruta
         schema_text = response.strip()
         print(f"Aviso: JSON extraído é inválido. Salvando a resposta bruta.")
+    return schema_text
+
+
+def save_schema(schema_text, output_path):
+    """
+    Salva o schema (formatado, se for JSON válido) no caminho de saída. Datasets já
+    migrados para o armazenamento endereçado por conteúdo (SchemaStore) recebem o
+    schema lá, em vez de um arquivo por documento, depois do mesmo reparo de
+    formatação que o jsonMerge aplica aos arquivos. Respostas irreparáveis ficam
+    no arquivo por documento (o jsonMerge avisa sobre arquivos fora do índice).
+    """
+    dataset, _, document = os.path.relpath(output_path, OUTPUT_DIR).partition(os.sep)
+    if SchemaStore.has_index(dataset):
+        try:
+            schema = json.loads(schema_text)
+        except json.JSONDecodeError:
+            try:
+                schema = jsonMerge.repair_json_text(schema_text)
+            except json.JSONDecodeError:
+                schema = None
+        if isinstance(schema, dict):
+            SchemaStore.put(dataset, document, schema)
+            return
+        print(f"Aviso: resposta sem JSON reparável; salva fora do armazenamento em: {output_path}")
 
     # Garante que o diretório de saída exista
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
@@ -128,6 +291,201 @@ def extract_schema_from_file(model, tokenizer, input_path, output_path):
             outfile.write(schema_text)
 
 
+def expected_output_tokens(data):
+    """Tokens de schema previstos para um documento (ou pedaço), usados no prazo da geração."""
+    return predict_tokens(analyze_json(data))[1]
+
+
+def run_generation(model, tokenizer, prompt, expected_tokens=None):
+    """Executa uma geração, registra tokens/s e aceitação do rascunho e devolve o texto."""
+    with ACCELERATOR:
+        if isinstance(model, GenerationWorker):
+            response, stats = model.generate(prompt, MAX_TOKENS, expected_tokens)
+        else:
+            response, stats = model.generate(prompt, MAX_TOKENS)
+    save_decoding_log(DECODING_LOG_FILE, model.name, model.draft_name, stats)
+    record_generation(model.name, stats)
+    summary = summarize_stats(stats)
+    rate = summary["acceptance_rate"]
+    print(f"Geração: {summary['tokens']} tokens, {summary['tokens_per_sec']:.1f} tokens/s"
+          + (f", aceitação do rascunho {rate:.1%}" if rate is not None else ""))
+    return response
+
+
+def extract_schema_chunked(model, tokenizer, data, budget):
+    """
+    Extrai o schema de um documento grande demais dividindo-o em subárvores que
+    cabem no orçamento, gerando um schema por pedaço e costurando os resultados.
+    Pedaços cuja resposta não é JSON válido são ignorados (com aviso).
+    """
+    chunks = split_document(data, tokenizer, budget)
+    print(f"Documento dividido em {len(chunks)} pedaços para extração.")
+
+    def extract_chunk(chunk):
+        path, value = chunk
+        prompt, _ = compact_prompt(value, tokenizer, budget, measure_baseline=False)
+        schema_text = parse_schema_response(run_generation(model, tokenizer, prompt, expected_output_tokens(value)))
+        try:
+            return path, json.loads(schema_text)
+        except json.JSONDecodeError:
+            print(f"Aviso: schema inválido para o pedaço em '{'.'.join(path) or '$'}'. Ignorando pedaço.")
+            return path, None
+
+    with ThreadPoolExecutor(max_workers=CHUNK_WORKERS) as executor:
+        parts = [(path, schema) for path, schema in executor.map(extract_chunk, chunks) if schema is not None]
+    if not parts:
+        raise RuntimeError("Nenhum pedaço do documento gerou um schema válido.")
+    return stitch_schemas(parts), len(chunks)
+
+
+def prepare_prompt(data, tokenizer, model_name=None):
+    """
+    Prompt de um documento para o modelo: compactado até caber no orçamento de
+    tokens do modelo (a contagem de tokens é a tokenização do prompt).
+    Retorna {"model_name", "prompt", "compaction", "expected_tokens"}.
+    """
+    budget = PROMPT_TOKEN_BUDGETS.get(model_name, DEFAULT_PROMPT_TOKEN_BUDGET)
+    prompt, compaction = compact_prompt(data, tokenizer, budget, measure_baseline=LOG_COMPACTION_BASELINE)
+    return {"model_name": model_name, "prompt": prompt, "compaction": compaction,
+            "expected_tokens": expected_output_tokens(data)}
+
+
+@timed()
+def extract_schema_text(model, tokenizer, data, model_name=None, prepared=None):
+    """
+    Extrai o texto do schema de um documento já carregado.
+    O documento é compactado até caber no orçamento de tokens do modelo; se nem
+    assim couber, é extraído em pedaços (CHUNKED_EXTRACTION). `prepared` é o
+    resultado de prepare_prompt (feito antes, por uma leitora) e só é usado se
+    for do mesmo modelo.
+    Retorna (texto do schema, informações da compactação).
+    """
+    if prepared is None or prepared["model_name"] != model_name:
+        prepared = prepare_prompt(data, tokenizer, model_name)
+    prompt, compaction = prepared["prompt"], prepared["compaction"]
+    budget = PROMPT_TOKEN_BUDGETS.get(model_name, DEFAULT_PROMPT_TOKEN_BUDGET)
+    print(f"Prompt: {compaction['tokens_after']} tokens (nível {compaction['level']}"
+          + (f", antes {compaction['tokens_before']})" if compaction["tokens_before"] else ")"))
+
+    if not compaction["fits_budget"] and CHUNKED_EXTRACTION:
+        schema, compaction["chunks"] = extract_schema_chunked(model, tokenizer, data, budget)
+        return json.dumps(schema), compaction
+
+    response = run_generation(model, tokenizer, prompt, prepared["expected_tokens"])
+    return parse_schema_response(response), compaction
+
+
+def extract_schema_from_file(model, tokenizer, input_path, output_path, model_name=None):
+    """
+    Extrai o schema JSON usando o backend do modelo e o salva.
+    Retorna as informações da compactação (tokens antes/depois).
+    """
+    with open(input_path, "r", encoding="utf-8") as infile:
+        data = json.load(infile)
+
+    schema_text, compaction = extract_schema_text(model, tokenizer, data, model_name)
+    save_schema(schema_text, output_path)
+    return compaction
+
+
+def output_path_for(original_file_path, object_type):
+    """
+    Caminho de saída do schema: OUTPUT_DIR/<dataset>/<object_type>/<arquivo>, onde o
+    dataset é a segunda parte do caminho do manifesto ('processed/dataset/...').
+    Retorna (dataset, caminho de saída). Lança IndexError se o caminho não segue a estrutura.
+    """
+    full_path = Path(original_file_path)
+    dataset_name = full_path.parts[1]
+    return dataset_name, os.path.join(OUTPUT_DIR, dataset_name, object_type, full_path.name)
+
+
+def extract_with_routing(router, pool, entry, data, prepared=None):
+    """
+    Extrai o schema de um documento seguindo a cadeia de modelos do roteador,
+    escalando enquanto a validação reprova a saída. `prepared` é o prompt já
+    preparado por uma leitora (prepare_document), se houver.
+    Modelos que não carregam são pulados; RuntimeError só se nenhum da cadeia carregar.
+    Retorna (texto do schema, compactação, modelo usado, aceito, motivo). Exceções
+    da geração saem com o atributo `model_name` do modelo que falhou.
+    """
+    chain = router.route(entry)
+    schema_text, compaction, reason, accepted = None, None, "", False
+    used_model, attempts, unavailable = None, 0, []
+    for spec in chain:
+        model_name = spec["name"]
+        current_model, current_tokenizer = pool.get(spec)
+        if current_model is None:
+            unavailable.append(model_name)
+            continue
+        _TOKENIZERS[model_name] = current_tokenizer
+        if attempts:
+            print(f"Saída de {used_model} reprovada na validação ({reason}). Escalando para {model_name}.")
+        used_model, attempts = model_name, attempts + 1
+
+        t0 = time.time()
+        try:
+            schema_text, compaction = extract_schema_text(current_model, current_tokenizer, data, model_name,
+                                                          prepared)
+        except Exception as e:
+            e.model_name = model_name  # para o log de quem chamou
+            raise
+        accepted, reason = validate_schema_text(schema_text, data)
+        router.record(spec, entry, time.time() - t0, accepted)
+        if accepted:
+            break
+    if used_model is None:
+        raise RuntimeError(f"Falha ao carregar os modelos da rota: {', '.join(unavailable)}.")
+    router.record_document(attempts)
+    return schema_text, compaction, used_model, accepted, reason
+
+
+def prepare_document(entry, router, trackers):
+    """
+    Trabalho de uma leitora para um documento do manifesto: caminho de saída,
+    leitura do JSON e, se o tokenizer do primeiro modelo da rota já estiver
+    carregado, o prompt compactado e tokenizado. Erros ficam em "error" para o
+    laço principal registrar. Documentos de datasets já convergidos não são lidos.
+    """
+    item = {"entry": entry, "dataset": None, "output_path": None, "data": None, "prepared": None, "error": None}
+    try:
+        # Constrói o caminho de saída que inclui o nome do dataset
+        item["dataset"], item["output_path"] = output_path_for(entry["file"], entry.get("object_type", "unknown"))
+    except IndexError as e:
+        item["error"] = e
+        return item
+    tracker = trackers.get(item["dataset"])
+    if tracker is not None and tracker.converged:
+        return item
+    try:
+        with open(entry["file"], "r", encoding="utf-8") as infile:
+            item["data"] = json.load(infile)
+        # A rota pode mudar até a vez do documento; o laço principal refaz o prompt se mudar.
+        model_name = router.route(entry)[0]["name"]
+        if model_name in _TOKENIZERS:
+            item["prepared"] = prepare_prompt(item["data"], _TOKENIZERS[model_name], model_name)
+    except Exception as e:
+        item["error"] = e
+    return item
+
+
+def prefetch(func, entries, readers=PREFETCH_READERS, depth=PREFETCH_DEPTH):
+    """
+    Aplica `func` às entradas em `readers` threads, com no máximo `depth` entradas
+    à frente da consumida, e entrega os resultados na ordem das entradas.
+    """
+    if readers <= 0:
+        yield from map(func, entries)
+        return
+    with ThreadPoolExecutor(max_workers=readers, thread_name_prefix="leitora") as executor:
+        pending = deque()
+        for entry in entries:
+            pending.append(executor.submit(func, entry))
+            if len(pending) > depth:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
 def main():
     """Função principal com a lógica de caminho de arquivo corrigida."""
     manifest_entries = load_manifest(MANIFEST_PATH)
@@ -137,71 +495,114 @@ def main():
 
     print(f"Total de arquivos pendentes: {len(manifest_entries)}")
 
-    model_low, tokenizer_low = None, None
-    model_high, tokenizer_high = None, None
-    
-    signal.signal(signal.SIGALRM, timeout_handler)
-    
-    for i, entry in enumerate(manifest_entries, 1):
+    router = ModelRouter(MODELS)
+    pool = ModelPool(load_model, MODEL_MEMORY_BUDGET_GB)
+    trackers = {}
+    writer = ResultWriter(threaded=PREFETCH_READERS > 0)
+    t_start = time.perf_counter()
+    input_wait = 0.0  # tempo em que o laço principal esperou uma leitora
+    processed = 0
+
+    items = prefetch(lambda entry: prepare_document(entry, router, trackers), manifest_entries,
+                     PREFETCH_READERS, PREFETCH_DEPTH)
+    for i in range(1, len(manifest_entries) + 1):
+        t0 = time.perf_counter()
+        item = next(items)
+        input_wait += time.perf_counter() - t0
+        entry = item["entry"]
         original_file_path = entry["file"]
-        
-        try:
-            full_path = Path(original_file_path)
-            # O nome do dataset será a segunda parte do caminho (índice 1)
-            dataset_name = full_path.parts[1]
-            base_name = full_path.name
-            object_type = entry.get("object_type", "unknown")
-            
-            # Constrói o novo caminho de saída que inclui o nome do dataset
-            output_path = os.path.join(OUTPUT_DIR, dataset_name, object_type, base_name)
-        except IndexError:
+        dataset_name, output_path = item["dataset"], item["output_path"]
+
+        if output_path is None:
             print(f" ERRO: O caminho do arquivo '{original_file_path}' não segue a estrutura esperada 'processed/dataset/...'. Pulando.")
-            save_log_incremental(LOG_FILE, original_file_path, "N/A", "failed", "Invalid file path structure in manifest")
+            writer.submit(save_log_incremental, LOG_FILE, original_file_path, "N/A", "failed",
+                          "Invalid file path structure in manifest")
             continue
         
-        complexity = entry.get("complexity", "high").lower()
+        if ADAPTIVE_SAMPLING:
+            if dataset_name not in trackers:
+                trackers[dataset_name] = ConvergenceTracker(CONVERGENCE_PATIENCE, CONVERGENCE_TOLERANCE)
+                trackers[dataset_name].seed(os.path.join(OUTPUT_DIR, dataset_name))
+            if trackers[dataset_name].converged:
+                trackers[dataset_name].skipped += 1
+                continue
+
         model_name = "N/A"
 
         print(f"\n--- Processando arquivo {i}/{len(manifest_entries)}: {original_file_path} ---")
-        
-        signal.alarm(GENERATION_TIMEOUT_SECONDS)
-        
+
         try:
-            if complexity == "low":
+            if item["error"] is not None:
+                raise item["error"]
+
+            schema_text, compaction, model_name, accepted, reason = extract_with_routing(
+                router, pool, entry, item["data"], item["prepared"])
+            processed += 1
+
+            writer.submit(save_schema, schema_text, output_path)
+            writer.submit(save_compaction_log, COMPACTION_LOG_FILE, original_file_path, model_name, compaction)
+
+            if not accepted:
+                writer.submit(save_log_incremental, LOG_FILE, original_file_path, model_name, "invalid",
+                              f"Schema saved to {output_path} but failed validation: {reason}")
+                print(f"Schema salvo em {output_path}, mas reprovado na validação: {reason}")
                 continue
-                if model_low is None:
-                    model_low, tokenizer_low = load_model(MODEL_PATH_LOW, "Gemma 3-4B (MLX)")
-                current_model, current_tokenizer = model_low, tokenizer_low
-                model_name = "Gemma 3-4B (MLX)"
-            else:
-                if model_high is None:
-                    model_high, tokenizer_high = load_model(MODEL_PATH_HIGH, "Qwen 2.5-Coder 14B (MLX)")
-                current_model, current_tokenizer = model_high, tokenizer_high
-                model_name = "Qwen 2.5-Coder 14B (MLX)"
-
-            if current_model is None or current_tokenizer is None:
-                raise RuntimeError(f"Falha ao carregar o modelo {model_name}.")
-
-            extract_schema_from_file(current_model, current_tokenizer, original_file_path, output_path)
-            
-            save_log_incremental(LOG_FILE, original_file_path, model_name, "success", f"Schema saved to {output_path}")
+
+            writer.submit(save_log_incremental, LOG_FILE, original_file_path, model_name, "success",
+                          f"Schema saved to {output_path}")
             print(f"Schema salvo com sucesso em: {output_path}")
             # Atualiza o manifesto original para marcar como gerado 
             entry["schema_generated"] = "true"
 
-        except TimeoutError as e:
-            save_log_incremental(LOG_FILE, original_file_path, model_name, "failed", f"Timeout: {e}")
+            if ADAPTIVE_SAMPLING and trackers[dataset_name].add(json.loads(schema_text)):
+                print(f"Dataset '{dataset_name}' convergiu: {CONVERGENCE_PATIENCE} schemas seguidos sem novidade. "
+                      "Os documentos restantes não serão consultados.")
+
+        except GenerationTimeout as e:
+            model_name = getattr(e, "model_name", model_name)
+            writer.submit(save_log_incremental, LOG_FILE, original_file_path, model_name, "failed", f"Timeout: {e}")
             print(f" Timeout ao processar {original_file_path}. Pulando para o próximo.")
         
         except Exception as e:
-            save_log_incremental(LOG_FILE, original_file_path, model_name, "failed", str(e))
+            model_name = getattr(e, "model_name", model_name)
+            writer.submit(save_log_incremental, LOG_FILE, original_file_path, model_name, "failed", str(e))
             print(f" Erro ao processar {original_file_path}: {e}")
-        
-        finally:
-            signal.alarm(0)
+
+    items.close()  # encerra as leitoras
+    writer.close()
+    wall = time.perf_counter() - t_start
+    pool.close()
+
+    extraction = {
+        "documents": processed,
+        "wall_seconds": wall,
+        "documents_per_hour": processed / wall * 3600 if wall else 0.0,
+        "accelerator_busy_seconds": ACCELERATOR.busy_seconds,
+        "accelerator_utilisation": ACCELERATOR.busy_seconds / wall if wall else 0.0,
+        "generations": ACCELERATOR.generations,
+        "input_wait_seconds": input_wait,
+        "write_wait_seconds": writer.wait_seconds,
+        "prefetch_readers": PREFETCH_READERS,
+        "prefetch_depth": PREFETCH_DEPTH,
+    }
+    print(f"\nAcelerador ocupado {extraction['accelerator_utilisation']:.1%} do tempo "
+          f"({ACCELERATOR.busy_seconds:.1f}s de {wall:.1f}s); espera por leitura {input_wait:.1f}s, "
+          f"por gravação {writer.wait_seconds:.1f}s.")
+    with open(EXTRACTION_REPORT_FILE, "w", encoding="utf-8") as f:
+        json.dump(extraction, f, indent=2, ensure_ascii=False)
+
+    if trackers:
+        convergence = {name: tracker.report() for name, tracker in trackers.items()}
+        for name, report in convergence.items():
+            print(f"{name}: {report['documents']} schemas, {report['calls_saved']} chamadas economizadas, "
+                  f"P(caminho novo) < {report['new_path_rate_upper_95']:.1%}"
+                  + ("" if report["converged"] else " (não convergiu)"))
+        with open(CONVERGENCE_REPORT_FILE, "w", encoding="utf-8") as f:
+            json.dump(convergence, f, indent=2, ensure_ascii=False)
+
+    report = router.print_report()
+    with open(ROUTING_REPORT_FILE, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
 
 if __name__ == "__main__":
-    if not hasattr(signal, 'SIGALRM'):
-        print("Aviso: O mecanismo de timeout com 'signal' não é suportado neste sistema operacional (ex: Windows).")
-        print("O script será executado sem proteção contra loops infinitos.")
     main()
\ No newline at end of file
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Fusão (LLM): redução em árvore dos schemas e1..en de um dataset em um schema E.
+
+Fundir milhares de schemas em um único prompt estoura o contexto do modelo, então
+a fusão é feita em árvore:
+
+- schemas idênticos (mesma forma canônica) são deduplicados antes de tudo;
+- cada nível agrupa os schemas de FUSION_ARITY em FUSION_ARITY e pede ao modelo
+  que funda cada grupo; o total é O(n) fusões em profundidade O(log n);
+- uma fusão começa assim que seus filhos terminam, então níveis diferentes da
+  árvore andam ao mesmo tempo (limitados por FUSION_WORKERS);
+- o resultado de cada grupo fica em cache pelo hash das entradas (também entre
+  execuções), e grupos cujo prompt não cabe no orçamento ou cuja resposta é
+  inválida são fundidos deterministicamente (merge_schemas).
+
+O benchmark compara latência e concordância com a fusão estatística do jsonMerge.
+
+Uso (a partir da raiz do projeto):
+    python3 scripts/LLMFusion.py --datasets twitter --model-path <modelo> --backend mlx
+    python3 scripts/LLMFusion.py --datasets twitter --merge deterministic   # sem modelo
+"""
+import os
+import glob
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+if __package__:
+    from . import jsonMerge
+    from . import SchemaCompare
+    from . import SchemaStore
+    from .PromptCompaction import count_tokens
+    from .Settings import apply_settings
+else:
+    import jsonMerge
+    import SchemaCompare
+    import SchemaStore
+    from PromptCompaction import count_tokens
+    from Settings import apply_settings
+
+# --- CONFIGURAÇÕES ---
+SCHEMA_SOURCE_DIR = jsonMerge.SCHEMA_SOURCE_DIR
+FUSION_OUTPUT_DIR = SchemaCompare.LLM_FUSION_DIR
+FUSION_CACHE_FILE = ".fusion_cache.json"
+FUSION_REPORT_FILE = "fusion_benchmark.csv"
+# Schemas fundidos por chamada ao modelo.
+FUSION_ARITY = 2
+# Fusões simultâneas. O MLX atende uma geração por vez, então 1; backends que
+# atendem requisições concorrentes podem usar mais.
+FUSION_WORKERS = 1
+FUSION_PROMPT_TOKEN_BUDGET = 8192
+FUSION_MAX_TOKENS = 8192
+# ---------------------
+apply_settings(globals())
+
+FUSION_PROMPT_PREFIX = (
+    "You are a data schema expert.\n"
+    "Merge the following JSON Schemas, each describing documents of the same collection, into a single "
+    "JSON Schema (in standard JSON Schema Draft 2020-12 format) that accepts documents valid under any of them.\n\n"
+    "- Keep every property that appears in any schema.\n"
+    "- A property is required only if it is required in every schema.\n"
+    "- When the types of a property differ, use a list of types.\n"
+    "- Do not include 'description' for any field.\n"
+    "- Output only the schema, no explanations or extra text. End your response after the final '}'.\n\n"
+)
+FUSION_PROMPT_SUFFIX = (
+    "Merged JSON Schema:\n"
+    "```json\n"
+)
+
+
+def canonical(schema):
+    """Forma canônica (chaves ordenadas, sem espaços) de um schema."""
+    return json.dumps(schema, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def schema_hash(schema):
+    return hashlib.blake2b(canonical(schema).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def build_fusion_prompt(schemas):
+    """Monta o prompt de fusão de uma lista de schemas."""
+    body = "".join(f"Schema {i}:\n```json\n{canonical(s)}\n```\n\n" for i, s in enumerate(schemas, 1))
+    return FUSION_PROMPT_PREFIX + body + FUSION_PROMPT_SUFFIX
+
+
+def _types(schema):
+    raw = schema.get("type")
+    if isinstance(raw, list):
+        return [t for t in raw if t is not None]
+    return [raw] if isinstance(raw, str) else []
+
+
+def merge_schemas(schemas):
+    """
+    Fusão determinística: união de tipos e de 'properties' (recursivamente), 'items'
+    fundidos e 'required' só com as chaves exigidas em todos os schemas de objeto.
+    """
+    schemas = [s for s in schemas if isinstance(s, dict)]
+    merged = {}
+    types = []
+    for schema in schemas:
+        types.extend(t for t in _types(schema) if t not in types)
+    if types:
+        merged["type"] = types[0] if len(types) == 1 else sorted(types)
+
+    objects = [s for s in schemas if isinstance(s.get("properties"), dict)]
+    if objects:
+        names = []
+        for schema in objects:
+            names.extend(k for k in schema["properties"] if k not in names)
+        merged["properties"] = {
+            name: merge_schemas([s["properties"][name] for s in objects if name in s["properties"]])
+            for name in names
+        }
+        required = [k for k in names
+                    if all(k in s["properties"] and k in (s.get("required") or []) for s in objects)]
+        if required:
+            merged["required"] = required
+
+    items = [s["items"] for s in schemas if isinstance(s.get("items"), dict)]
+    if items:
+        merged["items"] = merge_schemas(items)
+    return merged
+
+
+def load_schemas(dir_path):
+    """
+    Carrega e repara os schemas de um diretório, deduplicados.
+    Retorna ({hash: schema}, {hash: nº de ocorrências}).
+    """
+    unique, counts = {}, {}
+    dataset = os.path.basename(os.path.normpath(dir_path))
+    if SchemaStore.has_index(dataset):
+        for schema, count in SchemaStore.load_unique(dataset):
+            digest = schema_hash(schema)
+            unique.setdefault(digest, schema)
+            counts[digest] = counts.get(digest, 0) + count
+        return unique, counts
+    for file_path in sorted(glob.glob(os.path.join(dir_path, "**/*.json"), recursive=True)):
+        schema = jsonMerge.load_and_repair_json(file_path)
+        if not isinstance(schema, dict):
+            continue
+        jsonMerge.repair_schema_structure(schema)
+        digest = schema_hash(schema)
+        unique.setdefault(digest, schema)
+        counts[digest] = counts.get(digest, 0) + 1
+    return unique, counts
+
+
+class FusionEngine:
+    """
+    Funde grupos de schemas com um backend de geração (ou só deterministicamente, sem
+    backend), com cache por hash das entradas.
+    """
+
+    def __init__(self, backend=None, model_name="deterministic", cache_path=FUSION_CACHE_FILE):
+        self.backend = backend
+        self.model_name = model_name
+        self.cache_path = cache_path
+        self.cache = {}
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as f:
+                self.cache = json.load(f)
+        self.lock = threading.Lock()
+        self.counters = {"merges": 0, "cache_hits": 0, "llm_calls": 0, "fallbacks": 0}
+
+    def save_cache(self):
+        if self.cache_path:
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump(self.cache, f, ensure_ascii=False)
+
+    def merge(self, schemas):
+        """Funde um grupo de schemas (ordem irrelevante para o cache)."""
+        key = self.model_name + ":" + ",".join(sorted(schema_hash(s) for s in schemas))
+        with self.lock:
+            self.counters["merges"] += 1
+            if key in self.cache:
+                self.counters["cache_hits"] += 1
+                return self.cache[key]
+
+        result = None
+        if self.backend is not None:
+            prompt = build_fusion_prompt(schemas)
+            if count_tokens(self.backend.tokenizer, prompt) <= FUSION_PROMPT_TOKEN_BUDGET:
+                if __package__:
+                    from .LLMExtraction import parse_schema_response
+                else:
+                    from LLMExtraction import parse_schema_response
+
+                response, _ = self.backend.generate(prompt, FUSION_MAX_TOKENS)
+                with self.lock:
+                    self.counters["llm_calls"] += 1
+                try:
+                    result = json.loads(parse_schema_response(response))
+                    jsonMerge.repair_schema_structure(result)
+                except json.JSONDecodeError:
+                    result = None
+        if not isinstance(result, dict):
+            if self.backend is not None:
+                with self.lock:
+                    self.counters["fallbacks"] += 1
+            result = merge_schemas(schemas)
+
+        with self.lock:
+            self.cache[key] = result
+        return result
+
+
+def tree_reduce(schemas, merge, arity=FUSION_ARITY, workers=FUSION_WORKERS):
+    """
+    Reduz `schemas` a um único schema em uma árvore de aridade `arity`. Cada fusão é
+    submetida assim que todos os seus filhos estão prontos, então fusões de níveis
+    diferentes correm em paralelo. Retorna (schema, profundidade).
+    """
+    if not schemas:
+        return None, 0
+    # Forma da árvore: cada nível é uma lista de grupos de índices do nível anterior.
+    levels = []
+    width = len(schemas)
+    while width > 1:
+        groups = [list(range(i, min(i + arity, width))) for i in range(0, width, arity)]
+        levels.append(groups)
+        width = len(groups)
+
+    results = {(0, i): s for i, s in enumerate(schemas)}
+    remaining = {(depth + 1, j): len(group) for depth, groups in enumerate(levels) for j, group in enumerate(groups)}
+    parent = {(depth, i): (depth + 1, j) for depth, groups in enumerate(levels)
+              for j, group in enumerate(groups) for i in group}
+
+    def children(node):
+        depth, j = node
+        return [results[(depth - 1, i)] for i in levels[depth - 1][j]]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        running = {}
+        ready = [node for node in results]
+        while ready or running:
+            for node in ready:
+                up = parent.get(node)
+                if up is None:
+                    continue
+                remaining[up] -= 1
+                if remaining[up] == 0:
+                    group = children(up)
+                    if len(group) == 1:
+                        results[up] = group[0]
+                        ready.append(up)
+                    else:
+                        running[executor.submit(merge, group)] = up
+            ready = []
+            if running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    results[node] = future.result()
+                    ready.append(node)
+
+    return results[(len(levels), 0)], len(levels)
+
+
+def fuse_dataset(dataset, engine, arity=FUSION_ARITY, workers=FUSION_WORKERS):
+    """Funde os schemas de um dataset, salva E e compara com a fusão estatística."""
+    dir_path = os.path.join(SCHEMA_SOURCE_DIR, dataset)
+    print(f"\n--- Fusão (LLM) em árvore: {dataset} ---")
+    t0 = time.time()
+    unique, counts = load_schemas(dir_path)
+    total = sum(counts.values())
+    if not unique:
+        print(" Nenhum schema encontrado. Pulando dataset.")
+        return None
+    before = dict(engine.counters)
+    t1 = time.time()
+    schema, depth = tree_reduce(list(unique.values()), engine.merge, arity, workers)
+    t_fusion = time.time() - t1
+    engine.save_cache()
+
+    os.makedirs(FUSION_OUTPUT_DIR, exist_ok=True)
+    output_path = os.path.join(FUSION_OUTPUT_DIR, f"{dataset}_llm_master_schema.json")
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(schema, f, indent=2, ensure_ascii=False)
+
+    t2 = time.time()
+    stats_tree = jsonMerge.new_stats_tree()
+    for digest, s in unique.items():
+        jsonMerge.update_stats_tree(stats_tree, s, counts[digest])
+    statistical = jsonMerge.build_schema_from_stats(stats_tree)
+    t_statistical = time.time() - t2
+
+    row = {"dataset": dataset, "model": engine.model_name, "schemas": total, "unique_schemas": len(unique),
+           "arity": arity, "depth": depth, "load_seconds": t1 - t0, "fusion_seconds": t_fusion,
+           "statistical_seconds": t_statistical}
+    row.update({k: engine.counters[k] - before[k] for k in engine.counters})
+    row.update(SchemaCompare.compare_flat(SchemaCompare.flatten_schema(schema),
+                                          SchemaCompare.flatten_schema(statistical)))
+    print(f" {total} schemas ({len(unique)} únicos) fundidos em {t_fusion:.2f}s, profundidade {depth}, "
+          f"{row['merges']} fusões ({row['cache_hits']} do cache, {row['llm_calls']} chamadas ao modelo)")
+    print(f" Fusão estatística: {t_statistical:.3f}s | concordância: F1={row['f1']:.3f} "
+          f"tipos={row['type_agreement']:.3f} required={row['required_agreement']:.3f}")
+    print(f" Schema salvo em: {output_path}")
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fusão (LLM) em árvore dos schemas de cada dataset.")
+    parser.add_argument("--datasets", default=None, help="Datasets separados por vírgula (padrão: todos)")
+    parser.add_argument("--merge", default="llm", choices=["llm", "deterministic"],
+                        help="Fundir com o modelo ou só deterministicamente")
+    parser.add_argument("--backend", default="mlx", help="Backend de geração (ver LLMBackends)")
+    parser.add_argument("--model-path", default=None, help="Modelo usado nas fusões")
+    parser.add_argument("--arity", type=int, default=FUSION_ARITY, help="Schemas por fusão")
+    parser.add_argument("--workers", type=int, default=FUSION_WORKERS, help="Fusões simultâneas")
+    args = parser.parse_args()
+
+    if args.datasets:
+        datasets = [d.strip() for d in args.datasets.split(",") if d.strip()]
+    else:
+        try:
+            datasets = sorted(d.name for d in os.scandir(SCHEMA_SOURCE_DIR) if d.is_dir())
+        except FileNotFoundError:
+            print(f"❌ ERRO: O diretório fonte '{SCHEMA_SOURCE_DIR}' não foi encontrado."); return
+
+    if args.merge == "llm":
+        if not args.model_path:
+            parser.error("--model-path é obrigatório com --merge llm")
+        if __package__:
+            from .LLMBackends import load_backend
+        else:
+            from LLMBackends import load_backend
+
+        engine = FusionEngine(load_backend(args.backend, args.model_path),
+                              os.path.basename(os.path.normpath(args.model_path)))
+    else:
+        engine = FusionEngine()
+
+    rows = [row for row in (fuse_dataset(d, engine, args.arity, args.workers) for d in datasets) if row]
+    if rows:
+        SchemaCompare.write_csv(rows, FUSION_REPORT_FILE)
+        print(f"\nBenchmark salvo em: {FUSION_REPORT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
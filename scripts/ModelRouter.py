@@ -0,0 +1,256 @@
+"""
+Roteamento de documentos entre modelos por custo previsto.
+
+Substitui a escolha fixa por 'complexity' (low/high) do manifesto:
+- o custo de cada documento (tokens de prompt e de saída, segundos por modelo) é
+  previsto a partir das métricas do manifesto (keys, depth, arrays, size_bytes);
+- entre os modelos cuja capacidade comporta o documento, começa por aquele com
+  menor custo esperado, contando o custo de escalar quando a validação falha;
+- se a saída do modelo não passa na validação, o documento é escalado para o
+  próximo modelo (maior) da lista;
+- um orçamento de memória decide quais modelos ficam carregados ao mesmo tempo
+  (os menos usados recentemente são descarregados);
+- throughput, taxa de escalonamento e distribuição de latência por modelo são
+  reportados ao final.
+"""
+import gc
+import json
+import time
+from collections import OrderedDict
+if __package__:
+    from .Settings import apply_settings
+else:
+    from Settings import apply_settings
+
+# --- CONFIGURAÇÕES ---
+# Bytes de JSON minificado por token de prompt (estimativa inicial; calibrada em execução).
+BYTES_PER_PROMPT_TOKEN = 3.5
+# Tokens de schema gerados por chave do documento e por array (estimativa inicial).
+OUTPUT_TOKENS_PER_KEY = 12.0
+OUTPUT_TOKENS_PER_ARRAY = 20.0
+OUTPUT_TOKENS_BASE = 40.0
+# Peso da observação mais recente na calibração (média móvel exponencial).
+CALIBRATION_ALPHA = 0.2
+# Fração mínima das chaves de topo do documento que o schema precisa cobrir.
+MIN_TOP_LEVEL_COVERAGE = 0.8
+# Taxa de falha de validação assumida antes de haver observações (suavização de Laplace).
+PRIOR_FAILURE_RATE = 0.2
+PRIOR_WEIGHT = 5
+# ---------------------
+apply_settings(globals())
+
+
+def _metric(entry, name, default=0.0):
+    try:
+        return float(entry.get(name) or default)
+    except (TypeError, ValueError):
+        return default
+
+
+def predict_tokens(entry):
+    """Prevê (tokens de prompt, tokens de saída) de um documento a partir do manifesto."""
+    size_bytes = _metric(entry, "size_bytes")
+    keys = _metric(entry, "keys")
+    arrays = _metric(entry, "arrays")
+    prompt_tokens = size_bytes / BYTES_PER_PROMPT_TOKEN
+    output_tokens = OUTPUT_TOKENS_BASE + OUTPUT_TOKENS_PER_KEY * keys + OUTPUT_TOKENS_PER_ARRAY * arrays
+    return prompt_tokens, output_tokens
+
+
+def validate_schema_text(schema_text, document=None):
+    """
+    Valida a saída de um modelo. Retorna (ok, motivo). A saída precisa ser um
+    objeto JSON com cara de JSON Schema e, se o documento for informado, cobrir
+    ao menos MIN_TOP_LEVEL_COVERAGE das chaves de topo dele.
+    """
+    try:
+        schema = json.loads(schema_text)
+    except (TypeError, json.JSONDecodeError):
+        return False, "JSON inválido"
+    if not isinstance(schema, dict):
+        return False, "schema não é um objeto"
+    if "type" not in schema and "properties" not in schema:
+        return False, "sem 'type' nem 'properties'"
+    properties = schema.get("properties", {})
+    if not isinstance(properties, dict):
+        return False, "'properties' não é um objeto"
+    if "required" in schema and not isinstance(schema["required"], list):
+        return False, "'required' não é uma lista"
+    if isinstance(document, dict) and document:
+        covered = sum(1 for key in document if key in properties)
+        coverage = covered / len(document)
+        if coverage < MIN_TOP_LEVEL_COVERAGE:
+            return False, f"cobre só {coverage:.0%} das chaves de topo"
+    return True, ""
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class ModelPool:
+    """
+    Mantém modelos carregados dentro de um orçamento de memória (GB; configurado em
+    LLMExtraction.MODEL_MEMORY_BUDGET_GB). `loader(spec)` devolve (model, tokenizer),
+    ou (None, None) se o carregamento falhar, e um modelo que falhou não é tentado
+    de novo; um modelo residente com `alive` falso (worker de geração que não
+    reiniciou) é recarregado. Ao faltar memória, os modelos usados há mais tempo são
+    descarregados.
+    """
+
+    def __init__(self, loader, memory_budget_gb):
+        self.loader = loader
+        self.memory_budget_gb = memory_budget_gb
+        self.resident = OrderedDict()  # nome -> (spec, model, tokenizer)
+        self.loads = 0
+        self.evictions = 0
+        self.failed = set()  # modelos cujo carregamento falhou (não são tentados de novo)
+
+    def used_gb(self):
+        return sum(spec["memory_gb"] for spec, _, _ in self.resident.values())
+
+    def get(self, spec):
+        name = spec["name"]
+        if name in self.resident:
+            _, model, tokenizer = self.resident[name]
+            if getattr(model, "alive", True):
+                self.resident.move_to_end(name)
+                return model, tokenizer
+            # Worker de geração cujo reinício falhou: sai da memória e é carregado de novo.
+            del self.resident[name]
+        if name in self.failed:
+            return None, None
+
+        while self.resident and self.used_gb() + spec["memory_gb"] > self.memory_budget_gb:
+            evicted, (_, model, _) = self.resident.popitem(last=False)
+            self.evictions += 1
+            if hasattr(model, "close"):
+                model.close()
+            print(f"  Descarregando {evicted} para liberar memória.")
+            gc.collect()
+
+        model, tokenizer = self.loader(spec)
+        self.loads += 1
+        if model is None:
+            self.failed.add(name)
+        else:
+            self.resident[name] = (spec, model, tokenizer)
+        return model, tokenizer
+
+    def close(self):
+        """Descarrega todos os modelos (encerrando workers de geração, se houver)."""
+        while self.resident:
+            _, (_, model, _) = self.resident.popitem()
+            if hasattr(model, "close"):
+                model.close()
+
+
+class ModelRouter:
+    """
+    Escolhe o modelo inicial de cada documento e a cadeia de escalonamento.
+    `models` é a lista de specs do menor para o maior, cada uma com: name,
+    memory_gb, prefill_tps, decode_tps e limites max_keys/max_depth/max_size_bytes
+    (None = sem limite).
+    """
+
+    def __init__(self, models):
+        self.models = list(models)
+        # Fator de correção (observado/previsto) por modelo, calibrado em execução.
+        self.correction = {m["name"]: 1.0 for m in self.models}
+        self.stats = {m["name"]: {"attempts": 0, "accepted": 0, "latencies": [], "busy_seconds": 0.0}
+                      for m in self.models}
+        self.documents = 0
+        self.escalations = 0
+        self.t_start = time.time()
+
+    def predict_seconds(self, spec, entry):
+        prompt_tokens, output_tokens = predict_tokens(entry)
+        raw = prompt_tokens / spec["prefill_tps"] + output_tokens / spec["decode_tps"]
+        return raw * self.correction[spec["name"]]
+
+    def _fits(self, spec, entry):
+        for metric, limit in (("keys", "max_keys"), ("depth", "max_depth"), ("size_bytes", "max_size_bytes")):
+            if spec.get(limit) is not None and _metric(entry, metric) > spec[limit]:
+                return False
+        return True
+
+    def failure_rate(self, spec):
+        """Taxa de falha de validação do modelo, suavizada pelo prior."""
+        stats = self.stats[spec["name"]]
+        failures = stats["attempts"] - stats["accepted"]
+        return (failures + PRIOR_FAILURE_RATE * PRIOR_WEIGHT) / (stats["attempts"] + PRIOR_WEIGHT)
+
+    def expected_seconds(self, chain, entry):
+        """Custo esperado de uma cadeia: cada modelo só roda se todos os anteriores falharam."""
+        total, reach = 0.0, 1.0
+        for spec in chain:
+            total += reach * self.predict_seconds(spec, entry)
+            reach *= self.failure_rate(spec)
+        return total
+
+    def route(self, entry):
+        """
+        Cadeia de modelos a tentar para o documento. Entre os modelos cuja capacidade
+        comporta o documento, começa por aquele que minimiza o custo esperado
+        (incluindo o custo de escalar quando a validação falha).
+        """
+        candidates = [i for i, spec in enumerate(self.models) if self._fits(spec, entry)]
+        if not candidates:
+            return self.models[-1:]
+        start = min(candidates, key=lambda i: self.expected_seconds(self.models[i:], entry))
+        return self.models[start:]
+
+    def record(self, spec, entry, seconds, accepted):
+        """Registra uma tentativa e recalibra a previsão de custo do modelo."""
+        stats = self.stats[spec["name"]]
+        stats["attempts"] += 1
+        stats["accepted"] += int(accepted)
+        stats["latencies"].append(seconds)
+        stats["busy_seconds"] += seconds
+        predicted = self.predict_seconds(spec, entry) / self.correction[spec["name"]]
+        if predicted > 0:
+            observed_ratio = seconds / predicted
+            self.correction[spec["name"]] = ((1 - CALIBRATION_ALPHA) * self.correction[spec["name"]]
+                                             + CALIBRATION_ALPHA * observed_ratio)
+
+    def record_document(self, attempts):
+        self.documents += 1
+        if attempts > 1:
+            self.escalations += 1
+
+    def report(self):
+        elapsed = max(time.time() - self.t_start, 1e-9)
+        report = {
+            "documents": self.documents,
+            "escalation_rate": self.escalations / self.documents if self.documents else 0.0,
+            "documents_per_hour": self.documents / elapsed * 3600,
+            "models": {},
+        }
+        for name, stats in self.stats.items():
+            latencies = stats["latencies"]
+            report["models"][name] = {
+                "attempts": stats["attempts"],
+                "accepted": stats["accepted"],
+                "docs_per_hour_busy": stats["attempts"] / stats["busy_seconds"] * 3600 if stats["busy_seconds"] else 0.0,
+                "latency_p50": _percentile(latencies, 0.5),
+                "latency_p90": _percentile(latencies, 0.9),
+                "latency_p99": _percentile(latencies, 0.99),
+                "latency_max": max(latencies) if latencies else 0.0,
+                "cost_correction": self.correction[name],
+            }
+        return report
+
+    def print_report(self):
+        report = self.report()
+        print("\n--- Relatório do Roteamento ---")
+        print(f"Documentos: {report['documents']} | {report['documents_per_hour']:.1f} docs/hora | "
+              f"escalonamento: {report['escalation_rate']:.1%}")
+        for name, m in report["models"].items():
+            print(f"  {name}: tentativas={m['attempts']} aceitas={m['accepted']} "
+                  f"{m['docs_per_hour_busy']:.1f} docs/hora ocupado | latência p50={m['latency_p50']:.1f}s "
+                  f"p90={m['latency_p90']:.1f}s p99={m['latency_p99']:.1f}s")
+        return report
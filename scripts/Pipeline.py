@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Orquestrador do pipeline completo:
+
+    PreprocessDatasets -> JsonComplexity -> LLMExtraction -> SchemaCleaning -> ArrumaManifesto -> jsonMerge / JsonSchema -> SchemaCompare
+    schemaGeneration (pares JSON bruto/schema do datasets/manifest.csv, usados pelo TrainingSet)
+
+Cada etapa é um nó de um DAG com entradas e saídas declaradas (padrões glob).
+Uma etapa é pulada quando o hash de conteúdo das suas entradas e das suas saídas
+é igual ao da última execução bem-sucedida. Etapas por dataset sem dependência
+entre si rodam em paralelo, e ao final é impresso um relatório de tempo por etapa.
+
+Uso (a partir da raiz do projeto):
+    python3 scripts/Pipeline.py                 # tudo, exceto a extração com LLM
+    python3 scripts/Pipeline.py --llm           # inclui a extração com LLM
+    python3 scripts/Pipeline.py --stages merge,traditional --datasets twitter
+    python3 scripts/Pipeline.py --metrics       # grava run_report.json e run_metrics.prom
+"""
+import os
+import sys
+import glob
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+if __package__:
+    from . import PreprocessDatasets
+    from . import JsonComplexity
+    from . import ArrumaManifesto
+    from . import jsonMerge
+    from . import JsonSchema
+    from . import SchemaCompare
+    from . import SchemaStore
+    from . import SchemaCleaning
+    from . import schemaGeneration
+    from . import Instrumentation
+    from . import CompressedIO
+    from .Settings import apply_settings
+else:
+    import PreprocessDatasets
+    import JsonComplexity
+    import ArrumaManifesto
+    import jsonMerge
+    import JsonSchema
+    import SchemaCompare
+    import SchemaStore
+    import SchemaCleaning
+    import schemaGeneration
+    import Instrumentation
+    import CompressedIO
+    from Settings import apply_settings
+
+# --- CONFIGURAÇÕES ---
+RAW_DATASETS_DIR = PreprocessDatasets.input_dir
+PROCESSED_DIR = PreprocessDatasets.output_base_dir
+MANIFEST_PATH = JsonComplexity.MANIFEST_FILE
+SCHEMA_DOCUMENTS_DIR = jsonMerge.SCHEMA_SOURCE_DIR
+MASTER_SCHEMA_DIR = jsonMerge.MASTER_SCHEMA_OUTPUT_DIR
+TRADITIONAL_SCHEMA_DIR = JsonSchema.SCHEMA_OUTPUT_DIR
+# Estado persistido entre execuções (hashes de arquivos e de cada etapa).
+STATE_PATH = ".pipeline_state.json"
+# Todas as etapas conhecidas, na ordem do pipeline.
+ALL_STAGES = ["preprocess", "training_pairs", "manifest", "extract", "clean", "sync_manifest", "merge", "traditional", "compare"]
+HASH_CHUNK_BYTES = 1024 * 1024
+# ---------------------
+apply_settings(globals())
+
+
+class Stage:
+    """Um nó do DAG: função a executar, argumentos, entradas/saídas e dependências."""
+
+    def __init__(self, name, func, args=(), inputs=(), outputs=(), deps=()):
+        self.name = name
+        self.func = func
+        self.args = tuple(args)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+
+
+# --- FUNÇÕES DAS ETAPAS (nível de módulo para poderem ir a outro processo) ---
+
+def run_preprocess(file_name):
+    return PreprocessDatasets.process_file(file_name, RAW_DATASETS_DIR, PROCESSED_DIR, PreprocessDatasets.size_target)
+
+
+def run_training_pairs():
+    schemaGeneration.generateSchemasAutomatically(RAW_DATASETS_DIR)
+    return True
+
+
+def run_manifest():
+    JsonComplexity.build_manifest()
+    return True
+
+
+def run_extraction():
+    # Import tardio: LLMExtraction carrega o mlx_lm, que só é necessário nesta etapa.
+    if __package__:
+        from . import LLMExtraction
+    else:
+        import LLMExtraction
+    LLMExtraction.main()
+    return True
+
+
+def run_clean():
+    SchemaCleaning.clean_directory(SCHEMA_DOCUMENTS_DIR)
+    return True
+
+
+def run_sync_manifest():
+    ArrumaManifesto.update_manifest_from_schemas()
+    return True
+
+
+def run_merge(dataset):
+    jsonMerge.process_directory(os.path.join(SCHEMA_DOCUMENTS_DIR, dataset))
+    return True
+
+
+def run_traditional(dataset):
+    files = JsonSchema.load_approved_files_from_manifest(MANIFEST_PATH).get(dataset, [])
+    os.makedirs(TRADITIONAL_SCHEMA_DIR, exist_ok=True)
+    JsonSchema.process_dataset(dataset, files)
+    return True
+
+
+def run_compare():
+    rows = SchemaCompare.batch_compare(SchemaCompare.discover_pairs())
+    SchemaCompare.print_summary(rows)
+    SchemaCompare.write_csv(rows, SchemaCompare.COMPARISON_OUTPUT)
+    return True
+
+
+# --- HASH DE CONTEÚDO ---
+
+def expand(patterns):
+    """Expande padrões glob em uma lista ordenada de arquivos existentes."""
+    files = set()
+    for pattern in patterns:
+        files.update(p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p))
+    return sorted(files)
+
+
+def file_digest(path, file_cache):
+    """
+    Hash do conteúdo de um arquivo. O hash só é recalculado quando o tamanho ou o
+    mtime mudaram desde a última vez (cache em `file_cache`).
+    """
+    st = os.stat(path)
+    cached = file_cache.get(path)
+    if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        return cached[2]
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    file_cache[path] = [st.st_size, st.st_mtime_ns, digest]
+    return digest
+
+
+def fingerprint(patterns, file_cache):
+    """Hash combinado (caminho + conteúdo) de todos os arquivos dos padrões; None se não houver arquivos."""
+    files = expand(patterns)
+    if not files:
+        return None
+    h = hashlib.blake2b(digest_size=16)
+    for path in files:
+        h.update(path.encode("utf-8"))
+        h.update(file_digest(path, file_cache).encode("ascii"))
+    return h.hexdigest()
+
+
+def load_state(path=STATE_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        state = {}
+    state.setdefault("files", {})
+    state.setdefault("stages", {})
+    return state
+
+
+def save_state(state, path=STATE_PATH):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+# --- CONSTRUÇÃO DO DAG ---
+
+def discover_datasets():
+    """Nomes de datasets conhecidos: arquivos brutos e pastas já processadas."""
+    names = set()
+    if os.path.isdir(RAW_DATASETS_DIR):
+        names.update(PreprocessDatasets.dataset_name(f) for f in PreprocessDatasets.list_input_files(RAW_DATASETS_DIR))
+    if os.path.isdir(PROCESSED_DIR):
+        schema_dirname = os.path.basename(os.path.normpath(SCHEMA_DOCUMENTS_DIR))
+        names.update(d.name for d in os.scandir(PROCESSED_DIR) if d.is_dir() and d.name != schema_dirname)
+    if os.path.isdir(SCHEMA_DOCUMENTS_DIR):
+        names.update(d.name for d in os.scandir(SCHEMA_DOCUMENTS_DIR) if d.is_dir())
+    return sorted(names)
+
+
+def build_dag(stages, datasets, include_llm):
+    """Monta os nós do DAG para as etapas e datasets selecionados."""
+    selected = set(stages)
+    if not include_llm:
+        selected.discard("extract")
+
+    raw_files = {}
+    if os.path.isdir(RAW_DATASETS_DIR):
+        raw_files = {PreprocessDatasets.dataset_name(f): f for f in PreprocessDatasets.list_input_files(RAW_DATASETS_DIR)}
+
+    def documents(dataset):
+        return os.path.join(PROCESSED_DIR, dataset, "documents", "*.json")
+
+    dag = []
+    if "preprocess" in selected:
+        for dataset in datasets:
+            if dataset in raw_files:
+                dag.append(Stage(
+                    f"preprocess:{dataset}", run_preprocess, (raw_files[dataset],),
+                    inputs=[CompressedIO.physical_path(os.path.join(RAW_DATASETS_DIR, raw_files[dataset]))],
+                    outputs=[documents(dataset)],
+                ))
+
+    if "training_pairs" in selected:
+        raw_inputs = sorted({CompressedIO.physical_path(os.path.join(RAW_DATASETS_DIR, raw_files[d]))
+                             for d in datasets if d in raw_files})
+        dag.append(Stage(
+            "training_pairs", run_training_pairs,
+            inputs=raw_inputs,
+            outputs=[schemaGeneration.MANIFEST_PATH,
+                     os.path.join(schemaGeneration.PROCESSED_SCHEMAS_DIR, "*.schema.json")],
+        ))
+
+    if "manifest" in selected:
+        dag.append(Stage(
+            "manifest", run_manifest,
+            inputs=[documents(d) for d in datasets],
+            outputs=[MANIFEST_PATH],
+            deps=[s.name for s in dag if s.name.startswith("preprocess:")],
+        ))
+
+    if "extract" in selected:
+        dag.append(Stage(
+            "extract", run_extraction,
+            inputs=[MANIFEST_PATH] + [documents(d) for d in datasets],
+            outputs=[os.path.join(SCHEMA_DOCUMENTS_DIR, "**", "*.json")],
+            deps=[s.name for s in dag if s.name == "manifest"],
+        ))
+
+    if "clean" in selected:
+        dag.append(Stage(
+            "clean", run_clean,
+            inputs=[os.path.join(SCHEMA_DOCUMENTS_DIR, "**", "*.json")],
+            outputs=[os.path.join(SCHEMA_DOCUMENTS_DIR, "**", "*.json")],
+            deps=[s.name for s in dag if s.name == "extract"],
+        ))
+
+    if "sync_manifest" in selected:
+        dag.append(Stage(
+            "sync_manifest", run_sync_manifest,
+            inputs=[MANIFEST_PATH, os.path.join(SCHEMA_DOCUMENTS_DIR, "**", "*.json")],
+            outputs=[MANIFEST_PATH],
+            deps=[s.name for s in dag if s.name in ("manifest", "extract", "clean")],
+        ))
+
+    upstream = [s.name for s in dag if s.name in ("manifest", "extract", "clean", "sync_manifest")]
+    for dataset in datasets:
+        if "merge" in selected:
+            dag.append(Stage(
+                f"merge:{dataset}", run_merge, (dataset,),
+                inputs=[os.path.join(SCHEMA_DOCUMENTS_DIR, dataset, "**", "*.json"),
+                        SchemaStore.index_path(dataset)],
+                outputs=[os.path.join(MASTER_SCHEMA_DIR, f"{dataset}_master_schema.json")],
+                deps=[n for n in upstream if n != "manifest"],
+            ))
+        if "traditional" in selected:
+            dag.append(Stage(
+                f"traditional:{dataset}", run_traditional, (dataset,),
+                inputs=[MANIFEST_PATH, documents(dataset)],
+                outputs=[os.path.join(TRADITIONAL_SCHEMA_DIR, f"{dataset}_traditional_schema.json")],
+                deps=upstream,
+            ))
+
+    if "compare" in selected:
+        dag.append(Stage(
+            "compare", run_compare,
+            inputs=[os.path.join(MASTER_SCHEMA_DIR, "*_master_schema.json"),
+                    os.path.join(TRADITIONAL_SCHEMA_DIR, "*_traditional_schema.json"),
+                    os.path.join(SchemaCompare.THRESHOLD_SWEEP_DIR, "*", "*.json")],
+            outputs=[SchemaCompare.COMPARISON_OUTPUT],
+            deps=[s.name for s in dag if s.name.startswith(("merge:", "traditional:"))],
+        ))
+    return dag
+
+
+# --- EXECUÇÃO ---
+
+def run_dag(dag, workers=None, force=False, dry_run=False):
+    """
+    Executa o DAG: etapas prontas (dependências concluídas) são despachadas para um
+    pool de processos; etapas cujas entradas/saídas não mudaram são puladas.
+    Retorna a lista de resultados {stage, status, seconds}.
+    """
+    state = load_state()
+    file_cache = state["files"]
+    by_name = {s.name: s for s in dag}
+    status = {}
+    results = []
+    running = {}
+    started_at = {}
+    t_pipeline = time.time()
+
+    def finish(stage, outcome, seconds):
+        status[stage.name] = outcome
+        results.append({"stage": stage.name, "status": outcome, "seconds": seconds})
+        print(f"[PIPELINE] {stage.name}: {outcome} ({seconds:.2f}s)")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while len(status) < len(dag):
+            for stage in dag:
+                if stage.name in status or stage.name in running.values():
+                    continue
+                dep_states = [status.get(d) for d in stage.deps if d in by_name]
+                if any(s is None for s in dep_states):
+                    continue
+                if any(s in ("falhou", "bloqueado") for s in dep_states):
+                    finish(stage, "bloqueado", 0.0)
+                    continue
+
+                t0 = time.time()
+                inputs_fp = fingerprint(stage.inputs, file_cache)
+                if inputs_fp is None:
+                    finish(stage, "sem entradas", time.time() - t0)
+                    continue
+                previous = state["stages"].get(stage.name, {})
+                if not force and previous.get("inputs") == inputs_fp and "outputs" in previous \
+                        and previous["outputs"] == fingerprint(stage.outputs, file_cache):
+                    finish(stage, "em cache", time.time() - t0)
+                    continue
+                if dry_run:
+                    finish(stage, "pendente", time.time() - t0)
+                    continue
+
+                print(f"[PIPELINE] Iniciando {stage.name}...")
+                started_at[stage.name] = time.time()
+                if Instrumentation.METRICS.enabled:
+                    future = executor.submit(Instrumentation.call_instrumented, stage.name, stage.func, *stage.args)
+                else:
+                    future = executor.submit(stage.func, *stage.args)
+                running[future] = stage.name
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = by_name[running.pop(future)]
+                seconds = time.time() - started_at[stage.name]
+                try:
+                    result = future.result()
+                    if Instrumentation.METRICS.enabled:
+                        result, worker_metrics = result
+                        Instrumentation.METRICS.merge(worker_metrics)
+                    ok = result is not False
+                except Exception as e:
+                    print(f"[PIPELINE] Erro em {stage.name}: {e}")
+                    ok = False
+                if ok:
+                    # Hashes medidos depois da execução: etapas que reescrevem as próprias
+                    # entradas (ex.: sync_manifest) ficam estáveis na próxima execução.
+                    state["stages"][stage.name] = {
+                        "inputs": fingerprint(stage.inputs, file_cache),
+                        "outputs": fingerprint(stage.outputs, file_cache),
+                        "seconds": seconds,
+                    }
+                    # Se a etapa reescreveu saídas de uma dependência (ex.: sync_manifest
+                    # atualiza o manifest.csv gerado por manifest), a dependência passa a
+                    # reconhecer a versão atual como sua, para não ser reexecutada à toa.
+                    for dep in stage.deps:
+                        dep_state = state["stages"].get(dep)
+                        if dep in by_name and dep_state and set(by_name[dep].outputs) & set(stage.outputs):
+                            dep_state["outputs"] = fingerprint(by_name[dep].outputs, file_cache)
+                    save_state(state)
+                finish(stage, "executado" if ok else "falhou", seconds)
+
+    save_state(state)
+    print_report(results, time.time() - t_pipeline)
+    if Instrumentation.METRICS.enabled:
+        Instrumentation.METRICS.write_report()
+        print(f"Métricas salvas em: {Instrumentation.RUN_REPORT_FILE} e {Instrumentation.PROMETHEUS_FILE}")
+    return results
+
+
+def print_report(results, total_seconds):
+    """Imprime o relatório de tempo por etapa."""
+    print("\n--- Relatório do Pipeline ---")
+    width = max([len(r["stage"]) for r in results] + [5])
+    print(f"{'Etapa'.ljust(width)}  {'Status'.ljust(12)}  Tempo (s)")
+    for r in sorted(results, key=lambda r: -r["seconds"]):
+        print(f"{r['stage'].ljust(width)}  {r['status'].ljust(12)}  {r['seconds']:9.2f}")
+    print(f"Tempo total (parede): {total_seconds:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Orquestrador do pipeline de descoberta de schemas.")
+    parser.add_argument("--stages", default=",".join(ALL_STAGES),
+                        help=f"Etapas a executar, separadas por vírgula ({','.join(ALL_STAGES)})")
+    parser.add_argument("--datasets", default=None, help="Datasets a considerar (padrão: todos os encontrados)")
+    parser.add_argument("--llm", action="store_true", help="Inclui a etapa de extração com LLM")
+    parser.add_argument("--workers", type=int, default=None, help="Processos paralelos (padrão: nº de CPUs)")
+    parser.add_argument("--force", action="store_true", help="Ignora o cache e executa todas as etapas")
+    parser.add_argument("--dry-run", action="store_true", help="Só mostra o que seria executado")
+    parser.add_argument("--metrics", action="store_true", help="Grava o relatório de desempenho da execução")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="Com --metrics, inclui snapshots do tracemalloc por etapa")
+    args = parser.parse_args()
+    if args.metrics and not Instrumentation.METRICS.enabled:
+        Instrumentation.enable(trace_memory=args.tracemalloc)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in ALL_STAGES]
+    if unknown:
+        print(f" ERRO: Etapas desconhecidas: {', '.join(unknown)}")
+        sys.exit(2)
+
+    datasets = [d.strip() for d in args.datasets.split(",")] if args.datasets else discover_datasets()
+    if not datasets:
+        print(f"Nenhum dataset encontrado em '{RAW_DATASETS_DIR}' ou '{PROCESSED_DIR}'.")
+        return
+
+    dag = build_dag(stages, datasets, args.llm)
+    print(f"[PIPELINE] {len(dag)} etapas para {len(datasets)} datasets: {', '.join(datasets)}")
+    results = run_dag(dag, workers=args.workers, force=args.force, dry_run=args.dry_run)
+    if any(r["status"] == "falhou" for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
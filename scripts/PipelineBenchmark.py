@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Benchmark reprodutível das etapas do pipeline.
+
+Cada corpus é gerado pelo SinteticJson com semente e número de shards fixos (a
+mesma entrada em toda execução) e guardado em benchmarks/corpora/ para ser
+reaproveitado. Sobre ele são cronometradas, na ordem do pipeline:
+
+    reduce_and_sample_file -> jsonlines_tojson (só JSONL) -> split_json_file ->
+    analyze_json -> build_manifest -> genson (JsonSchema) -> extração (LLMExtraction
+    com o backend "stub") -> update_stats_tree -> build_schema_from_stats
+
+O backend "stub" (LLMBackends) responde com o schema do genson, então a etapa de
+extração mede tudo em volta do modelo (compactação, parse, gravação) de forma
+determinística. Cada etapa roda `--repeats` vezes e vale o menor tempo.
+
+Os resultados podem ser salvos como baseline (benchmarks/baselines/<nome>.json)
+e comparados depois: uma etapa regride quando fica mais lenta que o baseline além
+da tolerância relativa (e de um piso absoluto, para ignorar ruído em etapas de
+milissegundos).
+
+Uso (a partir da raiz do projeto):
+    python3 scripts/PipelineBenchmark.py run --sizes 5MB --save-baseline main
+    python3 scripts/PipelineBenchmark.py run --sizes 5MB,100MB --shapes uniform --compare main
+    python3 scripts/PipelineBenchmark.py compare main benchmarks/results.json --tolerance 0.15
+"""
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import platform
+import argparse
+import contextlib
+from datetime import datetime
+
+if __package__:
+    from . import SinteticJson
+    from . import PreprocessDatasets
+    from . import JsonComplexity
+    from . import JsonSchema
+    from . import jsonMerge
+    from . import LLMExtraction
+    from .LLMBackends import load_backend
+    from .Settings import apply_settings
+else:
+    import SinteticJson
+    import PreprocessDatasets
+    import JsonComplexity
+    import JsonSchema
+    import jsonMerge
+    import LLMExtraction
+    from LLMBackends import load_backend
+    from Settings import apply_settings
+
+# --- CONFIGURAÇÕES ---
+BENCH_DIR = "benchmarks/"
+CORPORA_DIR = os.path.join(BENCH_DIR, "corpora")
+WORK_DIR = os.path.join(BENCH_DIR, "work")
+BASELINES_DIR = os.path.join(BENCH_DIR, "baselines")
+RESULTS_FILE = os.path.join(BENCH_DIR, "results.json")
+SEED = 42
+# Fixo para que o corpus seja o mesmo em qualquer máquina (a saída depende dos shards).
+SHARDS = 4
+SIZES = ["5MB", "100MB", "1GB"]
+# Formatos de corpus: arquivo (array/jsonl) e variação do schema (ver SinteticJson).
+SHAPES = {
+    "uniform": {"format": "array", "variation": {}},
+    "heterogeneous": {"format": "array", "variation": {"optional_rate": 0.3, "polymorphism_rate": 0.1,
+                                                       "nesting_depth": 3, "key_space": 200}},
+    "jsonl": {"format": "jsonl", "variation": {"optional_rate": 0.3}},
+}
+# O pré-processamento reduz o corpus a 1/REDUCE_FACTOR do tamanho (mínimo 1 MB).
+REDUCE_FACTOR = 4
+# Documentos usados nas etapas por documento (os primeiros, em ordem).
+MAX_DOCUMENTS = 20000
+REPEATS = 3
+REGRESSION_TOLERANCE = 0.15
+# Diferenças abaixo deste valor (s) nunca contam como regressão.
+MIN_REGRESSION_SECONDS = 0.05
+# ---------------------
+apply_settings(globals())
+
+
+def corpus_name(size, shape):
+    return f"bench_{size.lower()}_{shape}"
+
+
+def ensure_corpus(size, shape):
+    """Gera o corpus (se ainda não existir com os mesmos parâmetros) e devolve seu caminho."""
+    spec = SHAPES[shape]
+    name = corpus_name(size, shape)
+    ext = "json" if spec["format"] == "array" else "jsonl"
+    path = os.path.abspath(os.path.join(CORPORA_DIR, f"{name}.{ext}"))
+    params = {"size_bytes": SinteticJson.parse_size(size), "format": spec["format"], "seed": SEED,
+              "shards": SHARDS, "variation": spec["variation"]}
+    meta_path = f"{path}.meta.json"
+    if os.path.exists(path) and os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            if json.load(f) == params:
+                return path
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        SinteticJson.generate_corpus(path, params["size_bytes"], file_format=spec["format"], seed=SEED,
+                                     shards=SHARDS, variation=spec["variation"])
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(params, f)
+    return path
+
+
+def best_time(func, repeats):
+    """Menor tempo de `repeats` execuções de func() e o valor devolvido pela última."""
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            result = func()
+        best = min(best, time.perf_counter() - t0)
+        if result is False:
+            raise RuntimeError("a etapa devolveu False (veja a saída do script correspondente)")
+    return best, result
+
+
+def run_corpus(size, shape, repeats=REPEATS, max_documents=MAX_DOCUMENTS):
+    """Cronometra todas as etapas sobre um corpus. Retorna {etapa: {seconds, items, mb_per_sec}}."""
+    corpus_path = ensure_corpus(size, shape)
+    name = corpus_name(size, shape)
+    work = os.path.abspath(os.path.join(WORK_DIR, name))
+    shutil.rmtree(work, ignore_errors=True)
+    os.makedirs(work)
+    results = {}
+
+    def record(stage, seconds, items, nbytes=None):
+        results[stage] = {"seconds": seconds, "items": items,
+                          "mb_per_sec": nbytes / 2**20 / seconds if nbytes and seconds else None}
+        print(f"  {stage:<24} {seconds:9.3f}s  ({items} itens)")
+
+    cwd = os.getcwd()
+    os.chdir(work)  # os scripts usam caminhos relativos à raiz do projeto
+    try:
+        dataset_dir = os.path.join(JsonComplexity.DATASET_DIR, name)
+        os.makedirs(dataset_dir)
+        ext = os.path.splitext(corpus_path)[1]
+        reduced = os.path.join(dataset_dir, f"{name}_reduced{ext}")
+        target_mb = max(1, os.path.getsize(corpus_path) // 2**20 // REDUCE_FACTOR)
+        seconds, _ = best_time(lambda: PreprocessDatasets.reduce_and_sample_file(corpus_path, reduced, target_mb),
+                               repeats)
+        record("reduce_and_sample_file", seconds, 1, os.path.getsize(corpus_path))
+
+        to_split = reduced
+        if ext == ".jsonl":
+            to_split = os.path.join(dataset_dir, f"{name}_reduced_converted.json")
+            seconds, _ = best_time(lambda: PreprocessDatasets.jsonlines_tojson(reduced, to_split), repeats)
+            record("jsonlines_tojson", seconds, 1, os.path.getsize(reduced))
+
+        docs_dir = os.path.join(dataset_dir, "documents")
+        seconds, _ = best_time(lambda: PreprocessDatasets.split_json_file(to_split, docs_dir), repeats)
+        documents = len(os.listdir(docs_dir))
+        record("split_json_file", seconds, documents, os.path.getsize(to_split))
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            PreprocessDatasets.cleanup_intermediate_files(dataset_dir)
+
+        # Mesma ordem em toda execução: document_1, document_2, ...
+        doc_paths = sorted(glob.glob(os.path.join(docs_dir, "*.json")),
+                           key=lambda p: int(os.path.basename(p)[len("document_"):-len(".json")]))
+        for path in doc_paths[max_documents:]:
+            os.remove(path)
+        doc_paths = doc_paths[:max_documents]
+        docs_bytes = sum(os.path.getsize(p) for p in doc_paths)
+        docs = []
+        for path in doc_paths:
+            with open(path, "r", encoding="utf-8") as f:
+                docs.append(json.load(f))
+
+        seconds, _ = best_time(lambda: [JsonComplexity.analyze_json(d) for d in docs], repeats)
+        record("analyze_json", seconds, len(docs), docs_bytes)
+
+        seconds, _ = best_time(JsonComplexity.build_manifest, repeats)
+        record("build_manifest", seconds, len(docs), docs_bytes)
+
+        seconds, _ = best_time(lambda: JsonSchema.generate_master_schema_for_directory(doc_paths), repeats)
+        record("genson", seconds, len(docs), docs_bytes)
+
+        backend = load_backend("stub", None)
+        backend.name, backend.draft_name = "stub", None
+        schema_dir = os.path.join(LLMExtraction.OUTPUT_DIR, name)
+
+        def extract_all():
+            for path in doc_paths:
+                output = os.path.join(schema_dir, "documents", os.path.basename(path))
+                LLMExtraction.extract_schema_from_file(backend, None, path, output, "stub")
+
+        seconds, _ = best_time(extract_all, repeats)
+        record("llm_extraction", seconds, len(docs), docs_bytes)
+
+        schemas = []
+        for path in sorted(glob.glob(os.path.join(schema_dir, "**", "*.json"), recursive=True)):
+            schema = jsonMerge.load_and_repair_json(path)
+            if schema is not None:
+                jsonMerge.repair_schema_structure(schema)
+                schemas.append(schema)
+
+        def merge_all():
+            tree = jsonMerge.new_stats_tree()
+            for schema in schemas:
+                jsonMerge.update_stats_tree(tree, schema)
+            return tree
+
+        seconds, tree = best_time(merge_all, repeats)
+        record("update_stats_tree", seconds, len(schemas))
+        seconds, _ = best_time(lambda: jsonMerge.build_schema_from_stats(tree), repeats)
+        record("build_schema_from_stats", seconds, 1)
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+def machine_info():
+    return {"platform": platform.platform(), "python": platform.python_version(),
+            "processor": platform.processor() or platform.machine(), "cpus": os.cpu_count()}
+
+
+def baseline_path(name):
+    return name if name.endswith(".json") else os.path.join(BASELINES_DIR, f"{name}.json")
+
+
+def save_json(data, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def compare(baseline, current, tolerance=REGRESSION_TOLERANCE, min_seconds=MIN_REGRESSION_SECONDS):
+    """
+    Compara dois resultados etapa a etapa. Retorna linhas (corpus, etapa, base, atual,
+    variação, status), com status REGRESSÃO, MELHORA, OK, ITENS DIFERENTES ou NOVA.
+    """
+    rows = []
+    for corpus, stages in current["corpora"].items():
+        base_stages = baseline["corpora"].get(corpus, {})
+        for stage, result in stages.items():
+            base = base_stages.get(stage)
+            if base is None:
+                rows.append((corpus, stage, None, result["seconds"], None, "NOVA"))
+                continue
+            change = (result["seconds"] - base["seconds"]) / base["seconds"] if base["seconds"] else 0.0
+            delta = result["seconds"] - base["seconds"]
+            if base["items"] != result["items"]:
+                status = "ITENS DIFERENTES"
+            elif change > tolerance and delta > min_seconds:
+                status = "REGRESSÃO"
+            elif change < -tolerance and -delta > min_seconds:
+                status = "MELHORA"
+            else:
+                status = "OK"
+            rows.append((corpus, stage, base["seconds"], result["seconds"], change, status))
+    return rows
+
+
+def print_comparison(rows, baseline, current):
+    if baseline["machine"] != current["machine"]:
+        print("Aviso: baseline medido em outra máquina; os tempos podem não ser comparáveis.")
+    print(f"{'Corpus':<32} {'Etapa':<24} {'Base (s)':>9} {'Atual (s)':>10} {'Variação':>9}  Status")
+    for corpus, stage, base, now, change, status in rows:
+        base_text = f"{base:9.3f}" if base is not None else f"{'-':>9}"
+        change_text = f"{change:+9.1%}" if change is not None else f"{'-':>9}"
+        print(f"{corpus:<32} {stage:<24} {base_text} {now:10.3f} {change_text}  {status}")
+    regressions = sum(1 for r in rows if r[5] in ("REGRESSÃO", "ITENS DIFERENTES"))
+    print(f"\n{regressions} regressões em {len(rows)} etapas.")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reprodutível das etapas do pipeline.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="Executa o benchmark")
+    run.add_argument("--sizes", default=SIZES[0], help=f"Tamanhos separados por vírgula ({','.join(SIZES)})")
+    run.add_argument("--shapes", default=",".join(SHAPES), help=f"Formatos ({','.join(SHAPES)})")
+    run.add_argument("--repeats", type=int, default=REPEATS)
+    run.add_argument("--max-documents", type=int, default=MAX_DOCUMENTS)
+    run.add_argument("--output", default=RESULTS_FILE, help="Arquivo JSON com os resultados")
+    run.add_argument("--save-baseline", default=None, help="Salva os resultados como baseline com este nome")
+    run.add_argument("--compare", default=None, help="Compara com o baseline deste nome ao final")
+    run.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    cmp_parser = sub.add_parser("compare", help="Compara resultados com um baseline")
+    cmp_parser.add_argument("baseline", help="Nome do baseline ou caminho de um JSON")
+    cmp_parser.add_argument("results", nargs="?", default=RESULTS_FILE)
+    cmp_parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        shapes = [s.strip() for s in args.shapes.split(",") if s.strip()]
+        unknown = [s for s in shapes if s not in SHAPES]
+        if unknown:
+            print(f" ERRO: Formatos desconhecidos: {', '.join(unknown)}")
+            sys.exit(2)
+        current = {"created_at": datetime.now().isoformat(), "machine": machine_info(), "seed": SEED,
+                   "repeats": args.repeats, "max_documents": args.max_documents, "corpora": {}}
+        for size in [s.strip() for s in args.sizes.split(",") if s.strip()]:
+            for shape in shapes:
+                print(f"\n--- {corpus_name(size, shape)} ---")
+                current["corpora"][corpus_name(size, shape)] = run_corpus(size, shape, args.repeats,
+                                                                          args.max_documents)
+        save_json(current, args.output)
+        print(f"\nResultados salvos em: {args.output}")
+        if args.save_baseline:
+            save_json(current, baseline_path(args.save_baseline))
+            print(f"Baseline salvo em: {baseline_path(args.save_baseline)}")
+        if not args.compare:
+            return
+        baseline_name = args.compare
+    else:
+        baseline_name = args.baseline
+        try:
+            with open(args.results, "r", encoding="utf-8") as f:
+                current = json.load(f)
+        except FileNotFoundError:
+            print(f"❌ ERRO: Resultados '{args.results}' não encontrados."); sys.exit(2)
+
+    try:
+        with open(baseline_path(baseline_name), "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"❌ ERRO: Baseline '{baseline_path(baseline_name)}' não encontrado."); sys.exit(2)
+    rows = compare(baseline, current, args.tolerance)
+    if print_comparison(rows, baseline, current):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,21 @@ import os
 import json
 import shutil
 import ijson
+if __package__:
+    from .Instrumentation import timed
+    from . import CompressedIO
+    from .Settings import apply_settings
+else:
+    from Instrumentation import timed
+    import CompressedIO
+    from Settings import apply_settings
 
 # --- Configurações ---
 input_dir = "datasets"  # onde estão os arquivos originais
 output_base_dir = "processed"
 size_target = 80  # MB para cada arquivo reduzido
 # --------------------
+apply_settings(globals())
 
 def cleanup_intermediate_files(directory):
     """
@@ -29,14 +38,17 @@ def cleanup_intermediate_files(directory):
         return False
 
 
+@timed()
 def reduce_and_sample_file(entry_file, output_file, size_target):
     """
     Lê um arquivo JSON ou JSON Lines e cria uma versão menor, fazendo amostragem
     dos elementos para atingir um tamanho de arquivo alvo aproximado.
     Esta versão detecta o formato do arquivo pelo conteúdo, não pela extensão.
+    Arquivos comprimidos (ver CompressedIO) são lidos por streaming; o tamanho
+    considerado é o do conteúdo descomprimido.
     """
     try:
-        original_size = os.path.getsize(entry_file)
+        original_size = CompressedIO.uncompressed_size(entry_file)
         if original_size == 0:
             print(f"  Arquivo vazio: {entry_file}")
             return False
@@ -45,7 +57,10 @@ def reduce_and_sample_file(entry_file, output_file, size_target):
 
         if original_size <= size_target_bytes:
             print("  Arquivo já é menor que o alvo, copiando...")
-            shutil.copy(entry_file, output_file)
+            if CompressedIO.codec_of(entry_file) == "none":
+                shutil.copy(entry_file, output_file)
+            else:
+                CompressedIO.copy_to_file(entry_file, output_file)
             return True
 
         sampling_rate = round(original_size / size_target_bytes)
@@ -57,34 +72,33 @@ def reduce_and_sample_file(entry_file, output_file, size_target):
         )
 
         file_format = None
-        with open(entry_file, 'r', encoding='utf-8') as f_peek:
-            chunk = f_peek.read(100).strip()
-            if chunk.startswith('['):
-                file_format = 'json_array'
-                print("  Formato detectado: JSON Array")
-            elif chunk.startswith('{'):
-                file_format = 'json_lines'
-                print("  Formato detectado: JSON Lines")
-            else:
-                print(f"  ERRO: Formato de arquivo desconhecido em {entry_file}. Não começa com '[' ou '{{'.")
-                return False
+        chunk = CompressedIO.peek_text(entry_file, 100).strip()
+        if chunk.startswith('['):
+            file_format = 'json_array'
+            print("  Formato detectado: JSON Array")
+        elif chunk.startswith('{'):
+            file_format = 'json_lines'
+            print("  Formato detectado: JSON Lines")
+        else:
+            print(f"  ERRO: Formato de arquivo desconhecido em {entry_file}. Não começa com '[' ou '{{'.")
+            return False
 
         counter = 0
         items_written = 0
 
         with open(output_file, "w", encoding="utf-8") as f_out:
             if file_format == 'json_lines':
-                with open(entry_file, "r", encoding="utf-8") as f_in:
+                with CompressedIO.open_text(entry_file) as f_in:
                     for line in f_in:
                         if counter % sampling_rate == 0:
                             f_out.write(line)
                             items_written += 1
                         counter += 1
             elif file_format == 'json_array':
-                with open(entry_file, "rb") as f_in:
+                with CompressedIO.open_binary(entry_file) as f_in:
                     f_out.write('[')
                     first_item = True
-                    parser = ijson.items(f_in, 'item')
+                    parser = ijson.items(f_in, 'item', use_float=True)
                     for item in parser:
                         if counter % sampling_rate == 0:
                             if not first_item:
@@ -105,6 +119,7 @@ def reduce_and_sample_file(entry_file, output_file, size_target):
         return False
 
 
+@timed()
 def jsonlines_tojson(jsonline_file, json_file):
     """Converte JSONL → JSON (array de objetos)."""
     try:
@@ -122,6 +137,7 @@ def jsonlines_tojson(jsonline_file, json_file):
         return False
 
 
+@timed()
 def split_json_file(input_file, output_dir):
     """Divide JSON (lista de objetos) em arquivos individuais."""
     try:
@@ -142,47 +158,78 @@ def split_json_file(input_file, output_dir):
         return False
 
 
+@timed()
+def process_file(file_name, input_dir, output_base_dir, size_target):
+    """
+    Reduz, converte (se for JSONL) e divide um único arquivo de `input_dir` em
+    documentos individuais em `output_base_dir/<nome>/documents/`.
+    Retorna True se os documentos foram gerados.
+    """
+    file_path = os.path.join(input_dir, file_name)
+    name, ext = os.path.splitext(CompressedIO.logical_name(file_name))
+    output_dir = os.path.join(output_base_dir, name)
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"\n--- Processando: {file_name} ---")
+
+    reduced_file = os.path.join(output_dir, f"{name}_reduced{ext}")
+
+    if not reduce_and_sample_file(file_path, reduced_file, size_target):
+        return False
+
+    final_json_to_split = None
+
+    # Após reduzir, precisamos ter um arquivo JSON Array para dividir.
+    with open(reduced_file, 'r', encoding='utf-8') as f_peek:
+        chunk = f_peek.read(100).strip()
+        if not chunk:
+            print(f"  Arquivo reduzido está vazio. Pulando divisão e limpeza.")
+            return False
+
+        if chunk.startswith('['):
+            final_json_to_split = reduced_file
+        elif chunk.startswith('{'):
+            converted_json = os.path.join(output_dir, f"{name}_reduced_converted.json")
+            if jsonlines_tojson(reduced_file, converted_json):
+                final_json_to_split = converted_json
+
+    if not final_json_to_split:
+        print(f"  Não foi possível determinar o arquivo final para dividir para {file_name}")
+        return False
+
+    docs_dir = os.path.join(output_dir, "documents")
+    # Se a divisão for bem-sucedida, limpe os arquivos
+    if split_json_file(final_json_to_split, docs_dir):
+        cleanup_intermediate_files(output_dir) # <<< CHAMADA DA FUNÇÃO DE LIMPEZA
+        return True
+    return False
+
+
+def list_input_files(input_dir):
+    """
+    Lista os arquivos de `input_dir` que o pré-processamento aceita: .json/.jsonl,
+    comprimidos ou não (.gz, .bz2, .xz, .zst), e os membros .json/.jsonl de cada
+    .zip, como "arquivo.zip::membro.json".
+    """
+    return CompressedIO.list_files(input_dir)
+
+
+def dataset_name(file_name):
+    """Nome do dataset gerado a partir de um arquivo de entrada (ex.: 'tweets.jsonl.gz' -> 'tweets')."""
+    return os.path.splitext(CompressedIO.logical_name(file_name))[0]
+
+
 def process_all_files(input_dir, output_base_dir, size_target):
     os.makedirs(output_base_dir, exist_ok=True)
 
-    for file_name in os.listdir(input_dir):
-        if not (file_name.endswith(".json") or file_name.endswith(".jsonl")):
-            continue
+    for file_name in list_input_files(input_dir):
+        process_file(file_name, input_dir, output_base_dir, size_target)
+    CompressedIO.print_throughput()
 
-        file_path = os.path.join(input_dir, file_name)
-        name, ext = os.path.splitext(file_name)
-        output_dir = os.path.join(output_base_dir, name)
-        os.makedirs(output_dir, exist_ok=True)
 
-        print(f"\n--- Processando: {file_name} ---")
-
-        reduced_file = os.path.join(output_dir, f"{name}_reduced{ext}")
-
-        if reduce_and_sample_file(file_path, reduced_file, size_target):
-            final_json_to_split = None
-            
-            # Após reduzir, precisamos ter um arquivo JSON Array para dividir.
-            with open(reduced_file, 'r', encoding='utf-8') as f_peek:
-                chunk = f_peek.read(100).strip()
-                if not chunk:
-                    print(f"  Arquivo reduzido está vazio. Pulando divisão e limpeza.")
-                    continue
-                
-                if chunk.startswith('['):
-                    final_json_to_split = reduced_file
-                elif chunk.startswith('{'):
-                    converted_json = os.path.join(output_dir, f"{name}_reduced_converted.json")
-                    if jsonlines_tojson(reduced_file, converted_json):
-                        final_json_to_split = converted_json
-
-            if final_json_to_split:
-                docs_dir = os.path.join(output_dir, "documents")
-                # Se a divisão for bem-sucedida, limpe os arquivos
-                if split_json_file(final_json_to_split, docs_dir):
-                    cleanup_intermediate_files(output_dir) # <<< CHAMADA DA FUNÇÃO DE LIMPEZA
-            else:
-                 print(f"  Não foi possível determinar o arquivo final para dividir para {file_name}")
+def main():
+    process_all_files(input_dir, output_base_dir, size_target)
 
 
 if __name__ == "__main__":
-    process_all_files(input_dir, output_base_dir, size_target)
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Compactação dos documentos enviados à LLM.
+
+O schema de um documento não depende da indentação, de todos os elementos de
+arrays longos nem do texto completo de strings longas. Este módulo monta o prompt
+de extração com o documento compactado em níveis progressivos, parando no
+primeiro nível cujo prompt cabe no orçamento de tokens do modelo (medido com o
+tokenizer real):
+
+    0: JSON minificado
+    1: + arrays reduzidos a elementos estruturalmente distintos, strings longas elididas
+    2: + limites mais agressivos de arrays e strings
+    3: + todos os valores escalares trocados por placeholders do mesmo tipo
+
+As chaves são sempre preservadas.
+
+Uso (a partir da raiz do projeto), para medir a economia sem gerar nada:
+    python3 scripts/PromptCompaction.py processed/twitter/documents --tokenizer <caminho do modelo>
+"""
+import os
+import csv
+import glob
+import json
+import argparse
+from datetime import datetime
+if __package__:
+    from .Settings import apply_settings
+else:
+    from Settings import apply_settings
+
+# --- CONFIGURAÇÕES ---
+# Parâmetros de cada nível: (máx. de elementos distintos por array, máx. de caracteres por string, placeholders)
+COMPACTION_LEVELS = [
+    (None, None, False),
+    (3, 200, False),
+    (2, 40, False),
+    (2, 16, True),
+]
+ELISION_MARK = "…"
+COMPACTION_LOG_FILE = "compaction_log.csv"
+# Aproximação usada só quando não há tokenizer disponível.
+CHARS_PER_TOKEN = 4
+# ---------------------
+apply_settings(globals())
+
+PROMPT_PREFIX = (
+    "You are a data schema extraction expert.\n"
+    "Generate only the JSON Schema (in standard JSON Schema Draft 2020-12 format) for the following JSON document.\n\n"
+    "- Include 'required' when it can be clearly inferred.\n"
+    "- Do not include 'description' for any field.\n"
+    "- Output only the schema, no explanations or extra text. End your response after the final '}'.\n\n"
+    "Input JSON:\n"
+    "```json\n"
+)
+PROMPT_SUFFIX = (
+    "\n```\n\n"
+    "JSON Schema:\n"
+    "```json\n"
+)
+
+
+def build_prompt(document_text):
+    """Monta o prompt de extração de schema para um documento já serializado."""
+    return PROMPT_PREFIX + document_text + PROMPT_SUFFIX
+
+
+def count_tokens(tokenizer, text):
+    """Nº de tokens de `text` segundo o tokenizer (ou uma aproximação se não houver tokenizer)."""
+    if tokenizer is None:
+        return max(1, len(text) // CHARS_PER_TOKEN)
+    return len(tokenizer.encode(text))
+
+
+def structural_signature(value):
+    """
+    Assinatura estrutural de um valor: tipos e chaves, ignorando os valores em si.
+    Dois elementos com a mesma assinatura contribuem igualmente para o schema.
+    """
+    if isinstance(value, dict):
+        return ("object", tuple(sorted((k, structural_signature(v)) for k, v in value.items())))
+    if isinstance(value, list):
+        return ("array", tuple(sorted({structural_signature(v) for v in value}, key=repr)))
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer"
+    if isinstance(value, float):
+        return "number"
+    return "string"
+
+
+def _placeholder(value):
+    """Valor substituto do mesmo tipo JSON."""
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return 0
+    if isinstance(value, float):
+        return 0.5
+    return "s"
+
+
+def compact_value(value, max_array_items=None, max_string_chars=None, placeholders=False):
+    """
+    Devolve uma cópia compactada de `value`, preservando todas as chaves:
+    - arrays ficam com até `max_array_items` elementos de assinaturas estruturais distintas;
+    - strings maiores que `max_string_chars` são cortadas e marcadas com ELISION_MARK;
+    - com `placeholders`, todo valor escalar vira um placeholder do mesmo tipo.
+    """
+    if isinstance(value, dict):
+        return {k: compact_value(v, max_array_items, max_string_chars, placeholders) for k, v in value.items()}
+    if isinstance(value, list):
+        if max_array_items is None:
+            items = value
+        else:
+            items, seen = [], set()
+            for item in value:
+                signature = structural_signature(item)
+                if signature not in seen:
+                    seen.add(signature)
+                    items.append(item)
+                    if len(items) >= max_array_items:
+                        break
+        return [compact_value(v, max_array_items, max_string_chars, placeholders) for v in items]
+    if placeholders:
+        return _placeholder(value)
+    if isinstance(value, str) and max_string_chars is not None and len(value) > max_string_chars:
+        return value[:max_string_chars] + ELISION_MARK
+    return value
+
+
+def compact_prompt(data, tokenizer=None, token_budget=None, measure_baseline=True):
+    """
+    Monta o prompt de extração para `data` com o menor nível de compactação que
+    cabe em `token_budget` (sem orçamento, usa só o nível 0). Se nenhum nível couber,
+    usa o mais agressivo. Retorna (prompt, info) com os tokens antes/depois.
+    """
+    info = {"level": 0, "tokens_before": None, "tokens_after": 0, "fits_budget": True}
+    if measure_baseline:
+        info["tokens_before"] = count_tokens(tokenizer, build_prompt(json.dumps(data, indent=2)))
+
+    prompt = None
+    for level, (max_items, max_chars, placeholders) in enumerate(COMPACTION_LEVELS):
+        compacted = compact_value(data, max_items, max_chars, placeholders) if level else data
+        prompt = build_prompt(json.dumps(compacted, ensure_ascii=False, separators=(",", ":")))
+        info["level"] = level
+        info["tokens_after"] = count_tokens(tokenizer, prompt)
+        if token_budget is None or info["tokens_after"] <= token_budget:
+            break
+    else:
+        info["fits_budget"] = False
+    return prompt, info
+
+
+def save_compaction_log(log_path, original_file_path, model_used, info):
+    """Registra (append) os tokens antes/depois da compactação de um documento."""
+    log_exists = os.path.exists(log_path)
+    before = info.get("tokens_before")
+    after = info.get("tokens_after")
+    with open(log_path, "a", newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        if not log_exists:
+            writer.writerow(["timestamp", "original_file", "model", "level", "tokens_before", "tokens_after",
+                             "saved_pct", "fits_budget"])
+        saved = f"{100 * (1 - after / before):.1f}" if before else ""
+        writer.writerow([datetime.now().isoformat(), original_file_path, model_used, info.get("level"),
+                         before if before is not None else "", after, saved, info.get("fits_budget")])
+
+
+def load_tokenizer(path):
+    """Carrega o tokenizer de um diretório de modelo (Hugging Face / MLX)."""
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede a economia de tokens da compactação de prompts.")
+    parser.add_argument("paths", nargs="+", help="Arquivos JSON ou diretórios de documentos")
+    parser.add_argument("--tokenizer", default=None, help="Diretório do modelo cujo tokenizer será usado")
+    parser.add_argument("--budget", type=int, default=None, help="Orçamento de tokens do prompt")
+    args = parser.parse_args()
+
+    tokenizer = load_tokenizer(args.tokenizer) if args.tokenizer else None
+    if tokenizer is None:
+        print(f"Aviso: sem --tokenizer, os tokens são estimados como caracteres/{CHARS_PER_TOKEN}.")
+
+    files = []
+    for path in args.paths:
+        files += sorted(glob.glob(os.path.join(path, "**", "*.json"), recursive=True)) if os.path.isdir(path) else [path]
+
+    total_before = total_after = 0
+    levels = {}
+    for file_path in files:
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"   -> Erro ao ler {file_path}: {e}")
+            continue
+        _, info = compact_prompt(data, tokenizer, args.budget)
+        total_before += info["tokens_before"]
+        total_after += info["tokens_after"]
+        levels[info["level"]] = levels.get(info["level"], 0) + 1
+
+    if not total_before:
+        print("Nenhum documento processado.")
+        return
+    print(f"Documentos: {len(files)} | níveis usados: {dict(sorted(levels.items()))}")
+    print(f"Tokens de prompt: {total_before} -> {total_after} "
+          f"({100 * (1 - total_after / total_before):.1f}% de economia no prefill)")
+
+
+if __name__ == "__main__":
+    main()
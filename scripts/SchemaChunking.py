@@ -0,0 +1,162 @@
+"""
+Divisão de documentos grandes demais para o contexto do modelo.
+
+Um documento cujo prompt não cabe no orçamento de tokens, mesmo no nível mais
+agressivo de compactação, é dividido em subárvores nas fronteiras de caminhos
+JSON. Cada pedaço é um par (caminho, valor):
+
+    (("user",), {...})               # objeto parcial: algumas chaves de "user"
+    (("entities", "[]"), {...})      # um elemento representativo do array "entities"
+
+O schema de cada pedaço é extraído separadamente e os resultados são costurados
+de volta em um único schema nos caminhos corretos (stitch_schemas).
+"""
+import json
+
+if __package__:
+    from .PromptCompaction import COMPACTION_LEVELS, build_prompt, compact_value, count_tokens, structural_signature
+    from .SchemaCompare import ARRAY_ITEMS
+else:
+    from PromptCompaction import COMPACTION_LEVELS, build_prompt, compact_value, count_tokens, structural_signature
+    from SchemaCompare import ARRAY_ITEMS
+
+
+def _prompt_tokens(value, tokenizer):
+    """Tokens do prompt de `value` no nível mais agressivo de compactação (o que decide se ele cabe)."""
+    max_items, max_chars, placeholders = COMPACTION_LEVELS[-1]
+    compacted = compact_value(value, max_items, max_chars, placeholders)
+    return count_tokens(tokenizer, build_prompt(json.dumps(compacted, ensure_ascii=False, separators=(",", ":"))))
+
+
+def _container(empty, members):
+    """Objeto (membros = pares chave/valor) ou array com os membros, conforme `empty`."""
+    return dict(members) if isinstance(empty, dict) else list(members)
+
+
+def _group_members(members, empty, tokenizer, budget, path):
+    """
+    Agrupa `members` (pares (membro, valor sozinho no contêiner), em ordem) em pedaços
+    que cabem em `budget`. O tamanho do grupo é estimado somando os tokens de cada
+    membro (menos o contêiner vazio, mais um separador); o grupo só é tokenizado de
+    novo quando a estimativa estoura o orçamento. Membros que não cabem nem sozinhos
+    são divididos recursivamente.
+    """
+    empty_tokens = _prompt_tokens(empty, tokenizer)
+    chunks, group, estimate = [], [], empty_tokens
+    for member, alone in members:
+        tokens = _prompt_tokens(alone, tokenizer)
+        if tokens > budget:
+            key, value = member if isinstance(empty, dict) else (ARRAY_ITEMS, member)
+            chunks.extend(split_document(value, tokenizer, budget, path + (key,)))
+            continue
+        estimate += tokens - empty_tokens + 1
+        if group and estimate > budget:
+            measured = _prompt_tokens(_container(empty, group + [member]), tokenizer)
+            if measured > budget:
+                chunks.append((path, _container(empty, group)))
+                group, estimate = [], tokens
+            else:
+                estimate = measured
+        group.append(member)
+    if group:
+        chunks.append((path, _container(empty, group)))
+    return chunks
+
+
+def split_document(data, tokenizer, budget, path=()):
+    """
+    Divide `data` em pedaços (caminho, valor) cujos prompts cabem em `budget` tokens.
+    Objetos são divididos por chaves e arrays por elementos estruturalmente distintos;
+    membros que cabem juntos são agrupados no mesmo pedaço e os que não cabem nem
+    sozinhos são divididos recursivamente. Valores escalares que não cabem são
+    mantidos (a compactação já elide strings longas).
+    """
+    if _prompt_tokens(data, tokenizer) <= budget:
+        return [(path, data)]
+
+    if isinstance(data, dict) and data:
+        return _group_members([((key, value), {key: value}) for key, value in data.items()],
+                              {}, tokenizer, budget, path)
+
+    if isinstance(data, list) and data:
+        representatives, seen = [], set()
+        for item in data:
+            signature = structural_signature(item)
+            if signature not in seen:
+                seen.add(signature)
+                representatives.append(item)
+        return _group_members([(item, [item]) for item in representatives], [], tokenizer, budget, path)
+
+    return [(path, data)]
+
+
+def _types(schema):
+    raw = schema.get("type")
+    if isinstance(raw, list):
+        return [t for t in raw if t is not None]
+    return [raw] if raw else []
+
+
+def _add_type(node, type_name):
+    types = _types(node)
+    if type_name not in types:
+        types.append(type_name)
+    node["type"] = types[0] if len(types) == 1 else sorted(types)
+
+
+def merge_schema(target, source):
+    """
+    Funde `source` em `target` (in-place): união de tipos, de 'properties'
+    (recursivamente), de 'items' e de 'required'. Demais palavras-chave de
+    `source` só são copiadas se ainda não existirem em `target`.
+    """
+    if not isinstance(source, dict):
+        return target
+    for type_name in _types(source):
+        _add_type(target, type_name)
+
+    for key, value in source.items():
+        if key == "type":
+            continue
+        if key == "properties" and isinstance(value, dict):
+            props = target.setdefault("properties", {})
+            for prop_name, prop_schema in value.items():
+                if prop_name in props and isinstance(props[prop_name], dict):
+                    merge_schema(props[prop_name], prop_schema)
+                else:
+                    props[prop_name] = prop_schema
+        elif key == "items" and isinstance(value, dict):
+            if isinstance(target.get("items"), dict):
+                merge_schema(target["items"], value)
+            else:
+                target["items"] = value
+        elif key == "required" and isinstance(value, list):
+            required = target.setdefault("required", [])
+            required.extend(k for k in value if k not in required)
+        else:
+            target.setdefault(key, value)
+    return target
+
+
+def stitch_schemas(parts):
+    """
+    Costura os schemas dos pedaços [(caminho, schema)] em um único schema de objeto.
+    Nós intermediários são criados como object (chave) ou array (ARRAY_ITEMS), e
+    toda chave de um caminho é marcada como required no objeto pai, já que estava
+    presente no documento.
+    """
+    root = {"type": "object"}
+    for path, schema in parts:
+        node = root
+        for segment in path:
+            if segment == ARRAY_ITEMS:
+                _add_type(node, "array")
+                node = node.setdefault("items", {})
+            else:
+                _add_type(node, "object")
+                required = node.setdefault("required", [])
+                if segment not in required:
+                    required.append(segment)
+                node = node.setdefault("properties", {}).setdefault(segment, {})
+        merge_schema(node, schema)
+    return root
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Limpeza e reformatação dos schemas gerados pela LLM.
+
+Cada arquivo de processed/schema_documents/ é lido, reparado com as funções do
+jsonMerge (load_and_repair_json e repair_schema_structure) e regravado na forma
+canônica (JSON com indentação 2, como o LLMExtraction salva). Para que rodar de
+novo sobre um corpus já limpo seja quase instantâneo e não escreva nada:
+
+- arquivos cujo tamanho e mtime batem com o estado salvo da última limpeza nem
+  são lidos (o estado guarda o hash do conteúdo canônico);
+- arquivos que já estão na forma canônica não são regravados;
+- as gravações são atômicas (arquivo temporário + os.replace);
+- o log (cleaning_log.csv) é escrito uma única vez, só com os arquivos alterados
+  ou com falha.
+
+Os arquivos são processados em paralelo por um pool de processos.
+
+Uso (a partir da raiz do projeto):
+    python3 scripts/SchemaCleaning.py
+    python3 scripts/SchemaCleaning.py --datasets twitter --workers 8
+"""
+import os
+import csv
+import glob
+import json
+import time
+import copy
+import hashlib
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+if __package__:
+    from . import jsonMerge
+    from .Settings import apply_settings
+else:
+    import jsonMerge
+    from Settings import apply_settings
+
+# --- CONFIGURAÇÕES ---
+SCHEMA_SOURCE_DIR = jsonMerge.SCHEMA_SOURCE_DIR
+CLEANING_LOG_FILE = "cleaning_log.csv"
+# Estado da última limpeza: caminho -> [tamanho, mtime_ns, hash do conteúdo canônico (None se falhou)]
+CLEANING_STATE_PATH = ".cleaning_state.json"
+# ---------------------
+apply_settings(globals())
+
+
+def canonical_text(schema):
+    """Forma canônica de um schema em disco (a mesma do save_schema do LLMExtraction)."""
+    return json.dumps(schema, indent=2, ensure_ascii=False)
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _write_atomic(file_path, data):
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, file_path)
+
+
+def clean_file(file_path):
+    """
+    Limpa um arquivo. Retorna (caminho, status, detalhes, entrada de estado), com
+    status UNCHANGED, REFORMATTED, REPAIRED ou FAILED.
+    """
+    with open(file_path, "rb") as f:
+        raw = f.read()
+    try:
+        schema = json.loads(raw.decode("utf-8-sig"))
+        status, details = "REFORMATTED", "JSON original era válido. Apenas reformatado."
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        schema = jsonMerge.load_and_repair_json(file_path)
+        if schema is None:
+            # Registrado no estado (sem hash) para não ser relido até o arquivo mudar.
+            st = os.stat(file_path)
+            return (file_path, "FAILED", f"Reparo falhou. O arquivo pode estar corrompido. Erro: {e}",
+                    [st.st_size, st.st_mtime_ns, None])
+        status, details = "REPAIRED", "JSON inválido reparado (bloco JSON extraído)."
+
+    if isinstance(schema, dict):
+        before = copy.deepcopy(schema) if status == "REFORMATTED" else None
+        jsonMerge.repair_schema_structure(schema)
+        if before is not None and schema != before:
+            status, details = "REPAIRED", "Estrutura do schema corrigida."
+
+    data = canonical_text(schema).encode("utf-8")
+    if data == raw:
+        status, details = "UNCHANGED", ""
+    else:
+        _write_atomic(file_path, data)
+    st = os.stat(file_path)
+    return file_path, status, details, [st.st_size, st.st_mtime_ns, _digest(data)]
+
+
+def load_state(state_path=CLEANING_STATE_PATH):
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_state(state, state_path=CLEANING_STATE_PATH):
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+def save_cleaning_log(rows, log_path=CLEANING_LOG_FILE):
+    """Acrescenta todas as linhas ao log de uma só vez."""
+    if not rows:
+        return
+    log_exists = os.path.exists(log_path)
+    with open(log_path, "a", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile)
+        if not log_exists:
+            writer.writerow(["timestamp", "file_path", "status", "details"])
+        writer.writerows(rows)
+
+
+def clean_directory(dir_path, workers=None, state_path=CLEANING_STATE_PATH, log_path=CLEANING_LOG_FILE):
+    """Limpa todos os schemas de um diretório. Retorna a contagem por status."""
+    t0 = time.time()
+    state = load_state(state_path)
+    pending = []
+    counts = {"SKIPPED": 0, "UNCHANGED": 0, "REFORMATTED": 0, "REPAIRED": 0, "FAILED": 0}
+    for file_path in glob.glob(os.path.join(dir_path, "**", "*.json"), recursive=True):
+        st = os.stat(file_path)
+        cached = state.get(file_path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            counts["SKIPPED"] += 1
+        else:
+            pending.append(file_path)
+
+    rows = []
+    if pending:
+        chunksize = max(1, len(pending) // (4 * (workers or os.cpu_count() or 1)))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for file_path, status, details, entry in executor.map(clean_file, pending, chunksize=chunksize):
+                counts[status] += 1
+                state[file_path] = entry
+                if status != "UNCHANGED":
+                    rows.append([datetime.now().isoformat(), file_path, status, details])
+        save_state(state, state_path)
+    save_cleaning_log(rows, log_path)
+
+    summary = ", ".join(f"{k.lower()}={v}" for k, v in counts.items() if v)
+    print(f" {dir_path}: {summary or 'nenhum arquivo'} ({time.time() - t0:.2f}s)")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Limpa e reformata os schemas gerados pela LLM.")
+    parser.add_argument("--datasets", default=None, help="Datasets separados por vírgula (padrão: todos)")
+    parser.add_argument("--workers", type=int, default=None, help="Processos paralelos (padrão: nº de CPUs)")
+    args = parser.parse_args()
+
+    if args.datasets:
+        dirs = [os.path.join(SCHEMA_SOURCE_DIR, d.strip()) for d in args.datasets.split(",") if d.strip()]
+    else:
+        dirs = [SCHEMA_SOURCE_DIR]
+    if not os.path.isdir(SCHEMA_SOURCE_DIR):
+        print(f"❌ ERRO: O diretório fonte '{SCHEMA_SOURCE_DIR}' não foi encontrado."); return
+
+    print("Iniciando a limpeza dos schemas...")
+    for dir_path in dirs:
+        clean_directory(dir_path, args.workers)
+    print(f"Log salvo em: {CLEANING_LOG_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Métrica de comparação (passo 7 do pipeline) entre o schema mestre da LLM (E)
+e o schema mestre tradicional do genson (Eg).
+
+Os dois schemas são "achatados" em um dicionário caminho -> (tipos, required):
+    person.email      -> ({"string", "null"}, True)
+    products[].price  -> ({"number"}, None)      # itens de array não têm 'required'
+
+Sobre essas formas achatadas são calculados:
+- precisão, revocação e F1 dos caminhos (Eg é a referência);
+- concordância de tipos (igualdade exata e Jaccard médio) nos caminhos em comum;
+- concordância de 'required' nos caminhos em comum;
+- distância de edição de árvore (opcional, --ted).
+
+Uso (a partir da raiz do projeto):
+    python3 scripts/SchemaCompare.py                         # todos os datasets
+    python3 scripts/SchemaCompare.py --candidate E.json --reference Eg.json --paths
+"""
+import os
+import csv
+import glob
+import json
+import time
+import argparse
+from functools import lru_cache
+if __package__:
+    from .Settings import apply_settings
+else:
+    from Settings import apply_settings
+
+# --- CONFIGURAÇÕES ---
+MASTER_SCHEMA_DIR = "."
+TRADITIONAL_SCHEMA_DIR = "traditional_schemas/"
+# Schemas mestres gerados com outros thresholds: <THRESHOLD_SWEEP_DIR>/<dataset>/*.json
+THRESHOLD_SWEEP_DIR = "threshold_sweep/"
+LLM_FUSION_DIR = "llm_fusion/"
+COMPARISON_OUTPUT = "schema_comparison.csv"
+# Acima deste nº de nós, a distância de edição exata (Zhang-Shasha) é trocada
+# pela versão com filhos pareados por chave, que é linear.
+TED_MAX_NODES = 1000
+# ---------------------
+apply_settings(globals())
+
+ARRAY_ITEMS = "[]"
+
+
+# --- ACHATAMENTO ---
+
+def _resolve_ref(node, root, stack):
+    """Resolve um '$ref' local ('#/...'). Retorna (nó resolvido, ref) ou (nó, None)."""
+    ref = node.get("$ref") if isinstance(node, dict) else None
+    if not isinstance(ref, str) or not ref.startswith("#") or ref in stack:
+        return node, None
+    target = root
+    for part in ref.lstrip("#").strip("/").split("/"):
+        if not part:
+            continue
+        part = part.replace("~1", "/").replace("~0", "~")
+        if not isinstance(target, dict) or part not in target:
+            return node, None
+        target = target[part]
+    return target, ref
+
+
+def _node_types(node):
+    """Tipos declarados por um nó de schema (inferindo object/array quando não há 'type')."""
+    raw = node.get("type")
+    if isinstance(raw, str):
+        return {raw}
+    if isinstance(raw, list):
+        return {str(t) for t in raw if t is not None}
+    types = set()
+    if isinstance(node.get("properties"), dict):
+        types.add("object")
+    if "items" in node:
+        types.add("array")
+    return types
+
+
+def flatten_schema(schema):
+    """
+    Achata um JSON Schema em {caminho (tupla de chaves): (frozenset de tipos, required)}.
+    Segue 'properties', 'items' (objeto ou lista), 'anyOf'/'oneOf'/'allOf' e '$ref' locais.
+    Itens de array usam o segmento "[]" e têm required = None.
+    """
+    flat = {}
+
+    def visit(node, path, required, stack):
+        if not isinstance(node, dict):
+            return
+        node, ref = _resolve_ref(node, schema, stack)
+        if ref:
+            stack = stack | {ref}
+
+        branches = [node]
+        for key in ("anyOf", "oneOf", "allOf"):
+            if isinstance(node.get(key), list):
+                for branch in node[key]:
+                    if isinstance(branch, dict):
+                        resolved, branch_ref = _resolve_ref(branch, schema, stack)
+                        if branch_ref:
+                            stack = stack | {branch_ref}
+                        branches.append(resolved)
+
+        types = set()
+        for branch in branches:
+            types |= _node_types(branch)
+
+        if path:
+            if path in flat:
+                old_types, old_required = flat[path]
+                types |= old_types
+                if old_required is not None:
+                    required = bool(required) or old_required
+            flat[path] = (frozenset(types), required)
+
+        for branch in branches:
+            req_value = branch.get("required")
+            required_keys = set(req_value) if isinstance(req_value, list) else set()
+            properties = branch.get("properties")
+            if isinstance(properties, dict):
+                for key, child in properties.items():
+                    visit(child, path + (key,), key in required_keys, stack)
+            items = branch.get("items")
+            if isinstance(items, dict):
+                visit(items, path + (ARRAY_ITEMS,), None, stack)
+            elif isinstance(items, list):
+                for item in items:
+                    visit(item, path + (ARRAY_ITEMS,), None, stack)
+
+    visit(schema, (), None, frozenset())
+    return flat
+
+
+@lru_cache(maxsize=256)
+def _flatten_file_cached(path, size, mtime_ns):
+    with open(path, "r", encoding="utf-8-sig") as f:
+        return flatten_schema(json.load(f))
+
+
+def flatten_file(path):
+    """Achata um arquivo de schema, com cache em memória invalidado por tamanho/mtime."""
+    st = os.stat(path)
+    return _flatten_file_cached(os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+def path_to_str(path):
+    return ".".join(path)
+
+
+# --- MÉTRICAS ---
+
+def _ratio(num, den):
+    return num / den if den else 0.0
+
+
+def compare_flat(candidate, reference):
+    """
+    Compara duas formas achatadas (candidate = E, reference = Eg) e devolve as métricas.
+    """
+    cand_paths = candidate.keys()
+    ref_paths = reference.keys()
+    common = cand_paths & ref_paths
+
+    precision = _ratio(len(common), len(cand_paths))
+    recall = _ratio(len(common), len(ref_paths))
+    f1 = _ratio(2 * precision * recall, precision + recall)
+
+    type_exact = 0
+    type_jaccard = 0.0
+    required_pairs = 0
+    required_equal = 0
+    for path in common:
+        cand_types, cand_req = candidate[path]
+        ref_types, ref_req = reference[path]
+        if cand_types == ref_types:
+            type_exact += 1
+        union = cand_types | ref_types
+        type_jaccard += _ratio(len(cand_types & ref_types), len(union)) if union else 1.0
+        if cand_req is not None and ref_req is not None:
+            required_pairs += 1
+            required_equal += cand_req == ref_req
+
+    return {
+        "candidate_paths": len(cand_paths),
+        "reference_paths": len(ref_paths),
+        "common_paths": len(common),
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "type_agreement": _ratio(type_exact, len(common)),
+        "type_jaccard": _ratio(type_jaccard, len(common)),
+        "required_agreement": _ratio(required_equal, required_pairs),
+    }
+
+
+def path_report(candidate, reference):
+    """Detalhe por caminho: presença em cada schema, tipos e required."""
+    rows = []
+    for path in sorted(candidate.keys() | reference.keys()):
+        cand = candidate.get(path)
+        ref = reference.get(path)
+        if cand and ref:
+            status = "TP"
+        elif cand:
+            status = "FP"
+        else:
+            status = "FN"
+        rows.append({
+            "path": path_to_str(path),
+            "status": status,
+            "candidate_types": "|".join(sorted(cand[0])) if cand else "",
+            "reference_types": "|".join(sorted(ref[0])) if ref else "",
+            "type_match": bool(cand and ref and cand[0] == ref[0]),
+            "candidate_required": "" if not cand or cand[1] is None else cand[1],
+            "reference_required": "" if not ref or ref[1] is None else ref[1],
+        })
+    return rows
+
+
+# --- DISTÂNCIA DE EDIÇÃO DE ÁRVORE ---
+
+def _build_tree(flat):
+    """Árvore ordenada (filhos por chave) a partir da forma achatada: (rótulo, [filhos])."""
+    children = {(): []}
+    for path in sorted(flat):
+        children.setdefault(path, [])
+        children.setdefault(path[:-1], []).append(path)
+
+    def make(path):
+        label = (path[-1] if path else "$", flat[path][0] if path else frozenset({"object"}))
+        return (label, [make(c) for c in children.get(path, [])])
+
+    return make(())
+
+
+def keyed_tree_distance(candidate, reference):
+    """
+    Distância de edição com filhos pareados pela chave: cada nó presente em só um
+    dos schemas custa 1 (inserção/remoção) e cada nó em comum com tipos diferentes
+    custa 1 (renomeação do rótulo). Linear no nº de caminhos.
+    """
+    common = candidate.keys() & reference.keys()
+    relabels = sum(1 for p in common if candidate[p][0] != reference[p][0])
+    return len(candidate.keys() ^ reference.keys()) + relabels
+
+
+def zhang_shasha_distance(tree_a, tree_b):
+    """
+    Distância de edição de árvores ordenadas (Zhang & Shasha, 1989) com custo
+    unitário para inserção, remoção e troca de rótulo.
+    """
+    def postorder(tree):
+        labels, leftmost = [], []
+
+        def walk(node):
+            label, kids = node
+            first = None
+            for kid in kids:
+                leaf = walk(kid)
+                if first is None:
+                    first = leaf
+            labels.append(label)
+            leftmost.append(first if first is not None else len(labels) - 1)
+            return leftmost[-1]
+
+        walk(tree)
+        # keyroots: para cada folha mais à esquerda, o nó de maior índice pós-ordem que a tem
+        last = {}
+        for i, lm in enumerate(leftmost):
+            last[lm] = i
+        keyroots = sorted(last.values())
+        return labels, leftmost, keyroots
+
+    la, lma, kra = postorder(tree_a)
+    lb, lmb, krb = postorder(tree_b)
+    td = [[0] * len(lb) for _ in range(len(la))]
+
+    for i in kra:
+        for j in krb:
+            li, lj = lma[i], lmb[j]
+            m, n = i - li + 2, j - lj + 2
+            fd = [[0] * n for _ in range(m)]
+            for x in range(1, m):
+                fd[x][0] = fd[x - 1][0] + 1
+            for y in range(1, n):
+                fd[0][y] = fd[0][y - 1] + 1
+            for x in range(1, m):
+                ai = li + x - 1
+                for y in range(1, n):
+                    bj = lj + y - 1
+                    if lma[ai] == li and lmb[bj] == lj:
+                        cost = 0 if la[ai] == lb[bj] else 1
+                        fd[x][y] = min(fd[x - 1][y] + 1, fd[x][y - 1] + 1, fd[x - 1][y - 1] + cost)
+                        td[ai][bj] = fd[x][y]
+                    else:
+                        p, q = lma[ai] - li, lmb[bj] - lj
+                        fd[x][y] = min(fd[x - 1][y] + 1, fd[x][y - 1] + 1, fd[p][q] + td[ai][bj])
+    return td[-1][-1]
+
+
+def tree_edit_distance(candidate, reference, max_nodes=TED_MAX_NODES):
+    """
+    Distância de edição entre as duas árvores de schema. Usa Zhang-Shasha quando as
+    árvores são pequenas e a versão pareada por chave acima de `max_nodes` nós.
+    Retorna (distância, distância normalizada, método).
+    """
+    total = len(candidate) + len(reference) + 2
+    if len(candidate) + 1 <= max_nodes and len(reference) + 1 <= max_nodes:
+        distance = zhang_shasha_distance(_build_tree(candidate), _build_tree(reference))
+        method = "zhang-shasha"
+    else:
+        distance = keyed_tree_distance(candidate, reference)
+        method = "keyed"
+    return distance, distance / total, method
+
+
+# --- LOTE ---
+
+def compare_files(candidate_path, reference_path, ted=False):
+    """Compara dois arquivos de schema e devolve as métricas (mais o tempo gasto)."""
+    t0 = time.perf_counter()
+    candidate = flatten_file(candidate_path)
+    reference = flatten_file(reference_path)
+    metrics = compare_flat(candidate, reference)
+    if ted:
+        distance, normalized, method = tree_edit_distance(candidate, reference)
+        metrics.update({"ted": distance, "ted_normalized": normalized, "ted_method": method})
+    metrics["elapsed_ms"] = (time.perf_counter() - t0) * 1000
+    return metrics
+
+
+def discover_pairs(master_dir=MASTER_SCHEMA_DIR, traditional_dir=TRADITIONAL_SCHEMA_DIR,
+                   sweep_dir=THRESHOLD_SWEEP_DIR, fusion_dir=LLM_FUSION_DIR):
+    """
+    Lista (dataset, variante, E, Eg) para todo dataset que tenha schema tradicional:
+    o schema mestre padrão, o da fusão (LLM) em árvore e cada schema do sweep de
+    thresholds, se existirem.
+    """
+    pairs = []
+    suffix = "_traditional_schema.json"
+    for reference in sorted(glob.glob(os.path.join(traditional_dir, f"*{suffix}"))):
+        dataset = os.path.basename(reference)[:-len(suffix)]
+        master = os.path.join(master_dir, f"{dataset}_master_schema.json")
+        if os.path.exists(master):
+            pairs.append((dataset, "default", master, reference))
+        fused = os.path.join(fusion_dir, f"{dataset}_llm_master_schema.json")
+        if os.path.exists(fused):
+            pairs.append((dataset, "llm_fusion", fused, reference))
+        for variant in sorted(glob.glob(os.path.join(sweep_dir, dataset, "*.json"))):
+            pairs.append((dataset, os.path.splitext(os.path.basename(variant))[0], variant, reference))
+    return pairs
+
+
+def batch_compare(pairs, ted=False):
+    """Compara todos os pares (dataset, variante, E, Eg) e devolve uma linha por par."""
+    rows = []
+    for dataset, variant, candidate, reference in pairs:
+        try:
+            metrics = compare_files(candidate, reference, ted=ted)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"   -> Erro ao comparar {candidate} com {reference}: {e}")
+            continue
+        rows.append({"dataset": dataset, "variant": variant, "candidate": candidate,
+                     "reference": reference, **metrics})
+    return rows
+
+
+def write_csv(rows, output_path):
+    if not rows:
+        return
+    fieldnames = list(rows[0].keys())
+    for row in rows[1:]:
+        fieldnames += [k for k in row if k not in fieldnames]
+    with open(output_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def print_summary(rows):
+    print(f"\n{'dataset':<36} {'variante':<20} {'P':>6} {'R':>6} {'F1':>6} {'tipo':>6} {'req':>6} {'ms':>8}")
+    for r in rows:
+        print(f"{r['dataset'][:36]:<36} {r['variant'][:20]:<20} {r['precision']:6.3f} {r['recall']:6.3f} "
+              f"{r['f1']:6.3f} {r['type_agreement']:6.3f} {r['required_agreement']:6.3f} {r['elapsed_ms']:8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara schemas mestres da LLM (E) com os do genson (Eg).")
+    parser.add_argument("--candidate", help="Schema candidato (E). Sem ele, compara todos os datasets.")
+    parser.add_argument("--reference", help="Schema de referência (Eg)")
+    parser.add_argument("--ted", action="store_true", help="Calcula também a distância de edição de árvore")
+    parser.add_argument("--paths", action="store_true", help="Imprime/salva o detalhe por caminho")
+    parser.add_argument("--output", default=COMPARISON_OUTPUT, help="CSV de saída do lote")
+    args = parser.parse_args()
+
+    if args.candidate or args.reference:
+        if not (args.candidate and args.reference):
+            parser.error("--candidate e --reference devem ser usados juntos")
+        metrics = compare_files(args.candidate, args.reference, ted=args.ted)
+        print(json.dumps(metrics, indent=2))
+        if args.paths:
+            for row in path_report(flatten_file(args.candidate), flatten_file(args.reference)):
+                if row["status"] != "TP" or not row["type_match"]:
+                    print(f"  {row['status']} {row['path']}: {row['candidate_types'] or '-'} x {row['reference_types'] or '-'}")
+        return
+
+    pairs = discover_pairs()
+    if not pairs:
+        print(f"Nenhum par de schemas encontrado em '{MASTER_SCHEMA_DIR}' e '{TRADITIONAL_SCHEMA_DIR}'.")
+        return
+    print(f"Comparando {len(pairs)} pares de schemas...")
+    rows = batch_compare(pairs, ted=args.ted)
+    print_summary(rows)
+    write_csv(rows, args.output)
+    print(f"\nResultados salvos em: {args.output}")
+    if args.paths:
+        for dataset, variant, candidate, reference in pairs:
+            detail_path = os.path.splitext(args.output)[0] + f"_{dataset}_{variant}_paths.csv"
+            write_csv(path_report(flatten_file(candidate), flatten_file(reference)), detail_path)
+
+
+if __name__ == "__main__":
+    main()
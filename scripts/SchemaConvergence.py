@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Amostragem adaptativa: para a extração de um dataset quando o schema satura.
+
+O ConvergenceTracker mantém uma fusão contínua (árvore de estatísticas do
+jsonMerge) dos schemas aceitos de um dataset. Um documento "não traz novidade"
+quando não acrescenta nenhum caminho nem tipo novo, as decisões de threshold
+(tipos e required do schema mestre) continuam as mesmas e nenhuma razão
+(required e tipo vencedor) se afastou mais que `tolerance` do valor no início da
+sequência. Depois de `patience` documentos seguidos sem novidade, o dataset
+convergiu e o LLMExtraction deixa de consultá-lo.
+
+A confiança reportada vem da regra de três: após n documentos seguidos sem
+caminho novo, a chance de um próximo documento trazer um caminho novo é, com 95%
+de confiança, menor que 3/n.
+
+Uso (a partir da raiz do projeto), para simular sobre schemas já extraídos quantas
+chamadas teriam sido economizadas:
+    python3 scripts/SchemaConvergence.py --datasets twitter --patience 20 --tolerance 0.05
+"""
+import os
+import glob
+import json
+import random
+import argparse
+
+if __package__:
+    from . import jsonMerge
+    from . import SchemaCompare
+    from .Settings import apply_settings
+else:
+    import jsonMerge
+    import SchemaCompare
+    from Settings import apply_settings
+
+# --- CONFIGURAÇÕES ---
+SCHEMA_SOURCE_DIR = jsonMerge.SCHEMA_SOURCE_DIR
+CONVERGENCE_PATIENCE = 20
+CONVERGENCE_TOLERANCE = 0.05
+CONVERGENCE_REPORT_FILE = "convergence_report.json"
+# ---------------------
+apply_settings(globals())
+
+
+def _ratios(node):
+    """(razão de required, razão do tipo não nulo vencedor) de um nó de estatísticas."""
+    appearances = node.appearances or 1
+    non_null = [c for t, c in node.type_counts.items() if t != "null"]
+    type_ratio = max(non_null) / sum(non_null) if non_null else 1.0
+    return node.required_count / appearances, type_ratio
+
+
+def snapshot(stats_tree):
+    """
+    {caminho: (tipos observados, razão de required, razão do tipo vencedor)} da árvore.
+    Os itens de arrays aparecem no caminho como ARRAY_ITEMS.
+    """
+    return {node_path: (frozenset(node.type_counts),) + _ratios(node)
+            for node_path, node in stats_tree.node().paths()}
+
+
+class ConvergenceTracker:
+    """Fusão contínua dos schemas de um dataset com critério de parada."""
+
+    def __init__(self, patience=CONVERGENCE_PATIENCE, tolerance=CONVERGENCE_TOLERANCE):
+        self.patience = patience
+        self.tolerance = tolerance
+        self.stats_tree = jsonMerge.new_stats_tree()
+        self.documents = 0
+        self.streak = 0
+        self.skipped = 0
+        self._anchor = {}
+        self._anchor_decisions = {}
+
+    def seed(self, dir_path):
+        """Incorpora schemas já extraídos (de execuções anteriores) sem contar na sequência."""
+        if os.path.isdir(dir_path):
+            self.stats_tree, self.documents = jsonMerge.collect_stats(dir_path)
+        self._reset_anchor()
+
+    def _decisions(self):
+        return SchemaCompare.flatten_schema(jsonMerge.build_schema_from_stats(self.stats_tree))
+
+    def _reset_anchor(self):
+        self.streak = 0
+        self._anchor = snapshot(self.stats_tree)
+        self._anchor_decisions = self._decisions()
+
+    def _novelty(self, current):
+        """Motivo pelo qual o estado atual difere da âncora (ou None se não difere)."""
+        for path, (types, required_ratio, type_ratio) in current.items():
+            anchor = self._anchor.get(path)
+            if anchor is None:
+                return "caminho novo"
+            if not types <= anchor[0]:
+                return "tipo novo"
+            if abs(required_ratio - anchor[1]) > self.tolerance or abs(type_ratio - anchor[2]) > self.tolerance:
+                return "razões fora da tolerância"
+        if self._decisions() != self._anchor_decisions:
+            return "decisão de threshold mudou"
+        return None
+
+    def add(self, schema):
+        """Incorpora o schema de um documento. Retorna True se o dataset convergiu."""
+        jsonMerge.repair_schema_structure(schema)
+        jsonMerge.update_stats_tree(self.stats_tree, schema)
+        self.documents += 1
+        if self._novelty(snapshot(self.stats_tree)) is None:
+            self.streak += 1
+        else:
+            self._reset_anchor()
+        return self.converged
+
+    @property
+    def converged(self):
+        return self.streak >= self.patience
+
+    def report(self):
+        """Documentos usados, chamadas economizadas e confiança no schema final."""
+        paths = snapshot(self.stats_tree)
+        borderline = sum(1 for _, required_ratio, type_ratio in paths.values()
+                         if abs(required_ratio - jsonMerge.REQUIRED_THRESHOLD) <= self.tolerance
+                         or (type_ratio < 1.0 and abs(type_ratio - jsonMerge.TYPE_THRESHOLD) <= self.tolerance))
+        return {
+            "documents": self.documents,
+            "converged": self.converged,
+            "streak": self.streak,
+            "calls_saved": self.skipped,
+            "paths": len(paths),
+            # Limite superior (95%) da chance de um novo documento trazer caminho novo.
+            "new_path_rate_upper_95": min(1.0, 3 / self.streak) if self.streak else 1.0,
+            # Caminhos cuja decisão está a menos de `tolerance` de um threshold.
+            "borderline_paths": borderline,
+        }
+
+
+def simulate(dir_path, patience, tolerance, seed=42):
+    """
+    Reproduz os schemas de um diretório em ordem aleatória até a convergência e
+    compara o schema resultante com o obtido a partir de todos os schemas.
+    """
+    files = sorted(glob.glob(os.path.join(dir_path, "**/*.json"), recursive=True))
+    random.Random(seed).shuffle(files)
+    tracker = ConvergenceTracker(patience, tolerance)
+    full_stats = jsonMerge.new_stats_tree()
+    for file_path in files:
+        schema = jsonMerge.load_and_repair_json(file_path)
+        if not isinstance(schema, dict):
+            continue
+        if tracker.converged:
+            tracker.skipped += 1
+        else:
+            tracker.add(json.loads(json.dumps(schema)))
+        jsonMerge.repair_schema_structure(schema)
+        jsonMerge.update_stats_tree(full_stats, schema)
+
+    report = tracker.report()
+    report["agreement_with_full"] = SchemaCompare.compare_flat(
+        SchemaCompare.flatten_schema(jsonMerge.build_schema_from_stats(tracker.stats_tree)),
+        SchemaCompare.flatten_schema(jsonMerge.build_schema_from_stats(full_stats)))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simula a parada por convergência sobre schemas já extraídos.")
+    parser.add_argument("--datasets", default=None, help="Datasets separados por vírgula (padrão: todos)")
+    parser.add_argument("--patience", type=int, default=CONVERGENCE_PATIENCE,
+                        help="Documentos seguidos sem novidade para parar")
+    parser.add_argument("--tolerance", type=float, default=CONVERGENCE_TOLERANCE,
+                        help="Variação máxima das razões de required/tipo")
+    parser.add_argument("--seed", type=int, default=42, help="Semente da ordem dos documentos")
+    args = parser.parse_args()
+
+    if args.datasets:
+        datasets = [d.strip() for d in args.datasets.split(",") if d.strip()]
+    else:
+        try:
+            datasets = sorted(d.name for d in os.scandir(SCHEMA_SOURCE_DIR) if d.is_dir())
+        except FileNotFoundError:
+            print(f"❌ ERRO: O diretório fonte '{SCHEMA_SOURCE_DIR}' não foi encontrado."); return
+
+    reports = {}
+    for dataset in datasets:
+        report = simulate(os.path.join(SCHEMA_SOURCE_DIR, dataset), args.patience, args.tolerance, args.seed)
+        reports[dataset] = report
+        agreement = report["agreement_with_full"]
+        print(f"{dataset}: {report['documents']} documentos usados, {report['calls_saved']} chamadas economizadas | "
+              f"P(caminho novo) < {report['new_path_rate_upper_95']:.1%} | "
+              f"F1 vs. todos={agreement['f1']:.3f} tipos={agreement['type_agreement']:.3f} "
+              f"required={agreement['required_agreement']:.3f}")
+
+    with open(CONVERGENCE_REPORT_FILE, "w", encoding="utf-8") as f:
+        json.dump(reports, f, indent=2, ensure_ascii=False)
+    print(f"\nRelatório salvo em: {CONVERGENCE_REPORT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
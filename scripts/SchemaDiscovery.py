@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Linha de comando única do projeto: um subcomando por etapa ou ferramenta.
+
+O módulo de cada subcomando só é importado quando ele é executado, então
+`--help` e a listagem de comandos não carregam nenhuma dependência pesada. Os
+argumentos depois do subcomando vão para o script correspondente (os mesmos de
+`python3 scripts/<Script>.py`); subcomandos de etapas sem argumentos mostram a
+documentação do script com `--help`.
+
+A configuração (arquivo TOML/YAML e variáveis de ambiente) é a do módulo
+Settings; `--config` escolhe o arquivo.
+
+Instalação e uso (a partir da raiz do projeto):
+    pip install -e .
+    schema-discovery --help
+    schema-discovery pipeline --llm
+    schema-discovery --config experimento.toml merge
+    python3 scripts/SchemaDiscovery.py compare --help
+"""
+import os
+import sys
+
+# --- CONFIGURAÇÕES ---
+PROG = "schema-discovery"
+# subcomando -> (módulo, função, aceita argumentos, descrição)
+COMMANDS = {
+    "pipeline": ("Pipeline", "main", True, "Executa o pipeline completo (DAG com cache por etapa)"),
+    "preprocess": ("PreprocessDatasets", "main", False, "Reduz e divide os datasets brutos em documentos"),
+    "manifest": ("JsonComplexity", "build_manifest", False, "Gera o manifesto de complexidade dos documentos"),
+    "index": ("CorpusIndex", "main", True, "Índice colunar da estrutura dos documentos (caminhos e tipos)"),
+    "extract": ("LLMExtraction", "main", False, "Extrai os schemas dos documentos com LLM"),
+    "coordinator": ("ExtractionCoordinator", "main", True, "Extração com LLM distribuída por leases"),
+    "clean": ("SchemaCleaning", "main", True, "Limpa e canoniza os schemas extraídos"),
+    "sync-manifest": ("ArrumaManifesto", "update_manifest_from_schemas", False,
+                      "Marca no manifesto os documentos com schema gerado"),
+    "merge": ("jsonMerge", "main", False, "Funde os schemas de cada dataset por estatística"),
+    "fuse": ("LLMFusion", "main", True, "Funde os schemas de cada dataset com LLM, em árvore"),
+    "traditional": ("JsonSchema", "main", True, "Gera os schemas mestres com o genson"),
+    "compare": ("SchemaCompare", "main", True, "Compara schemas mestres (LLM x genson)"),
+    "validate": ("SchemaValidator", "main", True, "Mede a cobertura de um schema mestre sobre a coleção"),
+    "sweep": ("ThresholdSweep", "main", True, "Varre os limiares da fusão estatística"),
+    "convergence": ("SchemaConvergence", "main", True, "Curva de convergência dos schemas de um dataset"),
+    "store": ("SchemaStore", "main", True, "Armazenamento de schemas endereçado por conteúdo"),
+    "synthetic": ("SinteticJson", "main", True, "Gera corpora JSON sintéticos"),
+    "training-pairs": ("schemaGeneration", "generateSchemasAutomatically", False,
+                       "Gera pares (JSON, schema genson) para treino"),
+    "training-set": ("TrainingSet", "main", True, "Conjunto de treino tokenizado e mapeado em memória"),
+    "compaction": ("PromptCompaction", "main", True, "Mede a economia de tokens da compactação de prompts"),
+    "backends": ("LLMBackends", "main", True, "Compara a geração com e sem decodificação especulativa"),
+    "decompress": ("CompressedIO", "main", True, "Mede a vazão de leitura de arquivos comprimidos"),
+    "metrics": ("Instrumentation", "main", True, "Relatórios de desempenho das execuções"),
+    "bench": ("PipelineBenchmark", "main", True, "Benchmark reprodutível do pipeline"),
+    "config": ("Settings", "main", True, "Mostra a configuração efetiva"),
+}
+# ---------------------
+
+
+def print_help():
+    width = max(len(name) for name in COMMANDS)
+    print(f"uso: {PROG} [--config ARQUIVO] <comando> [argumentos do comando]\n")
+    print("Pipeline de descoberta de schemas JSON com LLMs.\n")
+    print("comandos:")
+    for name, (_, _, _, description) in COMMANDS.items():
+        print(f"  {name:<{width}}  {description}")
+    print(f"\nopções:\n  {'--config ARQUIVO':<{width}}  Arquivo de configuração TOML/YAML (ver '{PROG} config --help')")
+    print(f"  {'-h, --help':<{width}}  Mostra esta ajuda")
+    print(f"\n'{PROG} <comando> --help' mostra a ajuda de cada comando.")
+
+
+def module_docstring(module):
+    """Documentação do script sem importá-lo (lida do código-fonte)."""
+    import ast
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"{module}.py")
+    with open(path, "r", encoding="utf-8") as f:
+        return ast.get_docstring(ast.parse(f.read())) or ""
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    while argv and argv[0] == "--config" or argv and argv[0].startswith("--config="):
+        option = argv.pop(0)
+        if "=" in option:
+            path = option.partition("=")[2]
+        elif argv:
+            path = argv.pop(0)
+        else:
+            print("❌ ERRO: --config exige o caminho do arquivo.", file=sys.stderr); return 2
+        if not os.path.exists(path):
+            print(f"❌ ERRO: O arquivo de configuração '{path}' não foi encontrado.", file=sys.stderr); return 2
+        os.environ["SCHEMA_DISCOVERY_CONFIG"] = path
+    if not argv or argv[0] in ("-h", "--help"):
+        print_help()
+        return 0
+    command, args = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"❌ ERRO: comando desconhecido '{command}'. Veja '{PROG} --help'.", file=sys.stderr)
+        return 2
+
+    module_name, function, takes_args, description = COMMANDS[command]
+    if not takes_args:
+        if args in (["-h"], ["--help"]):
+            print(f"uso: {PROG} {command}\n\n{description}.\n\n{module_docstring(module_name)}".rstrip())
+            return 0
+        if args:
+            print(f"❌ ERRO: o comando '{command}' não aceita argumentos: {' '.join(args)}", file=sys.stderr)
+            return 2
+
+    import importlib
+    if __package__:
+        module = importlib.import_module(f".{module_name}", __package__)
+    else:
+        module = importlib.import_module(module_name)
+    sys.argv = [f"{PROG} {command}", *args]
+    result = getattr(module, function)()
+    # Alguns scripts devolvem o código de saída; outros devolvem dados ou None.
+    return result if isinstance(result, int) and not isinstance(result, bool) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Armazenamento endereçado por conteúdo dos schemas por documento.
+
+Muitos schemas de processed/schema_documents/<dataset>/<object_type>/document_N.json
+são idênticos. Aqui cada schema é reparado (load_and_repair_json +
+repair_schema_structure), serializado de forma canônica e guardado uma única vez
+pelo seu hash:
+
+    schema_store/objects/ab/abcdef....json        # um arquivo por schema único
+    schema_store/index/<dataset>.csv              # document,hash
+
+`document` é o caminho do schema relativo à pasta do dataset (ex.:
+documents/document_1.json). A forma canônica é o JSON minificado sem reordenar
+chaves, para que a fusão do jsonMerge (sensível à ordem em que chaves e tipos
+aparecem) dê exatamente o mesmo resultado lendo do armazenamento ou dos arquivos.
+
+Uso (a partir da raiz do projeto), para migrar os schemas já gerados:
+    python3 scripts/SchemaStore.py ingest --datasets twitter [--prune]
+    python3 scripts/SchemaStore.py bench --datasets twitter
+"""
+import os
+import csv
+import glob
+import json
+import time
+import hashlib
+import argparse
+
+if __package__:
+    from . import jsonMerge
+    from .Settings import apply_settings
+else:
+    import jsonMerge
+    from Settings import apply_settings
+
+# --- CONFIGURAÇÕES ---
+SCHEMA_SOURCE_DIR = jsonMerge.SCHEMA_SOURCE_DIR
+STORE_DIR = "schema_store/"
+# ---------------------
+apply_settings(globals())
+
+
+def canonical_text(schema):
+    """Serialização canônica (minificada, ordem de chaves preservada) de um schema."""
+    return json.dumps(schema, separators=(",", ":"), ensure_ascii=False)
+
+
+def object_path(digest, store_dir=STORE_DIR):
+    return os.path.join(store_dir, "objects", digest[:2], f"{digest}.json")
+
+
+def index_path(dataset, store_dir=STORE_DIR):
+    return os.path.join(store_dir, "index", f"{dataset}.csv")
+
+
+def has_index(dataset, store_dir=STORE_DIR):
+    return os.path.exists(index_path(dataset, store_dir))
+
+
+def put_object(schema, store_dir=STORE_DIR):
+    """Grava o schema (se ainda não existir) e devolve seu hash."""
+    text = canonical_text(schema)
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+    path = object_path(digest, store_dir)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    return digest
+
+
+def load_index(dataset, store_dir=STORE_DIR):
+    """{documento: hash} do dataset, na ordem em que os documentos foram indexados."""
+    index = {}
+    with open(index_path(dataset, store_dir), newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            index[row["document"]] = row["hash"]
+    return index
+
+
+def write_index(dataset, index, store_dir=STORE_DIR):
+    path = index_path(dataset, store_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["document", "hash"])
+        writer.writerows(index.items())
+    os.replace(tmp_path, path)
+
+
+def put(dataset, document, schema, store_dir=STORE_DIR):
+    """Guarda o schema de um documento e o registra (append) no índice do dataset."""
+    jsonMerge.repair_schema_structure(schema)
+    digest = put_object(schema, store_dir)
+    path = index_path(dataset, store_dir)
+    exists = os.path.exists(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if not exists:
+            writer.writerow(["document", "hash"])
+        writer.writerow([document, digest])
+    return digest
+
+
+def load_unique(dataset, store_dir=STORE_DIR):
+    """
+    Schemas únicos do dataset com suas multiplicidades: [(schema, n)], na ordem da
+    primeira ocorrência no índice. Se um documento foi indexado mais de uma vez,
+    vale a última entrada.
+    """
+    counts = {}
+    for digest in load_index(dataset, store_dir).values():
+        counts[digest] = counts.get(digest, 0) + 1
+    unique = []
+    for digest, count in counts.items():
+        with open(object_path(digest, store_dir), "r", encoding="utf-8") as f:
+            unique.append((json.load(f), count))
+    return unique
+
+
+def ingest_dataset(dataset, prune=False, store_dir=STORE_DIR):
+    """
+    Migra os schemas de um dataset para o armazenamento (na mesma ordem em que o
+    jsonMerge os lê). Com `prune`, apaga os arquivos por documento já armazenados.
+    Retorna um resumo com arquivos, únicos e bytes antes/depois.
+    """
+    dir_path = os.path.join(SCHEMA_SOURCE_DIR, dataset)
+    index = {}
+    files = glob.glob(os.path.join(dir_path, '**/*.json'), recursive=True)
+    bytes_before = 0
+    for file_path in files:
+        bytes_before += os.path.getsize(file_path)
+        schema = jsonMerge.load_and_repair_json(file_path)
+        if schema is None:
+            print(f"   -> Não foi possível ler/reparar {file_path}. Mantido fora do armazenamento.")
+            continue
+        jsonMerge.repair_schema_structure(schema)
+        index[os.path.relpath(file_path, dir_path)] = put_object(schema, store_dir)
+
+    # O índice segue a ordem atual dos arquivos; documentos que só existem no
+    # armazenamento (arquivos já apagados) vêm depois.
+    if has_index(dataset, store_dir):
+        for document, digest in load_index(dataset, store_dir).items():
+            index.setdefault(document, digest)
+    write_index(dataset, index, store_dir)
+
+    if prune:
+        for document in index:
+            file_path = os.path.join(dir_path, document)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    unique = set(index.values())
+    bytes_after = os.path.getsize(index_path(dataset, store_dir)) + sum(
+        os.path.getsize(object_path(d, store_dir)) for d in unique)
+    return {"dataset": dataset, "files": len(files), "indexed": len(index), "unique": len(unique),
+            "bytes_before": bytes_before, "bytes_after": bytes_after}
+
+
+def bench_dataset(dataset, store_dir=STORE_DIR):
+    """Compara carga + fusão a partir dos arquivos e do armazenamento (resultado deve ser idêntico)."""
+    dir_path = os.path.join(SCHEMA_SOURCE_DIR, dataset)
+    t0 = time.perf_counter()
+    files_tree = jsonMerge.new_stats_tree()
+    for file_path in glob.glob(os.path.join(dir_path, '**/*.json'), recursive=True):
+        schema = jsonMerge.load_and_repair_json(file_path)
+        if schema is not None:
+            jsonMerge.repair_schema_structure(schema)
+            jsonMerge.update_stats_tree(files_tree, schema)
+    t_files = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    store_tree = jsonMerge.new_stats_tree()
+    for schema, count in load_unique(dataset, store_dir):
+        jsonMerge.update_stats_tree(store_tree, schema, count)
+    t_store = time.perf_counter() - t0
+
+    identical = (json.dumps(jsonMerge.build_schema_from_stats(files_tree))
+                 == json.dumps(jsonMerge.build_schema_from_stats(store_tree)))
+    return {"dataset": dataset, "files_seconds": t_files, "store_seconds": t_store, "identical": identical}
+
+
+def list_datasets(args_datasets):
+    if args_datasets:
+        return [d.strip() for d in args_datasets.split(",") if d.strip()]
+    return sorted(d.name for d in os.scandir(SCHEMA_SOURCE_DIR) if d.is_dir())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Armazenamento endereçado por conteúdo dos schemas por documento.")
+    parser.add_argument("command", choices=["ingest", "bench"])
+    parser.add_argument("--datasets", default=None, help="Datasets separados por vírgula (padrão: todos)")
+    parser.add_argument("--prune", action="store_true", help="Apaga os arquivos por documento após migrar")
+    args = parser.parse_args()
+
+    try:
+        datasets = list_datasets(args.datasets)
+    except FileNotFoundError:
+        print(f"❌ ERRO: O diretório fonte '{SCHEMA_SOURCE_DIR}' não foi encontrado."); return
+
+    for dataset in datasets:
+        if args.command == "ingest":
+            r = ingest_dataset(dataset, args.prune)
+            factor = r["indexed"] / r["unique"] if r["unique"] else 0
+            print(f"{dataset}: {r['indexed']} schemas -> {r['unique']} únicos ({factor:.1f}x) | "
+                  f"{r['bytes_before'] / 1024:.1f} KB -> {r['bytes_after'] / 1024:.1f} KB")
+        else:
+            if not has_index(dataset):
+                print(f"{dataset}: sem índice no armazenamento (rode 'ingest' antes).")
+                continue
+            r = bench_dataset(dataset)
+            print(f"{dataset}: arquivos {r['files_seconds']:.3f}s | armazenamento {r['store_seconds']:.3f}s "
+                  f"({r['files_seconds'] / max(r['store_seconds'], 1e-9):.1f}x) | resultado idêntico: {r['identical']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Cobertura dos schemas mestres sobre as coleções completas.
+
+Valida todos os documentos de um dataset contra o schema mestre da LLM (E,
+<dataset>_master_schema.json) e o baseline do genson (Eg,
+<dataset>_traditional_schema.json). Cada schema é compilado uma única vez em
+funções de checagem especializadas (só as palavras-chave presentes no nó viram
+checagens), e os documentos são distribuídos em lotes para um pool de processos.
+
+Para cada schema são reportados a fração de documentos válidos, a taxa de
+violação por caminho (ex.: "$.user.id" type, "$.entities.urls[]" required) e
+documentos/s. Palavras-chave suportadas: type, enum, const, properties, required,
+additionalProperties (false), items (objeto ou lista), prefixItems, anyOf, oneOf,
+allOf e $ref locais.
+
+Uso (a partir da raiz do projeto):
+    python3 scripts/SchemaValidator.py --datasets twitter
+    python3 scripts/SchemaValidator.py --datasets twitter --source datasets/twitter.jsonl
+    python3 scripts/SchemaValidator.py --datasets twitter --source datasets/twitter.jsonl.gz
+"""
+import os
+import glob
+import json
+import time
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+if __package__:
+    from . import CompressedIO
+    from . import SchemaCompare
+    from .SchemaCompare import ARRAY_ITEMS
+    from .Settings import apply_settings
+else:
+    import CompressedIO
+    import SchemaCompare
+    from SchemaCompare import ARRAY_ITEMS
+    from Settings import apply_settings
+
+# --- CONFIGURAÇÕES ---
+PROCESSED_DIR = "processed"
+MASTER_SCHEMA_DIR = SchemaCompare.MASTER_SCHEMA_DIR
+TRADITIONAL_SCHEMA_DIR = SchemaCompare.TRADITIONAL_SCHEMA_DIR
+VALIDATION_OUTPUT = "validation_report.csv"
+VALIDATION_PATHS_OUTPUT = "validation_paths.csv"
+# Documentos por lote enviado a cada processo.
+BATCH_SIZE = 500
+# Lotes em andamento por processo (limita a memória ao ler arquivos grandes).
+BATCHES_IN_FLIGHT_PER_WORKER = 4
+# ---------------------
+apply_settings(globals())
+
+# Estado de cada processo do pool (preenchido por _init_worker).
+_WORKER = {}
+
+
+def _accept(value, out):
+    return None
+
+
+def _type_test(type_name):
+    if type_name == "object":
+        return lambda v: isinstance(v, dict)
+    if type_name == "array":
+        return lambda v: isinstance(v, list)
+    if type_name == "string":
+        return lambda v: isinstance(v, str)
+    if type_name == "boolean":
+        return lambda v: isinstance(v, bool)
+    if type_name == "null":
+        return lambda v: v is None
+    if type_name == "integer":
+        return lambda v: (isinstance(v, int) and not isinstance(v, bool)) or (isinstance(v, float) and v.is_integer())
+    if type_name == "number":
+        return lambda v: isinstance(v, (int, float)) and not isinstance(v, bool)
+    return lambda v: True
+
+
+def compile_schema(schema, root=None, path="$", refs=None):
+    """
+    Compila um nó de schema em uma função check(valor, violações) que acrescenta
+    (caminho, tipo de violação) à lista `violações`. Um `$ref` local que aponta para
+    um ancestral em compilação (schema recursivo) reutiliza a função do ancestral.
+    """
+    if root is None:
+        root = schema
+    if refs is None:
+        refs = {}
+    if not isinstance(schema, dict):
+        return _accept
+
+    ref = schema.get("$ref")
+    if isinstance(ref, str) and ref.startswith("#"):
+        if ref in refs:
+            return refs[ref]
+        target, resolved = SchemaCompare._resolve_ref(schema, root, set())
+        if resolved is None:
+            return _accept
+        holder = []
+        refs[ref] = lambda value, out: holder[0](value, out)
+        holder.append(compile_schema(target, root, path, refs))
+        del refs[ref]
+        return holder[0]
+
+    checks = []
+    type_check = None
+
+    raw_type = schema.get("type")
+    if raw_type is not None:
+        names = [raw_type] if isinstance(raw_type, str) else [t for t in raw_type if isinstance(t, str)]
+        tests = [_type_test(t) for t in names]
+        if len(tests) == 1:
+            test = tests[0]
+        else:
+            test = lambda v: any(t(v) for t in tests)
+
+        def check_type(value, out):
+            if not test(value):
+                out.append((path, "type"))
+                return False
+            return True
+        type_check = check_type
+
+    if "enum" in schema and isinstance(schema["enum"], list):
+        allowed = schema["enum"]
+
+        def check_enum(value, out):
+            if value not in allowed:
+                out.append((path, "enum"))
+        checks.append(check_enum)
+
+    if "const" in schema:
+        constant = schema["const"]
+
+        def check_const(value, out):
+            if value != constant:
+                out.append((path, "const"))
+        checks.append(check_const)
+
+    properties = schema.get("properties") if isinstance(schema.get("properties"), dict) else {}
+    property_checks = [(k, compile_schema(v, root, f"{path}.{k}", refs)) for k, v in properties.items()]
+    required = [k for k in schema.get("required", []) if isinstance(k, str)] if isinstance(schema.get("required"), list) else []
+    closed = schema.get("additionalProperties") is False
+    if property_checks or required or closed:
+        known = set(properties)
+
+        def check_object(value, out):
+            if not isinstance(value, dict):
+                return
+            for key in required:
+                if key not in value:
+                    out.append((f"{path}.{key}", "required"))
+            for key, check in property_checks:
+                if key in value:
+                    check(value[key], out)
+            if closed and not known.issuperset(value):
+                out.append((path, "additionalProperties"))
+        checks.append(check_object)
+
+    items = schema.get("items")
+    prefix = schema.get("prefixItems") if isinstance(schema.get("prefixItems"), list) else None
+    if isinstance(items, list):
+        prefix, items = items, None
+    item_path = f"{path}{ARRAY_ITEMS}"
+    prefix_checks = [compile_schema(s, root, item_path, refs) for s in prefix] if prefix else []
+    items_check = compile_schema(items, root, item_path, refs) if isinstance(items, dict) else None
+    if prefix_checks or items_check:
+        def check_array(value, out):
+            if not isinstance(value, list):
+                return
+            for i, item in enumerate(value):
+                if i < len(prefix_checks):
+                    prefix_checks[i](item, out)
+                elif items_check is not None:
+                    items_check(item, out)
+        checks.append(check_array)
+
+    for keyword in ("anyOf", "oneOf"):
+        if isinstance(schema.get(keyword), list) and schema[keyword]:
+            branches = [compile_schema(b, root, path, refs) for b in schema[keyword]]
+            exactly_one = keyword == "oneOf"
+
+            def check_branches(value, out, branches=branches, exactly_one=exactly_one, keyword=keyword):
+                passed = 0
+                for branch in branches:
+                    trial = []
+                    branch(value, trial)
+                    if not trial:
+                        passed += 1
+                        if not exactly_one:
+                            return
+                if passed == 0 or (exactly_one and passed > 1):
+                    out.append((path, keyword))
+            checks.append(check_branches)
+
+    if isinstance(schema.get("allOf"), list):
+        checks.extend(compile_schema(b, root, path, refs) for b in schema["allOf"])
+
+    if type_check is not None:
+        if not checks:
+            return type_check
+
+        # Se o tipo já falhou, as demais checagens só gerariam ruído.
+        def check_all(value, out):
+            if type_check(value, out):
+                for check in checks:
+                    check(value, out)
+        return check_all
+    if not checks:
+        return _accept
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(value, out):
+        for check in checks:
+            check(value, out)
+    return check_all
+
+
+def _init_worker(schemas):
+    _WORKER["checks"] = {name: compile_schema(schema) for name, schema in schemas.items()}
+
+
+def _validate_batch(batch):
+    """Valida um lote (caminhos de arquivo, linhas JSON ou objetos) contra todos os schemas."""
+    checks = _WORKER["checks"]
+    result = {name: {"documents": 0, "valid": 0, "violations": Counter()} for name in checks}
+    unreadable = 0
+    for item in batch:
+        try:
+            if isinstance(item, str) and not item.lstrip().startswith(("{", "[")):
+                with open(item, "r", encoding="utf-8") as f:
+                    document = json.load(f)
+            elif isinstance(item, str):
+                document = json.loads(item)
+            else:
+                document = item
+        except (OSError, json.JSONDecodeError):
+            unreadable += 1
+            continue
+        for name, check in checks.items():
+            violations = []
+            check(document, violations)
+            stats = result[name]
+            stats["documents"] += 1
+            if violations:
+                stats["violations"].update(set(violations))
+            else:
+                stats["valid"] += 1
+    return result, unreadable
+
+
+def iter_documents(source):
+    """
+    Itera os documentos de uma fonte: diretório (um documento por arquivo .json,
+    enviado como caminho), arquivo JSONL (uma linha por documento) ou arquivo JSON
+    com um array de documentos (lido em streaming com ijson). Arquivos podem estar
+    comprimidos (.gz, .bz2, .xz, .zst ou membro de .zip, ver CompressedIO).
+    """
+    if os.path.isdir(source):
+        for file_path in glob.iglob(os.path.join(source, "**", "*.json"), recursive=True):
+            yield file_path
+        return
+    if CompressedIO.peek_text(source).lstrip().startswith("["):
+        import ijson
+        with CompressedIO.open_binary(source) as f:
+            yield from ijson.items(f, "item", use_float=True)
+        return
+    with CompressedIO.open_text(source) as f:
+        for line in f:
+            if line.strip():
+                yield line
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def validate_source(schemas, source, workers=None, batch_size=BATCH_SIZE):
+    """Valida os documentos de `source` contra {nome: schema}. Retorna (resultados, ilegíveis, segundos)."""
+    workers = workers or os.cpu_count() or 1
+    totals = {name: {"documents": 0, "valid": 0, "violations": Counter()} for name in schemas}
+    unreadable = 0
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(schemas,)) as executor:
+        running = set()
+
+        def collect(done):
+            nonlocal unreadable
+            for future in done:
+                result, bad = future.result()
+                unreadable += bad
+                for name, stats in result.items():
+                    totals[name]["documents"] += stats["documents"]
+                    totals[name]["valid"] += stats["valid"]
+                    totals[name]["violations"].update(stats["violations"])
+
+        for batch in _batches(iter_documents(source), batch_size):
+            if len(running) >= workers * BATCHES_IN_FLIGHT_PER_WORKER:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                collect(done)
+            running.add(executor.submit(_validate_batch, batch))
+        collect(wait(running).done)
+    return totals, unreadable, time.perf_counter() - t0
+
+
+def validate_dataset(dataset, source=None, workers=None):
+    """Valida um dataset contra E e Eg. Retorna (linhas de resumo, linhas por caminho)."""
+    schemas = {}
+    for name, path in (("E", os.path.join(MASTER_SCHEMA_DIR, f"{dataset}_master_schema.json")),
+                       ("Eg", os.path.join(TRADITIONAL_SCHEMA_DIR, f"{dataset}_traditional_schema.json"))):
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                schemas[name] = json.load(f)
+        else:
+            print(f"   -> Aviso: schema {name} não encontrado em '{path}'.")
+    if not schemas:
+        return [], []
+
+    source = source or os.path.join(PROCESSED_DIR, dataset)
+    print(f"\n--- Validação: {dataset} ({source}) ---")
+    totals, unreadable, seconds = validate_source(schemas, source, workers)
+
+    summary, paths = [], []
+    for name, stats in totals.items():
+        documents = stats["documents"]
+        row = {"dataset": dataset, "schema": name, "documents": documents, "unreadable": unreadable,
+               "valid": stats["valid"], "valid_fraction": stats["valid"] / documents if documents else 0.0,
+               "seconds": seconds, "docs_per_sec": documents / seconds if seconds else 0.0}
+        summary.append(row)
+        for (path, kind), count in stats["violations"].most_common():
+            paths.append({"dataset": dataset, "schema": name, "path": path, "violation": kind,
+                          "documents": count, "rate": count / documents})
+        worst = ", ".join(f"{p} ({k}) {c / documents:.1%}" for (p, k), c in stats["violations"].most_common(3))
+        print(f" {name}: {row['valid_fraction']:.1%} de {documents} documentos válidos | "
+              f"{row['docs_per_sec']:.0f} docs/s" + (f" | piores caminhos: {worst}" if worst else ""))
+    return summary, paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Valida coleções completas contra E (LLM) e Eg (genson).")
+    parser.add_argument("--datasets", default=None, help="Datasets separados por vírgula (padrão: todos com Eg)")
+    parser.add_argument("--source", default=None,
+                        help="Diretório, JSONL ou array JSON (comprimidos ou não) com os documentos "
+                             "(padrão: processed/<dataset>)")
+    parser.add_argument("--workers", type=int, default=None, help="Processos paralelos (padrão: nº de CPUs)")
+    args = parser.parse_args()
+
+    if args.datasets:
+        datasets = [d.strip() for d in args.datasets.split(",") if d.strip()]
+    else:
+        suffix = "_traditional_schema.json"
+        datasets = sorted(os.path.basename(p)[:-len(suffix)]
+                          for p in glob.glob(os.path.join(TRADITIONAL_SCHEMA_DIR, f"*{suffix}")))
+
+    summary, paths = [], []
+    for dataset in datasets:
+        rows, path_rows = validate_dataset(dataset, args.source, args.workers)
+        summary += rows
+        paths += path_rows
+
+    if summary:
+        SchemaCompare.write_csv(summary, VALIDATION_OUTPUT)
+        SchemaCompare.write_csv(paths, VALIDATION_PATHS_OUTPUT)
+        print(f"\nResultados salvos em: {VALIDATION_OUTPUT} e {VALIDATION_PATHS_OUTPUT}")
+
+
+if __name__ == "__main__":
+    main()
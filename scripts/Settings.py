@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Configuração dos scripts por arquivo TOML/YAML e variáveis de ambiente.
+
+Cada script mantém as suas constantes no bloco "CONFIGURAÇÕES" e chama
+`apply_settings(globals())` no fim dele: as constantes que aparecem na seção do
+módulo no arquivo de configuração, ou em uma variável de ambiente, são
+substituídas antes de o resto do módulo (e de quem o importa) usá-las.
+
+Arquivo de configuração: o indicado em SCHEMA_DISCOVERY_CONFIG ou, se não houver,
+o primeiro de CONFIG_FILES no diretório atual. Uma seção por módulo:
+
+    [LLMExtraction]
+    MANIFEST_PATH = "manifest.csv"
+    MODEL_PATH_HIGH = "/modelos/Qwen2.5-Coder-14B-Instruct-MLX-4bit/"
+
+    [PreprocessDatasets]
+    size_target = 40
+
+Variáveis de ambiente têm precedência sobre o arquivo e seguem o formato
+SCHEMA_DISCOVERY_<MÓDULO>__<CONSTANTE> (sem diferenciar maiúsculas), por exemplo
+SCHEMA_DISCOVERY_JSONMERGE__REQUIRED_THRESHOLD=0.5. O valor é convertido para o
+tipo do valor padrão; listas, dicionários e constantes sem valor padrão (None)
+são lidos como JSON.
+
+Constantes derivadas de outras no próprio bloco (ex.: RAW_JSON_DIR a partir de
+DATASETS_DIR no schemaGeneration) são calculadas antes da substituição e precisam
+ser configuradas diretamente.
+
+Uso (a partir da raiz do projeto):
+    python3 scripts/Settings.py                    # arquivo em uso e substituições por módulo
+    python3 scripts/Settings.py --module jsonMerge # valores efetivos das constantes do módulo
+"""
+import os
+import json
+import types
+import argparse
+
+# --- CONFIGURAÇÕES ---
+CONFIG_ENV = "SCHEMA_DISCOVERY_CONFIG"
+ENV_PREFIX = "SCHEMA_DISCOVERY_"
+CONFIG_FILES = ("schema_discovery.toml", "schema_discovery.yaml", "schema_discovery.yml")
+# ---------------------
+
+_CONFIG = {}  # caminho do arquivo -> conteúdo já lido
+_TRUE = ("1", "true", "yes", "on", "sim")
+_FALSE = ("0", "false", "no", "off", "nao", "não")
+
+
+def config_path():
+    """Arquivo de configuração em uso (ou None)."""
+    path = os.environ.get(CONFIG_ENV)
+    if path:
+        return path
+    return next((name for name in CONFIG_FILES if os.path.exists(name)), None)
+
+
+def load_config(path=None):
+    """Seções do arquivo de configuração: {módulo: {constante: valor}}."""
+    path = path or config_path()
+    if path is None:
+        return {}
+    if path not in _CONFIG:
+        if path.endswith(".toml"):
+            import tomllib
+            with open(path, "rb") as f:
+                config = tomllib.load(f)
+        else:
+            import yaml
+            with open(path, "r", encoding="utf-8") as f:
+                config = yaml.safe_load(f) or {}
+        if not isinstance(config, dict) or not all(isinstance(v, dict) for v in config.values()):
+            raise ValueError(f"Configuração inválida em '{path}': esperado uma seção por módulo.")
+        _CONFIG[path] = config
+    return _CONFIG[path]
+
+
+def module_name(namespace):
+    """Nome do módulo dono de `namespace`, sem o pacote (`schema_discovery.jsonMerge` -> `jsonMerge`);
+    para o script executado diretamente, o nome do arquivo."""
+    name = namespace.get("__name__", "")
+    if name == "__main__" and namespace.get("__file__"):
+        return os.path.splitext(os.path.basename(namespace["__file__"]))[0]
+    return name.rpartition(".")[2]
+
+
+def is_setting(name, value):
+    """Constantes configuráveis: nomes públicos que não são módulos, funções nem classes."""
+    return not name.startswith("_") and not isinstance(value, (types.ModuleType, types.FunctionType, type))
+
+
+def coerce(value, default):
+    """Converte `value` (texto de variável de ambiente ou valor do arquivo) para o tipo de `default`."""
+    if isinstance(value, str) and not isinstance(default, str):
+        if isinstance(default, bool):
+            if value.strip().lower() in _TRUE:
+                return True
+            if value.strip().lower() in _FALSE:
+                return False
+            raise ValueError(f"valor booleano inválido: {value!r}")
+        if isinstance(default, int):
+            return int(value)
+        if isinstance(default, float):
+            return float(value)
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            return value
+    if isinstance(default, float) and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(default, tuple) and isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+def overrides(module, namespace):
+    """Substituições de `module` presentes em `namespace`: {constante: (valor, origem)}."""
+    result = {}
+    settings = {name.lower(): name for name, value in namespace.items() if is_setting(name, value)}
+    for key, value in load_config().get(module, {}).items():
+        name = settings.get(key.lower())
+        if name is not None:
+            result[name] = (coerce(value, namespace[name]), config_path())
+    prefix = f"{ENV_PREFIX}{module.upper()}__"
+    for var, value in os.environ.items():
+        if var.upper().startswith(prefix):
+            name = settings.get(var[len(prefix):].lower())
+            if name is not None:
+                try:
+                    result[name] = (coerce(value, namespace[name]), var)
+                except ValueError as e:
+                    raise ValueError(f"Variável de ambiente {var}: {e}") from None
+    return result
+
+
+def apply_settings(namespace):
+    """Aplica ao namespace do módulo (globals()) as substituições do arquivo e do ambiente."""
+    for name, (value, _) in overrides(module_name(namespace), namespace).items():
+        namespace[name] = value
+
+
+def unknown_keys(module, namespace):
+    """Chaves da seção do módulo (arquivo e ambiente) que não correspondem a nenhuma constante."""
+    settings = {name.lower() for name, value in namespace.items() if is_setting(name, value)}
+    keys = [key for key in load_config().get(module, {}) if key.lower() not in settings]
+    prefix = f"{ENV_PREFIX}{module.upper()}__"
+    keys += [var for var in os.environ if var.upper().startswith(prefix)
+             and var[len(prefix):].lower() not in settings]
+    return keys
+
+
+def _script_modules():
+    """Nomes dos módulos deste diretório, por nome em maiúsculas (como nas variáveis de ambiente)."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    return {name[:-3].upper(): name[:-3] for name in os.listdir(directory) if name.endswith(".py")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mostra a configuração efetiva dos scripts.")
+    parser.add_argument("--module", default=None, help="Mostra todas as constantes deste módulo")
+    args = parser.parse_args()
+
+    path = config_path()
+    print(f"Arquivo de configuração: {path or '(nenhum)'}")
+    scripts = _script_modules()
+    if args.module:
+        modules = [args.module]
+    else:
+        from_env = {var[len(ENV_PREFIX):].partition("__")[0].upper() for var in os.environ
+                    if var.upper().startswith(ENV_PREFIX) and "__" in var[len(ENV_PREFIX):]}
+        modules = sorted(set(load_config()) | {scripts.get(name, name) for name in from_env})
+
+    import importlib
+    for module in modules:
+        try:
+            namespace = vars(importlib.import_module(f".{module}", __package__) if __package__
+                             else importlib.import_module(module))
+        except ImportError as e:
+            print(f"\n❌ ERRO: módulo '{module}' não encontrado ({e})")
+            continue
+        changed = overrides(module, namespace)
+        print(f"\n[{module}]")
+        for name, value in namespace.items():
+            shown = name in changed or (args.module and is_setting(name, value)
+                                        and isinstance(value, (str, int, float, list, dict, tuple, type(None))))
+            if shown:
+                source = f"  # {changed[name][1]}" if name in changed else ""
+                print(f"  {name} = {value!r}{source}")
+        for key in unknown_keys(module, namespace):
+            print(f"  Aviso: '{key}' não corresponde a nenhuma constante de {module}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,79 @@ import os
 import json
 import random
 import time
-from faker import Faker
+import shutil
+import argparse
+from multiprocessing import Pool
+if __package__:
+    from .Settings import apply_settings
+else:
+    from Settings import apply_settings
 
-fake = Faker()
 OUTPUT_DIR = "datasets"
+# Onde o schema "verdade" de cada corpus gerado é salvo (fora de datasets/ para não virar dataset).
+GROUND_TRUTH_DIR = "ground_truth_schemas"
+
+# --- CONFIGURAÇÕES DO MODO RÁPIDO ---
+# Quantidade de valores pré-gerados pelo Faker para cada campo textual.
+POOL_SIZE = 2000
+# Espaçamento entre os intervalos de ids de cada shard (evita ids repetidos entre processos).
+SHARD_ID_STRIDE = 10**9
+# Shards quando não informados. Fixo (e não o nº de CPUs): a saída depende dos shards.
+DEFAULT_SHARDS = 4
+# Tamanho do buffer usado para concatenar os shards no arquivo final.
+COPY_BUFFER_BYTES = 16 * 1024 * 1024
+# Knobs de variação do schema (podem ser sobrescritos pela CLI).
+DEFAULT_VARIATION = {
+    "email_null_rate": 0.2,
+    "phone_null_rate": 0.3,
+    "min_products": 2,
+    "max_products": 6,
+    "max_items": 3,
+    # --- Heterogeneidade (todos desligados por padrão = formato original) ---
+    "optional_rate": 0.0,      # prob. de omitir cada campo de OPTIONAL_FIELDS
+    "polymorphism_rate": 0.0,  # prob. de um campo de POLYMORPHIC_FIELDS trocar de tipo
+    "nesting_depth": 0,        # profundidade do objeto aninhado extra person.profile
+    "key_space": 0,            # nº de chaves distintas possíveis em "attributes"
+    "keys_per_doc": 8,         # chaves de "attributes" sorteadas por documento
+    "drift": 0.0,              # intensidade da deriva de schema ao longo do fluxo (0..1)
+}
+# ------------------------------------
+apply_settings(globals())
+
+CATEGORIES = ["Electronic", "Food", "Clothes", "Books", "Furniture"]
+STATUSES = ["pending", "completed", "canceled"]
+PAYMENT_METHODS = ["credit_card", "debit_card", "cash", "paypal"]
+
+# Campos que podem ser omitidos com probabilidade `optional_rate`.
+OPTIONAL_FIELDS = {
+    "person": ("age", "city", "state", "registered_at"),
+    "product": ("category", "in_stock", "rating", "created_at"),
+    "transaction": ("status", "payment_method"),
+}
+# Campos que, com probabilidade `polymorphism_rate`, aparecem com um tipo alternativo.
+# (entidade, campo) -> (tipo original, tipo alternativo, conversor)
+POLYMORPHIC_FIELDS = {
+    ("person", "age"): ("integer", "string", str),
+    ("product", "price"): ("number", "string", lambda v: f"{v:.2f}"),
+    ("product", "in_stock"): ("boolean", "integer", int),
+    ("transaction", "person_id"): ("integer", "string", str),
+}
+# Tipo de cada chave de "attributes", indexado por (índice da chave % 3).
+ATTRIBUTE_TYPES = ("string", "integer", "number")
+_fake = None
+
+
+def faker():
+    """Instância compartilhada do Faker, criada no primeiro uso (importar o Faker é lento)."""
+    global _fake
+    if _fake is None:
+        from faker import Faker
+        _fake = Faker()
+    return _fake
+
 
 def generate_person(person_id: int):
+    fake = faker()
     return {
         "id": person_id,
         "name": fake.name(),
@@ -21,10 +88,11 @@ def generate_person(person_id: int):
     }
 
 def generate_product(product_id: int):
+    fake = faker()
     return {
         "id": product_id,
         "name": fake.word().capitalize(),
-        "category": random.choice(["Electronic", "Food", "Clothes", "Books", "Furniture"]),
+        "category": random.choice(CATEGORIES),
         "price": round(random.uniform(10, 2000), 2),
         "in_stock": random.choice([True, False]),
         "rating": round(random.uniform(1, 5), 1),
@@ -32,12 +100,13 @@ def generate_product(product_id: int):
     }
 
 def generate_transaction(transaction_id: int, person, products, max_items: int = 3):
+    fake = faker()
     transaction = {
         "id": transaction_id,
         "person_id": person["id"],
         "date": fake.date_this_decade().isoformat(),
-        "status": random.choice(["pending", "completed", "canceled"]),
-        "payment_method": random.choice(["credit_card", "debit_card", "cash", "paypal"])
+        "status": random.choice(STATUSES),
+        "payment_method": random.choice(PAYMENT_METHODS)
     }
 
     chosen_products = random.sample(products, k=random.randint(1, min(max_items, len(products))))
@@ -71,6 +140,8 @@ def generate_json_array_by_size(size_mb: int, check_every: int = 50):
 
     person_id = product_id = transaction_id = 1
     written = 0
+    # Contagem de bytes feita em memória: evita flush/fsync/getsize a cada verificação
+    size = 1
     t0 = time.time()
 
     with open(file_path, "w", encoding="utf-8") as f:
@@ -95,7 +166,9 @@ def generate_json_array_by_size(size_mb: int, check_every: int = 50):
             dumped = json.dumps(doc, ensure_ascii=False, separators=(',', ':'))
             if not first:
                 f.write(",")
+                size += 1
             f.write(dumped)
+            size += len(dumped.encode("utf-8"))
 
             first = False
             person_id += 1
@@ -103,9 +176,6 @@ def generate_json_array_by_size(size_mb: int, check_every: int = 50):
             written += 1
 
             if written % check_every == 0:
-                f.flush()
-                os.fsync(f.fileno())
-                size = os.path.getsize(file_path)
                 elapsed = time.time() - t0
                 print(f"[ARRAY] docs={written} tamanho={size/(1024*1024):.2f} MB estimado={elapsed:.1f}s")
                 if size >= target_bytes:
@@ -117,5 +187,478 @@ def generate_json_array_by_size(size_mb: int, check_every: int = 50):
     print(f"  documentos: {written}")
     print(f"  tamanho final: {final_size:.2f} MB")
 
-# Exemplo de uso:
-generate_json_array_by_size(5)  # gera um JSON de ~5MB
+
+# --- MODO RÁPIDO (pools pré-gerados + shards paralelos) ---
+
+def build_value_pools(seed: int, pool_size: int = POOL_SIZE):
+    """
+    Pré-gera com o Faker listas de valores para os campos textuais.
+    O gerador rápido apenas sorteia destas listas, sem chamar o Faker por campo.
+    """
+    from faker import Faker
+    pool_fake = Faker()
+    pool_fake.seed_instance(seed)
+    return {
+        "names": [pool_fake.name() for _ in range(pool_size)],
+        "emails": [pool_fake.email() for _ in range(pool_size)],
+        "phones": [pool_fake.phone_number() for _ in range(pool_size)],
+        "cities": [pool_fake.city() for _ in range(pool_size)],
+        "states": [pool_fake.state_abbr() for _ in range(pool_size)],
+        "words": [pool_fake.word().capitalize() for _ in range(pool_size)],
+        "dates": [pool_fake.date_this_decade().isoformat() for _ in range(pool_size)],
+    }
+
+
+def _vary_entity(rng, entity_name, entity, variation):
+    """Aplica os knobs de campos opcionais e de polimorfismo de tipos a uma entidade."""
+    optional_rate = variation["optional_rate"]
+    if optional_rate:
+        for field in OPTIONAL_FIELDS[entity_name]:
+            if field in entity and rng.random() < optional_rate:
+                del entity[field]
+    poly_rate = variation["polymorphism_rate"]
+    if poly_rate:
+        for (name, field), (_, _, convert) in POLYMORPHIC_FIELDS.items():
+            if name == entity_name and field in entity and rng.random() < poly_rate:
+                entity[field] = convert(entity[field])
+    return entity
+
+
+def _nested_profile(rng, pools, depth):
+    """Cria a cadeia de objetos aninhados person.profile com `depth` níveis."""
+    node = {"level": depth, "label": rng.choice(pools["words"]), "value": rng.choice(pools["words"])}
+    for level in range(depth - 1, 0, -1):
+        node = {"level": level, "label": rng.choice(pools["words"]), "child": node}
+    return node
+
+
+def _attributes(rng, pools, key_space, keys_per_doc):
+    """Sorteia `keys_per_doc` chaves de um espaço de `key_space` chaves distintas."""
+    attributes = {}
+    for k in sorted(rng.sample(range(key_space), min(keys_per_doc, key_space))):
+        kind = ATTRIBUTE_TYPES[k % len(ATTRIBUTE_TYPES)]
+        if kind == "string":
+            value = rng.choice(pools["words"])
+        elif kind == "integer":
+            value = rng.randint(0, 10_000)
+        else:
+            value = round(rng.uniform(0, 1000), 3)
+        attributes[f"attr_{k:05d}"] = value
+    return attributes
+
+
+def generate_document_fast(rng, pools, person_id, product_id, transaction_id, variation, progress=0.0):
+    """
+    Gera um documento com o mesmo formato de generate_json_array_by_size, usando
+    os pools pré-gerados. `progress` (0..1) é a posição do documento no fluxo e
+    controla a deriva de schema. Retorna (documento, quantidade de produtos gerados).
+    """
+    choice = rng.choice
+    drift_p = variation["drift"] * progress
+    person = {
+        "id": person_id,
+        "name": choice(pools["names"]),
+        "email": choice(pools["emails"]) if rng.random() >= variation["email_null_rate"] else None,
+        "age": rng.randint(18, 80),
+        "phone": choice(pools["phones"]) if rng.random() >= variation["phone_null_rate"] else None,
+        "city": choice(pools["cities"]),
+        "state": choice(pools["states"]),
+        "registered_at": choice(pools["dates"]),
+    }
+    # Deriva: "name" passa gradualmente a se chamar "full_name"
+    if drift_p and rng.random() < drift_p:
+        person["full_name"] = person.pop("name")
+    if variation["nesting_depth"]:
+        person["profile"] = _nested_profile(rng, pools, variation["nesting_depth"])
+
+    products = []
+    for i in range(rng.randint(variation["min_products"], variation["max_products"])):
+        product = {
+            "id": product_id + i,
+            "name": choice(pools["words"]),
+            "category": choice(CATEGORIES),
+            "price": round(rng.uniform(10, 2000), 2),
+            "in_stock": rng.random() < 0.5,
+            "rating": round(rng.uniform(1, 5), 1),
+            "created_at": choice(pools["dates"]),
+        }
+        # Deriva: "rating" passa gradualmente de número para objeto
+        if drift_p and rng.random() < drift_p:
+            product["rating"] = {"score": product["rating"], "votes": rng.randint(1, 500)}
+        products.append(product)
+
+    transaction = {
+        "id": transaction_id,
+        "person_id": person_id,
+        "date": choice(pools["dates"]),
+        "status": choice(STATUSES),
+        "payment_method": choice(PAYMENT_METHODS),
+    }
+    # Deriva: campo novo "currency" surge ao longo do fluxo
+    if drift_p and rng.random() < drift_p:
+        transaction["currency"] = choice(["BRL", "USD", "EUR"])
+
+    chosen = rng.sample(products, k=rng.randint(1, min(variation["max_items"], len(products))))
+    items = [
+        {
+            "id": item_id,
+            "transaction_id": transaction_id,
+            "product_id": product["id"],
+            "quantity": rng.randint(1, 5),
+            "price": product["price"],
+        }
+        for item_id, product in enumerate(chosen, 1)
+    ]
+
+    if variation["optional_rate"] or variation["polymorphism_rate"]:
+        _vary_entity(rng, "person", person, variation)
+        for product in products:
+            _vary_entity(rng, "product", product, variation)
+        _vary_entity(rng, "transaction", transaction, variation)
+
+    doc = {
+        "person": person,
+        "products": products,
+        "transaction": transaction,
+        "transaction_items": items,
+    }
+    if variation["key_space"]:
+        doc["attributes"] = _attributes(rng, pools, variation["key_space"], variation["keys_per_doc"])
+    return doc, len(products)
+
+
+def _property(types, presence=1.0, **extra):
+    """
+    Monta uma propriedade do schema verdade. `types` é {tipo: peso}; os pesos e a
+    probabilidade de presença ficam em 'x-type-weights' e 'x-presence'.
+    """
+    types = {t: round(w, 6) for t, w in types.items() if w > 0}
+    names = sorted(types)
+    prop = {"type": names[0] if len(names) == 1 else names}
+    prop.update(extra)
+    prop["x-presence"] = round(presence, 6)
+    prop["x-type-weights"] = types
+    return prop
+
+
+def _object(properties):
+    """Monta um objeto do schema verdade; 'required' = campos sempre presentes."""
+    schema = {"type": "object", "properties": properties}
+    required = sorted(k for k, p in properties.items() if p["x-presence"] >= 1.0)
+    if required:
+        schema["required"] = required
+    return schema
+
+
+def ground_truth_schema(variation=None):
+    """
+    Deriva analiticamente dos knobs de variação o schema "verdade" do corpus gerado
+    pelo modo rápido. Além de 'type'/'properties'/'required', cada propriedade traz
+    'x-presence' (fração esperada de documentos em que aparece) e 'x-type-weights'
+    (fração esperada de cada tipo), o que permite prever as decisões de
+    REQUIRED_THRESHOLD e TYPE_THRESHOLD do jsonMerge.
+    """
+    v = {**DEFAULT_VARIATION, **(variation or {})}
+    # Na média do fluxo, a deriva atua com probabilidade drift/2 (progress uniforme em 0..1).
+    drift = v["drift"] / 2
+
+    def field(entity, name, base_type, presence=1.0, base_weights=None, **extra):
+        if name in OPTIONAL_FIELDS.get(entity, ()):
+            presence *= 1 - v["optional_rate"]
+        weights = dict(base_weights or {base_type: 1.0})
+        poly = POLYMORPHIC_FIELDS.get((entity, name))
+        if poly and v["polymorphism_rate"]:
+            original, alternative, _ = poly
+            weights[original] = weights.get(original, 0) * (1 - v["polymorphism_rate"])
+            weights[alternative] = weights.get(alternative, 0) + v["polymorphism_rate"]
+        return _property(weights, presence, **extra)
+
+    person = {
+        "id": field("person", "id", "integer"),
+        "name": field("person", "name", "string", presence=1 - drift),
+        "email": field("person", "email", "string",
+                       base_weights={"string": 1 - v["email_null_rate"], "null": v["email_null_rate"]}),
+        "age": field("person", "age", "integer"),
+        "phone": field("person", "phone", "string",
+                       base_weights={"string": 1 - v["phone_null_rate"], "null": v["phone_null_rate"]}),
+        "city": field("person", "city", "string"),
+        "state": field("person", "state", "string"),
+        "registered_at": field("person", "registered_at", "string"),
+    }
+    if drift:
+        person["full_name"] = field("person", "full_name", "string", presence=drift)
+    if v["nesting_depth"]:
+        node = _object({
+            "level": _property({"integer": 1.0}),
+            "label": _property({"string": 1.0}),
+            "value": _property({"string": 1.0}),
+        })
+        for _ in range(v["nesting_depth"] - 1):
+            node = _object({
+                "level": _property({"integer": 1.0}),
+                "label": _property({"string": 1.0}),
+                "child": _property({"object": 1.0}, **{k: node[k] for k in ("properties", "required") if k in node}),
+            })
+        person["profile"] = _property({"object": 1.0}, **{k: node[k] for k in ("properties", "required") if k in node})
+
+    rating_extra = {}
+    rating_weights = {"number": 1.0}
+    if drift:
+        rating_weights = {"number": 1 - drift, "object": drift}
+        rating_extra = _object({"score": _property({"number": 1.0}), "votes": _property({"integer": 1.0})})
+        rating_extra.pop("type")
+    product = _object({
+        "id": field("product", "id", "integer"),
+        "name": field("product", "name", "string"),
+        "category": field("product", "category", "string"),
+        "price": field("product", "price", "number"),
+        "in_stock": field("product", "in_stock", "boolean"),
+        "rating": field("product", "rating", "number", base_weights=rating_weights, **rating_extra),
+        "created_at": field("product", "created_at", "string"),
+    })
+
+    transaction = {
+        "id": field("transaction", "id", "integer"),
+        "person_id": field("transaction", "person_id", "integer"),
+        "date": field("transaction", "date", "string"),
+        "status": field("transaction", "status", "string"),
+        "payment_method": field("transaction", "payment_method", "string"),
+    }
+    if drift:
+        transaction["currency"] = field("transaction", "currency", "string", presence=drift)
+
+    # Os itens copiam o preço antes do polimorfismo ser aplicado ao produto.
+    item = _object({
+        "id": _property({"integer": 1.0}),
+        "transaction_id": _property({"integer": 1.0}),
+        "product_id": _property({"integer": 1.0}),
+        "quantity": _property({"integer": 1.0}),
+        "price": _property({"number": 1.0}),
+    })
+
+    root = {
+        "person": _property({"object": 1.0}, **{k: val for k, val in _object(person).items() if k != "type"}),
+        "products": _property({"array": 1.0}, items=product),
+        "transaction": _property({"object": 1.0}, **{k: val for k, val in _object(transaction).items() if k != "type"}),
+        "transaction_items": _property({"array": 1.0}, items=item),
+    }
+    if v["key_space"]:
+        presence = min(v["keys_per_doc"], v["key_space"]) / v["key_space"]
+        attributes = {
+            f"attr_{k:05d}": _property({ATTRIBUTE_TYPES[k % len(ATTRIBUTE_TYPES)]: 1.0}, presence)
+            for k in range(v["key_space"])
+        }
+        root["attributes"] = _property({"object": 1.0}, properties=attributes)
+
+    schema = {"$schema": "https://json-schema.org/draft/2020-12/schema"}
+    schema.update(_object(root))
+    return schema
+
+
+def _write_shard(task):
+    """
+    Worker de um shard: escreve documentos separados por ',' (array) ou '\\n' (jsonl),
+    sem colchetes, até que o próximo documento ultrapasse a cota de bytes do shard.
+    A contagem de bytes é feita em memória. Retorna (caminho, bytes, documentos).
+    """
+    shard_path, quota_bytes, seed, shard_index, file_format, variation, stream_offset, stream_total = task
+    rng = random.Random(seed)
+    pools = build_value_pools(seed)
+    separator = b"," if file_format == "array" else b"\n"
+
+    base_id = shard_index * SHARD_ID_STRIDE + 1
+    person_id = product_id = transaction_id = base_id
+    written_bytes = 0
+    docs = 0
+
+    with open(shard_path, "wb", buffering=COPY_BUFFER_BYTES) as f:
+        while True:
+            progress = (stream_offset + written_bytes) / stream_total
+            doc, n_products = generate_document_fast(rng, pools, person_id, product_id, transaction_id,
+                                                     variation, progress)
+            encoded = json.dumps(doc, ensure_ascii=False, separators=(',', ':')).encode("utf-8")
+            cost = len(encoded) + (len(separator) if docs else 0)
+            if written_bytes + cost > quota_bytes:
+                break
+            if docs:
+                f.write(separator)
+            f.write(encoded)
+            written_bytes += cost
+            docs += 1
+            person_id += 1
+            transaction_id += 1
+            product_id += n_products
+
+    return shard_path, written_bytes, docs
+
+
+def generate_corpus(output_path, size_bytes, file_format="array", seed=42, shards=None,
+                    exact=True, variation=None, schema_path=None):
+    """
+    Gera um corpus sintético de `size_bytes` bytes em `output_path`.
+
+    Os shards são escritos em paralelo (um processo por shard) e depois concatenados
+    em um único ARRAY JSON válido (`file_format="array"`) ou JSON Lines (`"jsonl"`).
+    Com `exact=True` o arquivo é completado com espaços em branco (válidos em JSON)
+    até atingir exatamente o tamanho pedido. A saída é reprodutível para o mesmo
+    (size_bytes, file_format, seed, shards, variation). Se `schema_path` for informado,
+    o schema verdade (ver ground_truth_schema) é salvo nesse caminho.
+    """
+    if file_format not in ("array", "jsonl"):
+        raise ValueError(f"Formato desconhecido: {file_format}")
+
+    variation = {**DEFAULT_VARIATION, **(variation or {})}
+    shards = shards or DEFAULT_SHARDS
+    out_dir = os.path.dirname(output_path) or "."
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Bytes reservados para a estrutura: '[' + ']' (array) ou '\n' final (jsonl),
+    # mais um separador entre shards consecutivos.
+    overhead = (2 if file_format == "array" else 1) + (shards - 1)
+    payload = size_bytes - overhead
+    if payload <= 0:
+        raise ValueError(f"Tamanho alvo pequeno demais: {size_bytes} bytes")
+    quotas = [payload // shards] * shards
+    quotas[-1] += payload - sum(quotas)
+
+    # Cada shard conhece sua posição no fluxo final, para que a deriva seja global.
+    tasks = [
+        (f"{output_path}.shard{i:04d}", quotas[i], seed * 1_000_003 + i, i, file_format, variation,
+         sum(quotas[:i]), payload)
+        for i in range(shards)
+    ]
+
+    t0 = time.time()
+    print(f"[CORPUS] Gerando {size_bytes/(1024*1024):.2f} MB em {shards} shards ({file_format}, seed={seed})...")
+    if shards == 1:
+        results = [_write_shard(tasks[0])]
+    else:
+        with Pool(processes=shards) as pool:
+            results = pool.map(_write_shard, tasks)
+    t_gen = time.time() - t0
+
+    # Um shard sem documentos teve cota menor que um documento.
+    empty = sum(1 for _, _, shard_docs in results if not shard_docs)
+    if empty == shards:
+        for shard_path, _, _ in results:
+            os.remove(shard_path)
+        raise ValueError(f"Tamanho alvo pequeno demais: {size_bytes} bytes; nenhum dos {shards} shards "
+                         f"(cota de {quotas[0]} bytes) comporta um documento. Use menos shards.")
+    if empty:
+        print(f"  Aviso: {empty} de {shards} shards ficaram sem documentos (cota de {quotas[0]} bytes "
+              f"menor que um documento); o corpus é quase todo preenchimento. Use menos shards.")
+
+    separator = b"," if file_format == "array" else b"\n"
+    total_docs = 0
+    total_bytes = 0
+    with open(output_path, "wb") as out:
+        if file_format == "array":
+            out.write(b"[")
+            total_bytes += 1
+        first = True
+        for shard_path, shard_bytes, shard_docs in results:
+            if shard_docs:
+                if not first:
+                    out.write(separator)
+                    total_bytes += 1
+                with open(shard_path, "rb") as shard:
+                    shutil.copyfileobj(shard, out, COPY_BUFFER_BYTES)
+                total_bytes += shard_bytes
+                total_docs += shard_docs
+                first = False
+            os.remove(shard_path)
+
+        closing = b"]" if file_format == "array" else b"\n"
+        if exact:
+            # Espaços em branco são permitidos entre tokens JSON e ao final de linhas JSONL.
+            padding = size_bytes - total_bytes - len(closing)
+            if padding > 0:
+                out.write(b" " * padding)
+                total_bytes += padding
+        out.write(closing)
+        total_bytes += len(closing)
+
+    if schema_path:
+        os.makedirs(os.path.dirname(schema_path) or ".", exist_ok=True)
+        with open(schema_path, "w", encoding="utf-8") as f:
+            json.dump(ground_truth_schema(variation), f, indent=2, ensure_ascii=False)
+
+    elapsed = time.time() - t0
+    print(f"\n Gerado: {output_path}")
+    print(f"  documentos: {total_docs}")
+    print(f"  tamanho final: {total_bytes/(1024*1024):.2f} MB ({total_bytes} bytes)")
+    print(f"  tempo: {elapsed:.1f}s (geração {t_gen:.1f}s) | {total_bytes/(1024*1024)/max(elapsed, 1e-9):.1f} MB/s")
+    if schema_path:
+        print(f"  schema verdade: {schema_path}")
+    return {"path": output_path, "documents": total_docs, "bytes": total_bytes, "seconds": elapsed,
+            "schema_path": schema_path}
+
+
+def parse_size(text):
+    """Converte tamanhos como '5MB', '1.5GB', '800KB' ou '1024' (bytes) em bytes."""
+    units = {"KB": 1024, "MB": 1024**2, "GB": 1024**3, "TB": 1024**4, "B": 1}
+    value = text.strip().upper()
+    for unit, factor in units.items():
+        if value.endswith(unit):
+            return int(float(value[:-len(unit)]) * factor)
+    return int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerador de corpora JSON sintéticos (persons/products/transactions).")
+    parser.add_argument("--size", default="5MB", help="Tamanho alvo (ex.: 5MB, 1GB, 20GB). Padrão: 5MB")
+    parser.add_argument("--format", choices=["array", "jsonl"], default="array", help="ARRAY JSON ou JSON Lines")
+    parser.add_argument("--seed", type=int, default=42, help="Semente para saídas reprodutíveis")
+    parser.add_argument("--shards", type=int, default=None, help=f"Processos/shards paralelos (padrão: {DEFAULT_SHARDS}; a saída depende deste número)")
+    parser.add_argument("--output", default=None, help="Arquivo de saída (padrão: datasets/dataset_<size>.<ext>)")
+    parser.add_argument("--no-exact", action="store_true", help="Não completa o arquivo até o tamanho exato")
+    parser.add_argument("--legacy", action="store_true", help="Usa o gerador original (Faker por campo, sem shards)")
+    parser.add_argument("--email-null-rate", type=float, default=DEFAULT_VARIATION["email_null_rate"])
+    parser.add_argument("--phone-null-rate", type=float, default=DEFAULT_VARIATION["phone_null_rate"])
+    parser.add_argument("--min-products", type=int, default=DEFAULT_VARIATION["min_products"])
+    parser.add_argument("--max-products", type=int, default=DEFAULT_VARIATION["max_products"])
+    parser.add_argument("--max-items", type=int, default=DEFAULT_VARIATION["max_items"])
+    parser.add_argument("--optional-rate", type=float, default=DEFAULT_VARIATION["optional_rate"],
+                        help="Probabilidade de omitir cada campo opcional")
+    parser.add_argument("--polymorphism-rate", type=float, default=DEFAULT_VARIATION["polymorphism_rate"],
+                        help="Probabilidade de um campo polimórfico aparecer com o tipo alternativo")
+    parser.add_argument("--nesting-depth", type=int, default=DEFAULT_VARIATION["nesting_depth"],
+                        help="Profundidade do objeto aninhado person.profile (0 = desligado)")
+    parser.add_argument("--key-space", type=int, default=DEFAULT_VARIATION["key_space"],
+                        help="Nº de chaves distintas em 'attributes' (0 = desligado)")
+    parser.add_argument("--keys-per-doc", type=int, default=DEFAULT_VARIATION["keys_per_doc"],
+                        help="Chaves de 'attributes' sorteadas por documento")
+    parser.add_argument("--drift", type=float, default=DEFAULT_VARIATION["drift"],
+                        help="Intensidade da deriva de schema ao longo do fluxo (0..1)")
+    parser.add_argument("--schema-output", default=None,
+                        help=f"Onde salvar o schema verdade (padrão: {GROUND_TRUTH_DIR}/<nome>_ground_truth_schema.json)")
+    args = parser.parse_args()
+
+    size_bytes = parse_size(args.size)
+    if args.legacy:
+        generate_json_array_by_size(max(1, size_bytes // (1024 * 1024)))
+        return
+
+    variation = {
+        "email_null_rate": args.email_null_rate,
+        "phone_null_rate": args.phone_null_rate,
+        "min_products": args.min_products,
+        "max_products": args.max_products,
+        "max_items": args.max_items,
+        "optional_rate": args.optional_rate,
+        "polymorphism_rate": args.polymorphism_rate,
+        "nesting_depth": args.nesting_depth,
+        "key_space": args.key_space,
+        "keys_per_doc": args.keys_per_doc,
+        "drift": args.drift,
+    }
+    ext = "json" if args.format == "array" else "jsonl"
+    output = args.output or os.path.join(OUTPUT_DIR, f"dataset_{args.size.strip().upper()}.{ext}")
+    dataset_name = os.path.splitext(os.path.basename(output))[0]
+    schema_path = args.schema_output or os.path.join(GROUND_TRUTH_DIR, f"{dataset_name}_ground_truth_schema.json")
+    generate_corpus(output, size_bytes, file_format=args.format, seed=args.seed, shards=args.shards,
+                    exact=not args.no_exact, variation=variation, schema_path=schema_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Sweep de REQUIRED_THRESHOLD x TYPE_THRESHOLD do jsonMerge.
+
+A árvore de estatísticas de cada dataset é construída uma única vez (a parte cara:
+leitura, reparo e coleta) e, a partir dela, cada par de thresholds da grade gera
+um schema mestre em paralelo. Cada schema é salvo (ou só a diferença em relação
+aos thresholds padrão, com --diff-only) e avaliado contra o baseline do genson
+com as métricas de SchemaCompare.
+
+Uso (a partir da raiz do projeto):
+    python3 scripts/ThresholdSweep.py --required 0.3:0.9:0.1 --type 0.5:1.0:0.05
+    python3 scripts/ThresholdSweep.py --datasets twitter --required 0.5,0.6 --type 0.75 --diff-only
+"""
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+if __package__:
+    from . import jsonMerge
+    from . import SchemaCompare
+    from .Settings import apply_settings
+else:
+    import jsonMerge
+    import SchemaCompare
+    from Settings import apply_settings
+
+# --- CONFIGURAÇÕES ---
+SCHEMA_SOURCE_DIR = jsonMerge.SCHEMA_SOURCE_DIR
+TRADITIONAL_SCHEMA_DIR = SchemaCompare.TRADITIONAL_SCHEMA_DIR
+SWEEP_OUTPUT_DIR = SchemaCompare.THRESHOLD_SWEEP_DIR
+DEFAULT_REQUIRED_GRID = "0.3:0.9:0.1"
+DEFAULT_TYPE_GRID = "0.5:1.0:0.05"
+# ---------------------
+apply_settings(globals())
+
+# Estado de cada processo do pool (preenchido por _init_worker).
+_WORKER = {}
+
+
+def parse_grid(text):
+    """Converte '0.5,0.6,0.7' ou 'início:fim:passo' (fim incluso) em uma lista de floats."""
+    if ":" in text:
+        start, stop, step = (float(x) for x in text.split(":"))
+        values = []
+        i = 0
+        while start + i * step <= stop + 1e-9:
+            values.append(round(start + i * step, 6))
+            i += 1
+        return values
+    return [float(x) for x in text.split(",") if x.strip()]
+
+
+def variant_name(required_threshold, type_threshold):
+    return f"r{required_threshold:.2f}_t{type_threshold:.2f}"
+
+
+def schema_diff(base_flat, variant_flat):
+    """Caminhos cujo (tipos, required) mudam entre o schema padrão e a variante."""
+    diff = []
+    for path in sorted(base_flat.keys() | variant_flat.keys()):
+        base = base_flat.get(path)
+        variant = variant_flat.get(path)
+        if base != variant:
+            diff.append({
+                "path": SchemaCompare.path_to_str(path),
+                "default": None if base is None else {"type": sorted(base[0]), "required": base[1]},
+                "variant": None if variant is None else {"type": sorted(variant[0]), "required": variant[1]},
+            })
+    return diff
+
+
+def _init_worker(stats_tree, reference_flat, default_flat, output_dir, diff_only):
+    _WORKER.update(stats_tree=stats_tree, reference_flat=reference_flat, default_flat=default_flat,
+                   output_dir=output_dir, diff_only=diff_only)
+
+
+def _evaluate(thresholds):
+    """Gera, salva e avalia o schema mestre de um par de thresholds (roda no pool)."""
+    required_threshold, type_threshold = thresholds
+    t0 = time.perf_counter()
+    schema = jsonMerge.build_schema_from_stats(_WORKER["stats_tree"], required_threshold, type_threshold)
+    flat = SchemaCompare.flatten_schema(schema)
+    name = variant_name(required_threshold, type_threshold)
+
+    diff = schema_diff(_WORKER["default_flat"], flat)
+    if _WORKER["diff_only"]:
+        diff_dir = os.path.join(_WORKER["output_dir"], "diffs")
+        os.makedirs(diff_dir, exist_ok=True)
+        with open(os.path.join(diff_dir, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump(diff, f, indent=2, ensure_ascii=False)
+    else:
+        with open(os.path.join(_WORKER["output_dir"], f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump(schema, f, indent=2, ensure_ascii=False)
+
+    row = {"variant": name, "required_threshold": required_threshold, "type_threshold": type_threshold,
+           "changed_paths": len(diff)}
+    if _WORKER["reference_flat"] is not None:
+        row.update(SchemaCompare.compare_flat(flat, _WORKER["reference_flat"]))
+    row["elapsed_ms"] = (time.perf_counter() - t0) * 1000
+    return row
+
+
+def sweep_dataset(dataset, required_grid, type_grid, workers=None, diff_only=False):
+    """Executa a grade de thresholds para um dataset. Retorna as linhas de resultado."""
+    print(f"\n--- Sweep de thresholds: {dataset} ---")
+    t0 = time.time()
+    stats_tree, valid_files = jsonMerge.collect_stats(os.path.join(SCHEMA_SOURCE_DIR, dataset))
+    if valid_files == 0:
+        print(" Nenhuma estatística coletada. Pulando dataset.")
+        return []
+    t_stats = time.time() - t0
+
+    reference_path = os.path.join(TRADITIONAL_SCHEMA_DIR, f"{dataset}_traditional_schema.json")
+    reference_flat = SchemaCompare.flatten_file(reference_path) if os.path.exists(reference_path) else None
+    if reference_flat is None:
+        print(f"   -> Aviso: baseline do genson não encontrado em '{reference_path}'. Sem métricas.")
+    default_flat = SchemaCompare.flatten_schema(jsonMerge.build_schema_from_stats(stats_tree))
+
+    output_dir = os.path.join(SWEEP_OUTPUT_DIR, dataset)
+    os.makedirs(output_dir, exist_ok=True)
+    grid = [(r, t) for r in required_grid for t in type_grid]
+
+    t1 = time.time()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(stats_tree, reference_flat, default_flat, output_dir, diff_only)) as executor:
+        rows = list(executor.map(_evaluate, grid, chunksize=max(1, len(grid) // (4 * (workers or os.cpu_count() or 1)))))
+    t_grid = time.time() - t1
+
+    for row in rows:
+        row["dataset"] = dataset
+    results_path = os.path.join(output_dir, "sweep_results.csv")
+    SchemaCompare.write_csv(rows, results_path)
+
+    print(f" Estatísticas de {valid_files} schemas em {t_stats:.2f}s; {len(grid)} combinações em {t_grid:.2f}s.")
+    if reference_flat is not None:
+        best = max(rows, key=lambda r: (r["f1"], r["type_agreement"], r["required_agreement"]))
+        print(f" Melhor combinação: {best['variant']} | F1={best['f1']:.3f} "
+              f"tipo={best['type_agreement']:.3f} required={best['required_agreement']:.3f}")
+    print(f" Resultados salvos em: {results_path}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep de REQUIRED_THRESHOLD x TYPE_THRESHOLD do jsonMerge.")
+    parser.add_argument("--datasets", default=None, help="Datasets separados por vírgula (padrão: todos)")
+    parser.add_argument("--required", default=DEFAULT_REQUIRED_GRID, help="Grade de REQUIRED_THRESHOLD")
+    parser.add_argument("--type", default=DEFAULT_TYPE_GRID, help="Grade de TYPE_THRESHOLD")
+    parser.add_argument("--workers", type=int, default=None, help="Processos paralelos (padrão: nº de CPUs)")
+    parser.add_argument("--diff-only", action="store_true",
+                        help="Salva só a diferença em relação aos thresholds padrão")
+    args = parser.parse_args()
+
+    if args.datasets:
+        datasets = [d.strip() for d in args.datasets.split(",") if d.strip()]
+    else:
+        try:
+            datasets = sorted(d.name for d in os.scandir(SCHEMA_SOURCE_DIR) if d.is_dir())
+        except FileNotFoundError:
+            print(f"❌ ERRO: O diretório fonte '{SCHEMA_SOURCE_DIR}' não foi encontrado."); return
+
+    required_grid = parse_grid(args.required)
+    type_grid = parse_grid(args.type)
+    for dataset in datasets:
+        sweep_dataset(dataset, required_grid, type_grid, workers=args.workers, diff_only=args.diff_only)
+    print("\n--- Processo Finalizado ---")
+
+
+if __name__ == "__main__":
+    main()
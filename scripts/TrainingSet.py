@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Conjunto de treino tokenizado e mapeado em memória para o fine-tuning de extração
+de schemas.
+
+Substitui o antigo training_data.txt. Os arquivos brutos dos pares (json_path,
+schema_path) do manifesto do schemaGeneration são lidos por streaming e cada
+documento vira um exemplo no formato do LLMExtraction: o prompt de extração
+(PromptCompaction) seguido do schema com indentação 2 e do fechamento do bloco
+de código. O schema descreve exatamente o documento do prompt: em JSON Lines,
+cada linha é um documento (até DOCUMENTS_PER_FILE por arquivo) com o schema do
+genson gerado só para ela, já que o schema do manifesto descreve o arquivo
+inteiro; um JSON padrão é um documento, com o schema do manifesto. Os exemplos
+são tokenizados em paralelo por processos e empacotados em sequência, cada um
+terminado pelo token de fim de texto:
+
+    training_set/<nome>/tokens.bin         # todos os tokens (uint16, ou uint32 se o vocabulário não couber)
+    training_set/<nome>/offsets.npy        # início de cada exemplo (n + 1 posições, int64)
+    training_set/<nome>/prompt_lengths.npy # tokens de prompt de cada exemplo (para mascarar a perda)
+    training_set/<nome>/meta.json
+
+TokenDataset abre o conjunto com np.memmap: nada é carregado ao abrir, cada
+exemplo é uma view do arquivo (sem cópia) e random_batch só copia a janela do
+lote pedido.
+
+O tokenizer é o do modelo (diretório Hugging Face/MLX) ou "bytes" (UTF-8 byte a
+byte, vocabulário 257), que não depende do transformers.
+
+Uso (a partir da raiz do projeto):
+    python3 scripts/TrainingSet.py build --tokenizer <caminho do modelo> --name gpt2
+    python3 scripts/TrainingSet.py build --tokenizer bytes --manifest datasets/manifest.csv --workers 8
+    python3 scripts/TrainingSet.py info training_set/gpt2
+"""
+import os
+import csv
+import json
+import time
+import argparse
+from multiprocessing import Pool
+
+import numpy as np
+
+if __package__:
+    from . import CompressedIO
+    from .PromptCompaction import compact_prompt
+    from .Settings import apply_settings
+else:
+    import CompressedIO
+    from PromptCompaction import compact_prompt
+    from Settings import apply_settings
+
+# --- CONFIGURAÇÕES ---
+MANIFEST_PATH = os.path.join("datasets", "manifest.csv")  # pares gerados pelo schemaGeneration
+OUTPUT_DIR = "training_set/"
+# Orçamento do prompt (tokens estimados) usado para escolher o nível de compactação.
+PROMPT_TOKEN_BUDGET = 8192
+# Exemplos com mais tokens que isso (prompt + schema) são descartados.
+MAX_SEQUENCE_TOKENS = 16384
+# Documentos maiores que isso (caracteres) são descartados sem serem lidos inteiros.
+MAX_DOCUMENT_CHARS = 1_000_000
+# Linhas (documentos) usadas de cada arquivo JSON Lines do manifesto; None = todas.
+DOCUMENTS_PER_FILE = 1000
+# Fechamento da resposta: o prompt termina abrindo um bloco ```json.
+COMPLETION_SUFFIX = "\n```"
+CHUNKSIZE = 16
+# ---------------------
+apply_settings(globals())
+
+# Estado de cada processo do pool (preenchido por _init_worker).
+_WORKER = {}
+
+
+class ByteTokenizer:
+    """Tokenizer UTF-8 byte a byte: ids 0-255 e 256 como fim de texto."""
+
+    eos_token_id = 256
+
+    def encode(self, text, add_special_tokens=True):
+        return list(text.encode("utf-8"))
+
+    def decode(self, ids):
+        return bytes(i for i in ids if i < 256).decode("utf-8", errors="replace")
+
+    def __len__(self):
+        return 257
+
+
+def load_training_tokenizer(name):
+    if name == "bytes":
+        return ByteTokenizer()
+    if __package__:
+        from .PromptCompaction import load_tokenizer
+    else:
+        from PromptCompaction import load_tokenizer
+    return load_tokenizer(name)
+
+
+def token_dtype(vocab_size):
+    return np.uint16 if vocab_size <= np.iinfo(np.uint16).max + 1 else np.uint32
+
+
+def iter_manifest_pairs(manifest_path):
+    """(json_path, schema_path) de cada linha do manifesto, lido por streaming."""
+    with open(manifest_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield row["json_path"], row["schema_path"]
+
+
+def _read_line(f):
+    """Próxima linha não vazia de `f` (None no fim). Linhas longas demais são puladas e devolvidas como ""."""
+    while True:
+        line = f.readline(MAX_DOCUMENT_CHARS + 1)
+        if not line:
+            return None
+        if len(line) > MAX_DOCUMENT_CHARS and not line.endswith("\n"):
+            while line and not line.endswith("\n"):
+                line = f.readline(MAX_DOCUMENT_CHARS)
+            return ""
+        if line.strip():
+            return line
+
+
+def iter_documents(json_path, schema_path, documents_per_file=DOCUMENTS_PER_FILE):
+    """
+    Documentos de um arquivo bruto do manifesto (comprimido ou não), lido por
+    streaming: (texto do documento, schema_path ou None, erro). Em JSON Lines cada
+    linha é um documento, sem schema (o do manifesto descreve todas as linhas);
+    um JSON padrão é um único documento, descrito pelo schema do manifesto.
+    """
+    with CompressedIO.open_text(json_path, meter=False) as f:
+        line, long_lines = _read_line(f), 0
+        while line == "":
+            line, long_lines = _read_line(f), long_lines + 1
+        try:
+            json.loads(line or "")
+            is_lines = True
+        except json.JSONDecodeError:
+            is_lines = False
+        if is_lines:
+            for _ in range(long_lines):
+                yield None, None, f"linha com mais de {MAX_DOCUMENT_CHARS} caracteres"
+            count = long_lines
+            while line is not None and (documents_per_file is None or count < documents_per_file):
+                if line:
+                    yield line, None, None
+                else:
+                    yield None, None, f"linha com mais de {MAX_DOCUMENT_CHARS} caracteres"
+                count += 1
+                line = _read_line(f)
+            return
+
+    # JSON padrão: relê do início, sem passar de MAX_DOCUMENT_CHARS.
+    with CompressedIO.open_text(json_path, meter=False) as f:
+        text = f.read(MAX_DOCUMENT_CHARS + 1)
+    if len(text) > MAX_DOCUMENT_CHARS:
+        yield None, None, f"documento com mais de {MAX_DOCUMENT_CHARS} caracteres"
+    else:
+        yield text, schema_path, None
+
+
+def iter_examples(manifest_path, documents_per_file=DOCUMENTS_PER_FILE):
+    """(json_path, texto do documento, schema_path ou None, erro) de cada exemplo do manifesto."""
+    for json_path, schema_path in iter_manifest_pairs(manifest_path):
+        try:
+            for text, doc_schema_path, error in iter_documents(json_path, schema_path, documents_per_file):
+                yield json_path, text, doc_schema_path, error
+        except (OSError, ValueError) as e:
+            yield json_path, None, None, str(e)
+
+
+def document_schema(document):
+    """Schema do genson para um único documento (o mesmo gerador do schemaGeneration)."""
+    from genson import SchemaBuilder
+
+    builder = SchemaBuilder()
+    builder.add_object(document)
+    return builder.to_schema()
+
+
+def format_example(document, schema):
+    """(prompt, resposta) no formato usado pelo LLMExtraction."""
+    # Tokens estimados por caracteres: o exemplo é tokenizado uma única vez, depois.
+    prompt, _ = compact_prompt(document, None, PROMPT_TOKEN_BUDGET, measure_baseline=False)
+    return prompt, json.dumps(schema, indent=2, ensure_ascii=False) + COMPLETION_SUFFIX
+
+
+def _init_worker(tokenizer_name):
+    _WORKER["tokenizer"] = load_training_tokenizer(tokenizer_name)
+
+
+def _tokenize_example(example):
+    """Tokeniza um exemplo de iter_examples. Retorna (ids, tokens de prompt, erro)."""
+    json_path, text, schema_path, error = example
+    if error:
+        return None, 0, f"{json_path}: {error}"
+    tokenizer = _WORKER["tokenizer"]
+    try:
+        document = json.loads(text)
+        if schema_path is None:
+            schema = document_schema(document)
+        else:
+            with open(schema_path, "r", encoding="utf-8") as f:
+                schema = json.load(f)
+        prompt, completion = format_example(document, schema)
+    except (OSError, ValueError) as e:
+        return None, 0, f"{json_path}: {e}"
+    # Tokens especiais (o <bos> do Gemma/Llama) só no início do prompt, nunca entre prompt e resposta.
+    prompt_ids = tokenizer.encode(prompt)
+    ids = prompt_ids + tokenizer.encode(completion, add_special_tokens=False) + [tokenizer.eos_token_id]
+    if len(ids) > MAX_SEQUENCE_TOKENS:
+        return None, 0, f"{json_path}: {len(ids)} tokens (máximo {MAX_SEQUENCE_TOKENS})"
+    return ids, len(prompt_ids), None
+
+
+def build(manifest_path, tokenizer_name, output_dir, workers=None, documents_per_file=DOCUMENTS_PER_FILE):
+    """Constrói o conjunto tokenizado em `output_dir`. Retorna o conteúdo do meta.json."""
+    t0 = time.time()
+    tokenizer = load_training_tokenizer(tokenizer_name)
+    vocab_size = len(tokenizer)
+    dtype = token_dtype(vocab_size)
+    os.makedirs(output_dir, exist_ok=True)
+    tokens_path = os.path.join(output_dir, "tokens.bin")
+    tmp_path = f"{tokens_path}.tmp"
+
+    offsets = [0]
+    prompt_lengths = []
+    skipped = 0
+    examples = iter_examples(manifest_path, documents_per_file)
+    with open(tmp_path, "wb") as out, Pool(workers, _init_worker, (tokenizer_name,)) as pool:
+        for ids, prompt_len, error in pool.imap(_tokenize_example, examples, CHUNKSIZE):
+            if error:
+                skipped += 1
+                print(f"  Aviso: exemplo ignorado: {error}")
+                continue
+            np.asarray(ids, dtype=dtype).tofile(out)
+            offsets.append(offsets[-1] + len(ids))
+            prompt_lengths.append(prompt_len)
+            if len(prompt_lengths) % 10000 == 0:
+                print(f"  {len(prompt_lengths)} exemplos, {offsets[-1]} tokens ({time.time() - t0:.0f}s)")
+
+    os.replace(tmp_path, tokens_path)
+    np.save(os.path.join(output_dir, "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+    np.save(os.path.join(output_dir, "prompt_lengths.npy"), np.asarray(prompt_lengths, dtype=np.int32))
+    meta = {"tokenizer": tokenizer_name, "vocab_size": vocab_size, "dtype": np.dtype(dtype).name,
+            "eos_token_id": tokenizer.eos_token_id, "sequences": len(prompt_lengths), "tokens": offsets[-1],
+            "skipped": skipped, "manifest": manifest_path, "documents_per_file": documents_per_file,
+            "seconds": time.time() - t0}
+    with open(os.path.join(output_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+class TokenDataset:
+    """Conjunto tokenizado aberto por mapeamento em memória (nada é lido ao abrir)."""
+
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.tokens = np.memmap(os.path.join(path, "tokens.bin"), dtype=self.meta["dtype"], mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self.prompt_lengths = np.load(os.path.join(path, "prompt_lengths.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        """Tokens do exemplo i: uma view do arquivo, sem cópia."""
+        return self.tokens[self.offsets[i]:self.offsets[i + 1]]
+
+    def example(self, i):
+        """(tokens, nº de tokens de prompt) do exemplo i."""
+        return self[i], int(self.prompt_lengths[i])
+
+    def random_batch(self, batch_size, block_size, rng=None):
+        """
+        Lote de janelas aleatórias do fluxo empacotado, no estilo de pré-treino:
+        (x, y) com formato (batch_size, block_size) e y deslocado de um token.
+        Só as janelas do lote são copiadas (para int64, como esperam os modelos).
+        """
+        rng = rng or np.random.default_rng()
+        starts = rng.integers(0, len(self.tokens) - block_size - 1, size=batch_size)
+        x = np.stack([self.tokens[s:s + block_size] for s in starts]).astype(np.int64)
+        y = np.stack([self.tokens[s + 1:s + 1 + block_size] for s in starts]).astype(np.int64)
+        return x, y
+
+    def random_examples(self, batch_size, rng=None):
+        """Índices e views (sem cópia) de `batch_size` exemplos aleatórios inteiros."""
+        rng = rng or np.random.default_rng()
+        indices = rng.integers(0, len(self), size=batch_size)
+        return indices, [self[i] for i in indices]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conjunto de treino tokenizado e mapeado em memória.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build", help="Tokeniza os pares do manifesto")
+    build_parser.add_argument("--manifest", default=MANIFEST_PATH)
+    build_parser.add_argument("--tokenizer", required=True, help="Diretório do modelo ou 'bytes'")
+    build_parser.add_argument("--name", default=None, help="Nome do conjunto (padrão: nome do tokenizer)")
+    build_parser.add_argument("--workers", type=int, default=None, help="Processos de tokenização")
+    build_parser.add_argument("--documents-per-file", type=int, default=DOCUMENTS_PER_FILE,
+                              help="Linhas usadas de cada arquivo JSON Lines (0 = todas)")
+    info_parser = sub.add_parser("info", help="Resumo de um conjunto e tempo de abertura/leitura de um lote")
+    info_parser.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        if not os.path.exists(args.manifest):
+            print(f"❌ ERRO: O manifesto '{args.manifest}' não foi encontrado."); return
+        name = args.name or os.path.basename(os.path.normpath(args.tokenizer))
+        output_dir = os.path.join(OUTPUT_DIR, name)
+        print(f"Construindo o conjunto '{output_dir}' a partir de '{args.manifest}'...")
+        meta = build(args.manifest, args.tokenizer, output_dir, args.workers, args.documents_per_file or None)
+        print(f"Concluído: {meta['sequences']} exemplos, {meta['tokens']} tokens ({meta['dtype']}), "
+              f"{meta['skipped']} ignorados, em {meta['seconds']:.1f}s")
+        return
+
+    t0 = time.perf_counter()
+    dataset = TokenDataset(args.path)
+    t_open = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    block = min(1024, len(dataset.tokens) - 2)
+    dataset.random_batch(8, block)
+    t_batch = time.perf_counter() - t0
+    print(json.dumps(dataset.meta, indent=2))
+    print(f"Abertura: {t_open * 1000:.2f} ms | lote 8x{block}: {t_batch * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""
+Pacote schema_discovery: os scripts de `scripts/` instalados sob um único nome.
+
+Cada script importa os vizinhos de forma relativa quando carregado pelo pacote
+(`from . import jsonMerge`) e pelo nome quando executado diretamente
+(`python3 scripts/<Script>.py`, que põe a pasta no sys.path).
+"""
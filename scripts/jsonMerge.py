@@ -1,7 +1,16 @@
 import os
+import sys
 import json
 import glob
-from collections import defaultdict
+from array import array
+if __package__:
+    from .Instrumentation import timed
+    from .SchemaCompare import ARRAY_ITEMS
+    from .Settings import apply_settings
+else:
+    from Instrumentation import timed
+    from SchemaCompare import ARRAY_ITEMS
+    from Settings import apply_settings
 
 # --- CONFIGURAÇÕES ---
 SCHEMA_SOURCE_DIR = "processed/schema_documents/"
@@ -9,6 +18,25 @@ MASTER_SCHEMA_OUTPUT_DIR = "."
 REQUIRED_THRESHOLD = 0.6
 TYPE_THRESHOLD = 0.75
 # ---------------------
+apply_settings(globals())
+
+def repair_json_text(raw_content):
+    """
+    Reparo de formatação de um texto que não é JSON válido (ex.: resposta do modelo
+    com texto em volta do schema): carrega o trecho entre o primeiro '{' e o
+    último '}'. Retorna os dados ou None se não houver esse trecho; levanta
+    json.JSONDecodeError se o trecho for inválido.
+    """
+    # Encontra o primeiro '{' e o último '}' para extrair o JSON
+    start_index = raw_content.find('{')
+    end_index = raw_content.rfind('}')
+
+    if start_index != -1 and end_index != -1 and end_index > start_index:
+        json_slice = raw_content[start_index : end_index + 1]
+        # Tenta carregar a fatia extraída
+        return json.loads(json_slice)
+    return None
+
 
 def load_and_repair_json(file_path):
     """
@@ -25,18 +53,11 @@ def load_and_repair_json(file_path):
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 raw_content = f.read()
-            
-            # Encontra o primeiro '{' e o último '}' para extrair o JSON
-            start_index = raw_content.find('{')
-            end_index = raw_content.rfind('}')
-            
-            if start_index != -1 and end_index != -1 and end_index > start_index:
-                json_slice = raw_content[start_index : end_index + 1]
-                # Tenta carregar a fatia extraída
-                return json.loads(json_slice)
-            else:
+
+            repaired = repair_json_text(raw_content)
+            if repaired is None:
                 print(f"       -> Reparo de formatação falhou: Não foi possível encontrar um objeto JSON válido no arquivo.")
-                return None
+            return repaired
         except (json.JSONDecodeError, ValueError) as repair_e:
             print(f"       -> Reparo de formatação falhou: {repair_e}")
             return None
@@ -104,127 +125,402 @@ def repair_schema_structure(schema_node):
                 repair_schema_structure(prop_node)
 
 
-def update_stats_tree(stats_node, schema_node):
+class StatsTree:
     """
-    Função recursiva para ler um schema e atualizar a árvore de estatísticas.
+    Trie de estatísticas dos schemas, um nó por caminho.
+
+    Os nós são índices inteiros e os contadores ficam em colunas (array) por
+    contador, e não em dicionários por nó: aparições, vezes em que o campo foi
+    required e uma coluna por tipo observado. As colunas começam com 16 bits e são
+    alargadas (32, 64 bits) quando uma contagem estoura. Os filhos de cada nó ficam
+    em um dicionário {segmento: nó} criado só quando o nó tem filhos; os segmentos
+    são nomes de propriedades internados (sys.intern) ou ARRAY_ITEMS para os itens
+    de arrays. O nó 0 é a raiz: suas aparições são o total de schemas.
     """
-    # Esta função agora confia que o 'schema_node' já foi reparado estruturalmente
-    
-    # Garantir que schema_node.get("required") seja uma lista
-    required_value = schema_node.get("required")
-    required_fields = set(required_value) if isinstance(required_value, list) else set()
-    
-    for key, prop in schema_node.get("properties", {}).items():
-        if not isinstance(prop, dict):
-            # Isso não deveria acontecer após repair_schema_structure, mas é uma defesa extra
-            continue
 
-        if key not in stats_node:
-            stats_node[key] = {
-                "_stats": { "appearances": 0, "required_count": 0, "type_counts": defaultdict(int) },
-                "properties": {}
-            }
-        
-        prop_stats = stats_node[key]["_stats"]
-        prop_stats["appearances"] += 1
-        
-        if key in required_fields:
-            prop_stats["required_count"] += 1
-        
-        raw_type = prop.get("type")
-        types = []
-        if isinstance(raw_type, str):
-            types = [raw_type]
-        elif isinstance(raw_type, list):
-            types = [str(t) for t in raw_type if t is not None]
-        elif raw_type is None:
-            types = ["null"]
-        # Outros tipos (bool, int, etc. para 'type') serão ignorados com um aviso do repair_schema_structure
-        
-        for t in types:
-            prop_stats["type_counts"][t] += 1
-            
-        if "object" in types and "properties" in prop:
-            update_stats_tree(stats_node[key]["properties"], prop)
+    __slots__ = ("children", "counts", "types", "size")
+
+    def __init__(self):
+        self.children = []  # nó -> {segmento: nó filho} ou None
+        self.counts = {"appearances": array("H"), "required": array("H")}
+        self.types = {}     # tipo -> coluna de contagens
+        self.size = 0
+        self.new_node()
+
+    def new_node(self):
+        node = self.size
+        self.size += 1
+        self.children.append(None)
+        for column in self.counts.values():
+            column.append(0)
+        for column in self.types.values():
+            column.append(0)
+        return node
+
+    def child(self, node, segment):
+        """Nó filho de `node` pelo segmento, criado se ainda não existir."""
+        children = self.children[node]
+        if children is None:
+            children = self.children[node] = {}
+        child = children.get(segment)
+        if child is None:
+            child = children[sys.intern(segment)] = self.new_node()
+        return child
+
+    def add_type(self, node, type_name, weight):
+        if type_name not in self.types:
+            self.types[sys.intern(type_name)] = array("H", bytes(2 * self.size))
+        _increment(self.types, type_name, node, weight)
+
+    def node(self, index=0):
+        return StatsNode(self, index)
+
+
+class StatsNode:
+    """Vista de leitura de um nó da StatsTree (criada sob demanda, não fica armazenada)."""
+
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def appearances(self):
+        return self.tree.counts["appearances"][self.index]
+
+    @property
+    def required_count(self):
+        return self.tree.counts["required"][self.index]
+
+    @property
+    def type_counts(self):
+        return {t: column[self.index] for t, column in self.tree.types.items() if column[self.index]}
+
+    @property
+    def properties(self):
+        """{nome: StatsNode} das propriedades de objeto."""
+        children = self.tree.children[self.index] or {}
+        return {key: StatsNode(self.tree, child) for key, child in children.items() if key != ARRAY_ITEMS}
+
+    @property
+    def items(self):
+        """StatsNode dos itens de array (ou None)."""
+        child = (self.tree.children[self.index] or {}).get(ARRAY_ITEMS)
+        return StatsNode(self.tree, child) if child is not None else None
+
+    def paths(self, path=()):
+        """(caminho, StatsNode) de todos os descendentes, com ARRAY_ITEMS nos itens de arrays."""
+        for key, child in (self.tree.children[self.index] or {}).items():
+            node = StatsNode(self.tree, child)
+            yield path + (key,), node
+            yield from node.paths(path + (key,))
+
+
+_WIDER = {"H": "I", "I": "Q"}
+
+
+def _increment(columns, key, node, weight):
+    column = columns[key]
+    try:
+        column[node] += weight
+    except OverflowError:
+        columns[key] = column = array(_WIDER[column.typecode], column)
+        column[node] += weight
+
 
+def new_stats_tree():
+    """Cria uma árvore de estatísticas vazia."""
+    return StatsTree()
 
-def build_schema_from_stats(stats_node):
+
+def resolve_ref(root, ref):
+    """Alvo de um $ref local ("#", "#/definitions/X", "#/$defs/X", ...) no schema `root`, ou None."""
+    if not ref.startswith("#"):
+        return None
+    target = root
+    for part in ref[1:].lstrip("/").split("/") if ref.strip("#/") else []:
+        part = part.replace("~1", "/").replace("~0", "~")
+        if isinstance(target, dict):
+            target = target.get(part)
+        elif isinstance(target, list) and part.isdigit() and int(part) < len(target):
+            target = target[int(part)]
+        else:
+            return None
+    return target if isinstance(target, dict) else None
+
+
+_COMPOSITE = frozenset(("$ref", "anyOf", "oneOf", "allOf"))
+
+
+def _expand(schema, root, refs, member=False):
     """
-    Função recursiva para construir o schema final a partir da árvore de estatísticas.
+    Variantes concretas de um schema: segue $ref locais (sem repetir um $ref já
+    aberto no caminho, para schemas recursivos) e abre anyOf/oneOf/allOf.
+    Retorna [(variante, é membro de combinador, refs abertos)].
     """
-    final_schema = {"type": "object", "properties": {}}
-    required_fields = []
-
-    for key, node_data in stats_node.items():
-        stats = node_data["_stats"]
-        
-        if stats["appearances"] == 0: # Evitar divisão por zero se o campo foi coletado mas nunca 'visto' de fato
+    if _COMPOSITE.isdisjoint(schema):
+        return [(schema, member, refs)]
+    ref = schema.get("$ref")
+    if isinstance(ref, str):
+        target = resolve_ref(root, ref) if ref not in refs else None
+        return _expand(target, root, refs | {ref}, member) if target is not None else []
+    variants = []
+    for keyword in ("anyOf", "oneOf", "allOf"):
+        members = schema.get(keyword)
+        if isinstance(members, list):
+            for sub in members:
+                if isinstance(sub, dict):
+                    variants += _expand(sub, root, refs, member=True)
+    if not variants or any(k in schema for k in ("type", "properties", "items")):
+        variants.append((schema, member, refs))
+    return variants
+
+
+def _types_of(variant, member):
+    raw_type = variant.get("type")
+    if isinstance(raw_type, str):
+        return [raw_type]
+    if isinstance(raw_type, list):
+        return [str(t) for t in raw_type if t is not None]
+    if raw_type is None:
+        # Sem tipo: "null", como sempre (mesmo com "properties" ou "items"). Membros de
+        # anyOf/oneOf/allOf sem tipo têm o tipo deduzido das palavras-chave, e os que
+        # só trazem restrições não contam tipo.
+        if not member:
+            return ["null"]
+        if "properties" in variant:
+            return ["object"]
+        if "items" in variant:
+            return ["array"]
+        return []
+    # Outros tipos (bool, int, etc. para 'type') serão ignorados com um aviso do repair_schema_structure
+    return []
+
+
+def _update_node(tree, node, schemas, weight, root, refs):
+    """Acumula em `node` as variantes (`schemas`) de um mesmo caminho de um documento."""
+    if len(schemas) == 1 and _COMPOSITE.isdisjoint(schemas[0]):
+        # Caso comum: um único schema, sem $ref nem combinadores.
+        variants = [(schemas[0], False, refs)]
+        raw_type = schemas[0].get("type")
+        types = (raw_type,) if isinstance(raw_type, str) else set(_types_of(schemas[0], False))
+    else:
+        variants = []
+        for schema in schemas:
+            variants += _expand(schema, root, refs)
+        types = set()
+        for variant, member, _ in variants:
+            types.update(_types_of(variant, member))
+    for t in types:
+        column = tree.types.get(t)
+        if column is None:
+            tree.add_type(node, t, weight)
             continue
+        try:
+            column[node] += weight
+        except OverflowError:
+            _increment(tree.types, t, node, weight)
+
+    if "object" in types:
+        _update_properties(tree, node, [(v, r) for v, _, r in variants if isinstance(v.get("properties"), dict)],
+                           weight, root)
+    if "array" in types:
+        items = []
+        for variant, _, variant_refs in variants:
+            raw_items = variant.get("items", variant.get("prefixItems"))
+            for item in raw_items if isinstance(raw_items, list) else [raw_items]:
+                if isinstance(item, dict):
+                    items.append((item, variant_refs))
+        if items:
+            child = tree.child(node, ARRAY_ITEMS)
+            _increment(tree.counts, "appearances", child, weight)
+            _update_node(tree, child, [item for item, _ in items], weight, root,
+                         refs if len(items) == 1 else frozenset().union(*(r for _, r in items)))
+
+
+def _update_properties(tree, node, variants, weight, root):
+    """Propriedades (e required) de um objeto, unindo as variantes: cada chave conta uma vez por documento."""
+    if not variants:
+        return
+    if len(variants) == 1:
+        # Caso comum (sem anyOf/oneOf): nada a unir.
+        variant, refs = variants[0]
+        properties = {key: [prop] for key, prop in variant["properties"].items() if isinstance(prop, dict)}
+        # Garantir que schema_node.get("required") seja uma lista
+        required_value = variant.get("required")
+        required_fields = required_value if isinstance(required_value, list) else ()
+    else:
+        properties = {}
+        required_fields = set()
+        refs = frozenset()
+        for variant, variant_refs in variants:
+            refs |= variant_refs
+            for key, prop in variant["properties"].items():
+                if isinstance(prop, dict):
+                    properties.setdefault(key, []).append(prop)
+            required_value = variant.get("required")
+            if isinstance(required_value, list):
+                required_fields.update(r for r in required_value if isinstance(r, str))
+
+    counts = tree.counts
+    children = tree.children[node]
+    if children is None:
+        children = tree.children[node] = {}
+    for key, props in properties.items():
+        child = children.get(key)
+        if child is None:
+            child = children[sys.intern(key)] = tree.new_node()
+        _increment(counts, "appearances", child, weight)
+        if key in required_fields:
+            _increment(counts, "required", child, weight)
+        _update_node(tree, child, props, weight, root, refs)
 
-        required_ratio = stats["required_count"] / stats["appearances"]
-        if required_ratio >= REQUIRED_THRESHOLD:
-            required_fields.append(key)
 
-        type_counts = stats["type_counts"]
-        has_null = "null" in type_counts
-        non_null_counts = {t: c for t, c in type_counts.items() if t != "null"}
-        
-        final_type = None
-        if not non_null_counts:
-            final_type = "null"
-        else:
-            total_non_null = sum(non_null_counts.values())
-            if total_non_null == 0: # Caso todos os tipos não-nulos tenham sido inválidos
-                 final_type = "string" # Fallback para um tipo genérico
-            else:
-                winner_type = max(non_null_counts, key=non_null_counts.get)
-                winner_ratio = non_null_counts[winner_type] / total_non_null
-                
-                if winner_ratio >= TYPE_THRESHOLD:
-                    final_type = winner_type
-                else:
-                    final_type = sorted(list(non_null_counts.keys()))
-                    if len(final_type) == 1: final_type = final_type[0]
-        
-        if has_null and final_type != "null":
-            final_type = [final_type, "null"] if not isinstance(final_type, list) else sorted(final_type + ["null"])
-        
-        # Se por algum motivo final_type ainda for None (nunca deveria acontecer, mas para robustez)
-        if final_type is None:
-            final_type = "string" # Fallback
+def update_stats_tree(stats_tree, schema_node, weight=1):
+    """
+    Lê um schema e atualiza a árvore de estatísticas.
+    `weight` conta o schema como `weight` cópias idênticas (schemas deduplicados).
+    Além das propriedades de objetos, percorre os itens de arrays (`items`),
+    as alternativas de anyOf/oneOf/allOf (unidas no mesmo caminho) e $ref locais.
+    """
+    # Esta função agora confia que o 'schema_node' já foi reparado estruturalmente
+    _increment(stats_tree.counts, "appearances", 0, weight)
+    variants = [(v, r) for v, _, r in _expand(schema_node, schema_node, frozenset())
+                if isinstance(v.get("properties"), dict)]
+    _update_properties(stats_tree, 0, variants, weight, schema_node)
 
-        final_schema["properties"][key] = {"type": final_type}
-        
-        # Sub-schemas para objetos aninhados
-        if "object" in str(final_type) and node_data["properties"]:
-            nested_schema = build_schema_from_stats(node_data["properties"])
-            # Mescla as chaves do sub-schema no final_schema[properties][key]
-            # Isso inclui as chaves 'type', 'properties', 'required' do objeto aninhado
-            final_schema["properties"][key].update(nested_schema)
+
+def _final_type(type_counts, type_threshold):
+    """Tipo final de um caminho a partir das contagens de tipo (None se nenhum tipo foi visto)."""
+    if not type_counts:
+        return None
+    has_null = "null" in type_counts
+    non_null_counts = {t: c for t, c in type_counts.items() if t != "null"}
+
+    if not non_null_counts:
+        return "null"
+    total_non_null = sum(non_null_counts.values())
+    winner_type = max(non_null_counts, key=non_null_counts.get)
+    if non_null_counts[winner_type] / total_non_null >= type_threshold:
+        final_type = winner_type
+    else:
+        final_type = sorted(non_null_counts)
+        if len(final_type) == 1: final_type = final_type[0]
+
+    if has_null:
+        final_type = [final_type, "null"] if not isinstance(final_type, list) else sorted(final_type + ["null"])
+    return final_type
+
+
+def _build_node(node, required_threshold, type_threshold):
+    """Schema de um caminho: tipo, propriedades (objetos) e itens (arrays)."""
+    # Caminho sem tipo válido (ex.: "type": 5 ou $ref não resolvido): "null", como sempre.
+    final_type = _final_type(node.type_counts, type_threshold) or "null"
+    schema = {"type": final_type}
+    types = final_type if isinstance(final_type, list) else [final_type]
+
+    if "object" in types:
+        properties, required_fields = _build_properties(node, required_threshold, type_threshold)
+        if properties:
+            schema["properties"] = properties
+            if required_fields:
+                schema["required"] = required_fields
+    if "array" in types:
+        items = node.items
+        if items is not None and items.appearances and items.type_counts:
+            schema["items"] = _build_node(items, required_threshold, type_threshold)
+    return schema
+
+
+def _build_properties(node, required_threshold, type_threshold):
+    properties = {}
+    required_fields = []
+    for key, child in node.properties.items():
+        if child.appearances == 0: # Evitar divisão por zero se o campo foi coletado mas nunca 'visto' de fato
+            continue
+        if child.required_count / child.appearances >= required_threshold:
+            required_fields.append(key)
+        properties[key] = _build_node(child, required_threshold, type_threshold)
+    return properties, sorted(required_fields)
 
 
+def build_schema_from_stats(stats_tree, required_threshold=None, type_threshold=None):
+    """
+    Constrói o schema final a partir da árvore de estatísticas.
+    Sem thresholds explícitos, usa REQUIRED_THRESHOLD e TYPE_THRESHOLD.
+    """
+    if required_threshold is None:
+        required_threshold = REQUIRED_THRESHOLD
+    if type_threshold is None:
+        type_threshold = TYPE_THRESHOLD
+    properties, required_fields = _build_properties(stats_tree.node(), required_threshold, type_threshold)
+    final_schema = {"type": "object", "properties": properties}
     if required_fields:
-        final_schema["required"] = sorted(required_fields)
-        
+        final_schema["required"] = required_fields
     return final_schema
 
 
-def process_directory(dir_path):
+def stats_memory(stats_tree):
     """
-    Orquestra as fases de coleta e geração para um único diretório.
+    Memória ocupada pela árvore (bytes, contando uma vez cada objeto compartilhado,
+    como os segmentos internados). Retorna (caminhos, bytes, bytes por caminho).
     """
-    dir_name = os.path.basename(dir_path)
-    print(f"\n--- Processando o diretório: {dir_name} ---")
-    
+    seen = set()
+
+    def size(obj):
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        total = sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            total += sum(size(k) + size(v) for k, v in obj.items())
+        elif isinstance(obj, list):
+            total += sum(size(v) for v in obj)
+        return total
+
+    total = sys.getsizeof(stats_tree) + sum(size(getattr(stats_tree, slot)) for slot in StatsTree.__slots__)
+    paths = stats_tree.size - 1
+    return paths, total, total / paths if paths else 0.0
+
+
+@timed()
+def collect_stats(dir_path):
+    """
+    Fase 1 (coleta e reparo): lê todos os schemas de um diretório e acumula a
+    árvore de estatísticas. Retorna (stats_tree, nº de arquivos válidos).
+    Se o dataset já estiver no armazenamento endereçado por conteúdo (SchemaStore),
+    cada schema único é lido e processado uma única vez, com peso igual à sua
+    multiplicidade; arquivos do diretório que não estão no índice (ex.: respostas
+    que não eram JSON quando foram salvas) são lidos e reparados como antes.
+    """
+    if __package__:
+        from . import SchemaStore
+    else:
+        import SchemaStore
+
+    dataset = os.path.basename(os.path.normpath(dir_path))
     schema_files = glob.glob(os.path.join(dir_path, '**/*.json'), recursive=True)
-    if not schema_files:
+    stats_tree = new_stats_tree()
+    valid_files_count = 0
+
+    if SchemaStore.has_index(dataset):
+        indexed = SchemaStore.load_index(dataset)
+        unique = SchemaStore.load_unique(dataset)
+        valid_files_count = sum(count for _, count in unique)
+        print(f" Lendo {len(unique)} schemas únicos ({valid_files_count} documentos) do armazenamento...")
+        for schema, count in unique:
+            update_stats_tree(stats_tree, schema, count)
+        schema_files = [f for f in schema_files if os.path.relpath(f, dir_path) not in indexed]
+        if not schema_files:
+            return stats_tree, valid_files_count
+        print(f" Aviso: {len(schema_files)} arquivos de schema fora do índice do armazenamento; "
+              "lendo-os com reparo (ingira-os com 'SchemaStore.py ingest').")
+    elif not schema_files:
         print(" Nenhum arquivo de schema encontrado neste diretório.")
-        return
+        return stats_tree, 0
 
     print(f" Encontrados {len(schema_files)} arquivos. Iniciando a Fase 1: Coleta e Reparo...")
-
-    stats_tree = {}
-    valid_files_count = 0
     
     for i, file_path in enumerate(schema_files):
         print(f"   ({i+1}/{len(schema_files)}) Processando: {os.path.basename(file_path)}")
@@ -247,12 +543,27 @@ def process_directory(dir_path):
             print(f"        Erro na coleta de estatísticas após reparo de estrutura para {os.path.basename(file_path)}: {e}. Pulando.")
             continue
 
+    return stats_tree, valid_files_count
+
+
+@timed()
+def process_directory(dir_path):
+    """
+    Orquestra as fases de coleta e geração para um único diretório.
+    """
+    dir_name = os.path.basename(dir_path)
+    print(f"\n--- Processando o diretório: {dir_name} ---")
+    
+    stats_tree, valid_files_count = collect_stats(dir_path)
 
     if valid_files_count == 0:
         print(" Nenhuma estatística pôde ser coletada de arquivos válidos. Nenhum schema mestre será gerado.")
         return
 
-    print(f"\n Análise concluída em {valid_files_count} arquivos válidos. Iniciando a Fase 2: Geração do Schema Mestre...")
+    paths, size_bytes, per_path = stats_memory(stats_tree)
+    print(f"\n Análise concluída em {valid_files_count} arquivos válidos ({paths} caminhos, "
+          f"{size_bytes / 1024:.1f} KB de estatísticas, {per_path:.0f} bytes/caminho). "
+          "Iniciando a Fase 2: Geração do Schema Mestre...")
     master_schema = build_schema_from_stats(stats_tree)
     
     output_filename = f"{dir_name}_master_schema.json"
@@ -3,7 +3,14 @@ import os
 import json
 import csv
 import csv
-from genson import SchemaBuilder
+if __package__:
+    from .Instrumentation import timed
+    from . import CompressedIO
+    from .Settings import apply_settings
+else:
+    from Instrumentation import timed
+    import CompressedIO
+    from Settings import apply_settings
 
 DATASETS_DIR = 'datasets/'
 RAW_JSON_DIR = os.path.join(DATASETS_DIR, 'rawJson/')
@@ -26,8 +33,13 @@ RAW_JSON_DIR = os.path.join(DATASETS_DIR, 'rawJson')
 PROCESSED_SCHEMAS_DIR = os.path.join(DATASETS_DIR, 'processedSchemas')
 MANIFEST_PATH = os.path.join(DATASETS_DIR, 'manifest.csv')
 MAX_STANDARD_JSON_SIZE_MB = 500
+apply_settings(globals())
 
-def updateManifestFile():
+def schemaFilenameFor(filename):
+    # 'tweets.jsonl.gz' -> 'tweets.schema.json'; 'a.zip::d/dados.json' -> 'dados.schema.json'
+    return os.path.splitext(CompressedIO.logical_name(filename))[0] + '.schema.json'
+
+def updateManifestFile(rawJsonDir=None):
     
     # É chamada no final de generateSchemasAutomatically.
     # 1. Varre a pasta `processedSchemas/`.
@@ -40,6 +52,7 @@ def updateManifestFile():
     print("Updating manifest.csv...")
     
     validPairs = []
+    rawJsonDir = rawJsonDir or RAW_JSON_DIR
     
     if not os.path.exists(PROCESSED_SCHEMAS_DIR):
         print("Processed schemas directory not found. Manifest not created.")
@@ -47,15 +60,19 @@ def updateManifestFile():
         print("Processed schemas directory not found. Manifest not created.")
         return
 
-    for schemaFilename in os.listdir(PROCESSED_SCHEMAS_DIR):
+    # O JSON original pode ser JSON Lines e/ou estar comprimido (ex.: dados.jsonl.gz)
+    rawFilenames = {}
+    if os.path.isdir(rawJsonDir):
+        rawFilenames = {schemaFilenameFor(f): f for f in CompressedIO.list_files(rawJsonDir)}
+
+    for schemaFilename in sorted(os.listdir(PROCESSED_SCHEMAS_DIR)):
         if schemaFilename.endswith('.schema.json'):
-            jsonFilename = schemaFilename.replace('.schema.json', '.json')
-            jsonFilePath = os.path.join(RAW_JSON_DIR, jsonFilename)
+            jsonFilename = rawFilenames.get(schemaFilename)
             
-            if os.path.exists(jsonFilePath):
+            if jsonFilename is not None:
                
                 # Garante que o caminho completo seja salvo no manifesto
-                relativeJsonPath = os.path.join(RAW_JSON_DIR, jsonFilename)
+                relativeJsonPath = os.path.join(rawJsonDir, jsonFilename)
                 relativeSchemaPath = os.path.join(PROCESSED_SCHEMAS_DIR, schemaFilename)
                 
                 validPairs.append({
@@ -77,8 +94,10 @@ def updateManifestFile():
     except Exception as e:
         print(f"Error writing to manifest.csv: {e}")
 
-def generateSchemasAutomatically():
-    # 1. Itera sobre cada arquivo na pasta `rawJson/`.
+@timed()
+def generateSchemasAutomatically(rawJsonDir=None):
+    # 1. Itera sobre cada arquivo na pasta `rawJson/` (ou em `rawJsonDir`; o Pipeline
+    #    usa a pasta dos dados brutos do pré-processamento).
     # 2. **Verificação de Memória**: Primeiro, tenta ler o arquivo linha por linha,
     #    o que é ideal para arquivos no formato JSON Lines e muito eficiente em memória.
     # 3. Se falhar (porque é um JSON padrão), ele verifica o tamanho do arquivo.
@@ -87,14 +106,18 @@ def generateSchemasAutomatically():
     #    a biblioteca `genson` para inferir a estrutura e criar o esquema.
     # 5. Salva o esquema gerado na pasta `processedSchemas/`.
     
+    from genson import SchemaBuilder  # import tardio: não pesa em quem só importa o módulo
+
+    rawJsonDir = rawJsonDir or RAW_JSON_DIR
     print("Generating schemas with improved memory management...")
     os.makedirs(PROCESSED_SCHEMAS_DIR, exist_ok=True)
-    jsonFiles = [f for f in os.listdir(RAW_JSON_DIR) if f.endswith('.json')]
-    print(f"Found {len(jsonFiles)} JSON files in {RAW_JSON_DIR}.")
+    # Aceita .json e .jsonl, comprimidos ou não (.gz, .bz2, .xz, .zst) e membros de .zip, lidos por streaming
+    jsonFiles = CompressedIO.list_files(rawJsonDir)
+    print(f"Found {len(jsonFiles)} JSON files in {rawJsonDir}.")
 
     for filename in jsonFiles:
-        inputPath = os.path.join(RAW_JSON_DIR, filename)
-        outputFilename = filename.replace('.json', '.schema.json')
+        inputPath = os.path.join(rawJsonDir, filename)
+        outputFilename = schemaFilenameFor(filename)
         outputPath = os.path.join(PROCESSED_SCHEMAS_DIR, outputFilename)
         
         if os.path.exists(outputPath):
@@ -106,7 +129,7 @@ def generateSchemasAutomatically():
         fileProcessed = False
 
         try:
-            with open(inputPath, 'r', encoding='utf-8') as f:
+            with CompressedIO.open_text(inputPath) as f:
                 for line in f:
                     if line.strip():
                         jsonObject = json.loads(line)
@@ -114,12 +137,12 @@ def generateSchemasAutomatically():
                         linesProcessed += 1
             if linesProcessed > 0: fileProcessed = True
         except json.JSONDecodeError:
-            fileSizeMb = os.path.getsize(inputPath) / (1024 * 1024)
+            fileSizeMb = CompressedIO.uncompressed_size(inputPath) / (1024 * 1024)
             if fileSizeMb > MAX_STANDARD_JSON_SIZE_MB:
                 print(f"Warning: Skipping '{filename}' ({fileSizeMb:.2f}MB). File is too large.")
                 continue
             try:
-                with open(inputPath, 'r', encoding='utf-8') as f:
+                with CompressedIO.open_text(inputPath) as f:
                     jsonObject = json.load(f)
                     builder.add_object(jsonObject)
                     linesProcessed = 1
@@ -136,7 +159,8 @@ def generateSchemasAutomatically():
             print(f"Schema generated for '{filename}' and saved to '{outputFilename}'")
 
     print("\nSchema generation finished!")
-    updateManifestFile()
+    CompressedIO.print_throughput()
+    updateManifestFile(rawJsonDir)
 
 if __name__ == '__main__':
     generateSchemasAutomatically()
\ No newline at end of file
@@ -11,7 +11,7 @@ echo "--- INICIANDO SETUP E PRÉ-PROCESSAMENTO ---"
 
 # --- PASSO 1: Instalação das bibliotecas Python ---
 echo "[PASSO 1/5] Instalando dependências Python via pip..."
-pip install torch pandas transformers datasets kaggle peft bitsandbytes tokenizers genson
+pip install torch pandas transformers datasets kaggle peft bitsandbytes tokenizers genson ijson faker
 echo "[SUCESSO] Dependências instaladas."
 echo ""
 export PATH="$HOME/.local/bin:$PATH"
@@ -35,34 +35,31 @@ fi
 echo "[SUCESSO] API do Kaggle configurada."
 echo ""
 
-# --- PASSO 3: Executar o Pipeline de Aquisição de Dados ---
-# Baixa os arquivos JSON brutos do Kaggle.
-echo "[PASSO 3/5] Executando o pipeline de aquisição de dados (pipelineGen.py)..."
-python3 scripts/pipelineGen.py
-echo "[SUCESSO] Aquisição de dados concluída."
+# --- PASSO 3: Verificação dos dados brutos ---
+# Os arquivos JSON/JSONL brutos (baixados do Kaggle) devem estar em datasets/, comprimidos
+# ou não (.gz, .bz2, .xz, .zst, .zip). A verificação usa a mesma listagem do pré-processamento.
+echo "[PASSO 3/5] Verificando os dados brutos em datasets/..."
+if ! python3 -c "import os, sys; sys.path.insert(0, 'scripts'); import PreprocessDatasets as p; sys.exit(0 if os.path.isdir(p.input_dir) and p.list_input_files(p.input_dir) else 1)"; then
+    echo "Nenhum arquivo .json/.jsonl (comprimido ou não) encontrado em datasets/."
+    echo "Baixe os datasets do Kaggle para essa pasta (ou gere um sintético com scripts/SinteticJson.py)."
+    exit 1
+fi
+echo "[SUCESSO] Dados brutos encontrados."
 echo ""
 
-# --- PASSO 4: Gerar Esquemas e o Manifesto Principal ---
-echo "[PASSO 4/5] Gerando esquemas e o manifesto principal (schemaGenerator.py)..."
-# Apaga o manifesto antigo para garantir que um novo e limpo seja criado
-rm -f datasets/manifest.csv
-python3 scripts/schemaGeneration.py
-echo "[SUCESSO] Geração de esquemas e manifesto concluída."
+# --- PASSO 4: Executar o pipeline (pré-processamento, pares de treino, manifesto e schemas) ---
+# O orquestrador pula as etapas cujas entradas não mudaram desde a última execução.
+echo "[PASSO 4/5] Executando o pipeline (scripts/Pipeline.py)..."
+python3 scripts/Pipeline.py
+echo "[SUCESSO] Pipeline concluído."
 echo ""
 
-# --- PASSO 5: Criar o Subconjunto de Dados e o Arquivo Final de Treinamento ---
-echo "[PASSO 5/5] Criando subconjunto de dados e arquivo final de treinamento..."
-# Cria o subconjunto de 1GB e seu respectivo manifesto
-python3 scripts/createSubset.py
-# Cria o arquivo training_data.txt para o subconjunto
-python3 scripts/prepareData.py
-echo "[SUCESSO] Subconjunto de dados e arquivo de treinamento prontos."
+# --- PASSO 5: Extração com LLM ---
+echo "[PASSO 5/5] Para incluir a extração de schemas com LLM, rode:"
+echo "python3 scripts/Pipeline.py --llm"
+echo "Para montar o conjunto de treino tokenizado (fine-tuning) a partir de datasets/manifest.csv (etapa training_pairs):"
+echo "python3 scripts/TrainingSet.py build --tokenizer <caminho do modelo>"
 echo ""
 
 
 echo "--- SETUP E PRÉ-PROCESSAMENTO CONCLUÍDOS! ---"
-echo "Seu ambiente está pronto. Você já pode rodar o script de treinamento:"
-echo "Para fazer o fine-tuning do modelo GPT-2, use:"
-echo "python3 scripts/fineTuningGPT2.py"
-echo "Para treinar o modelo do zero, use:"
-echo "python3 scripts/myModel.py"